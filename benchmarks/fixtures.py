@@ -0,0 +1,78 @@
+"""
+Synthetic menu shared by the benchmarks.
+
+    supported = fixtures.supported_languages(9)
+    fixtures.seed_menu(db, items=200, categories=8, languages=supported)
+
+The menu is deterministic, so runs on different commits compare the same
+data: every item has a translation and every category a translated name in
+each supported language, every tenth item is unavailable and the allergen
+flags follow a fixed pattern. Repo modules (models, database) are imported
+inside the functions, after the calling script has set DATABASE_URL and
+put the repository on sys.path.
+"""
+import json
+
+LANGUAGE_NAMES = {
+    "en": "English", "de": "German", "it": "Italian", "fr": "French", "es": "Spanish",
+    "sl": "Slovenian", "cs": "Czech", "pl": "Polish", "hu": "Hungarian",
+}
+
+
+def supported_languages(count: int) -> dict:
+    """code -> name of `count` languages; past the real ones, made-up codes x0, x1, ..."""
+    codes = (list(LANGUAGE_NAMES) + [f"x{i}" for i in range(count)])[:count]
+    return {code: LANGUAGE_NAMES.get(code, f"Language {code}") for code in codes}
+
+
+def write_languages(path: str, languages: dict):
+    """The supported_languages.json the app reads"""
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(languages, f)
+
+
+def memory_session():
+    """Session on a fresh in-memory database holding the app's tables"""
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from sqlalchemy.pool import StaticPool
+    from database import Base
+    import models  # registers the tables on Base
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(bind=engine)()
+
+
+def seed_menu(db, items: int, categories: int, languages: dict, image_paths: list = None):
+    """Add the categories and menu items, translated into `languages`, and commit.
+
+    Items use the given image paths in turn, or made-up 1200x900 .webp paths (which don't exist).
+    """
+    from models import MenuItem, Category, Translation, CategoryTranslation
+
+    category_names = [f"KATEGORIJA {i}" for i in range(categories)]
+    for order, name in enumerate(category_names):
+        category = Category(name=name, order=order)
+        db.add(category)
+        db.flush()
+        for code, lang_name in languages.items():
+            db.add(CategoryTranslation(category_id=category.id, language_code=code,
+                                       language_name=lang_name, name=f"{name} ({code})"))
+    for i in range(items):
+        item = MenuItem(
+            name_hr=f"Jelo {i}", name_en=f"Jelo {i}",
+            description_hr="Domaće jelo s povrćem i maslinovim uljem. " * 3,
+            description_en="Domaće jelo s povrćem i maslinovim uljem. " * 3,
+            price=10 + i % 7 * 2.5, category=category_names[i % categories] if categories else None,
+            image_path=image_paths[i % len(image_paths)] if image_paths else f"/static/images/{i}.webp",
+            image_width=None if image_paths else 1200, image_height=None if image_paths else 900,
+            is_available=i % 10 != 0,
+            is_vegetarian=i % 3 == 0, contains_gluten=i % 2 == 0, contains_dairy=i % 5 == 0,
+        )
+        db.add(item)
+        db.flush()
+        for code, lang_name in languages.items():
+            db.add(Translation(menu_item_id=item.id, language_code=code, language_name=lang_name,
+                               name=f"Dish {i} ({code})", description="Home-made dish with vegetables. " * 3))
+    db.commit()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Size and decode time of the menu responses: JSON vs columnar MessagePack.
+
+Seeds an in-memory database and encodes the rows of each menu read endpoint
+the way the server does (orjson, and menu_format.encode() for clients
+sending Accept: application/vnd.mosaic.menu+msgpack). For each it prints
+the body size, raw and gzipped, and the time a client needs to decode it:
+
+- json: json.loads (what a plain Python client does)
+- orjson: orjson.loads
+- msgpack: menu_client.decode(), back to the same rows
+
+Every MessagePack body is checked to decode to exactly the JSON rows before
+anything is timed.
+
+Run with:
+    python benchmarks/format_benchmark.py --items 200 --languages 9
+"""
+import argparse
+import gzip
+import json
+import os
+import sys
+import time
+
+import fixtures
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def seed(items: int, categories: int, languages: int):
+    os.environ["DATABASE_URL"] = "sqlite://"
+    sys.path.insert(0, REPO_DIR)
+    db = fixtures.memory_session()
+    fixtures.seed_menu(db, items, categories, fixtures.supported_languages(languages))
+    return db
+
+
+def responses(db, lang: str) -> dict:
+    """Rows of each endpoint, as the server selects them"""
+    import read_path
+    return {
+        "menu-items": read_path.menu_item_rows(db),
+        "menu-items-with-translations": read_path.menu_item_rows(db, with_translations=True),
+        f"menu-items?lang={lang}": read_path.localized_menu_item_rows(db, lang),
+        "categories-with-translations": read_path.category_rows(db),
+        f"categories?lang={lang}": read_path.localized_category_rows(db, lang),
+    }
+
+
+def best_of(function, body, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function(body)
+        times.append(time.perf_counter() - started)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare JSON and MessagePack menu responses")
+    parser.add_argument("--items", type=int, default=200)
+    parser.add_argument("--categories", type=int, default=8)
+    parser.add_argument("--languages", type=int, default=9)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    db = seed(args.items, args.categories, args.languages)
+    import orjson
+    import menu_format
+    import menu_client
+
+    print(f"{args.items} items, {args.categories} categories, {args.languages} languages\n")
+    print(f"{'endpoint':<32}{'JSON':>9}{'msgpack':>9}{'gzip JSON':>11}{'gzip mp':>9}"
+          f"{'json ms':>9}{'orjson ms':>11}{'msgpack ms':>12}")
+    for name, rows in responses(db, "de").items():
+        json_body = orjson.dumps(rows)
+        msgpack_body = menu_format.encode(rows)
+        if menu_client.decode(msgpack_body) != json.loads(json_body):
+            sys.exit(f"❌ {name}: the MessagePack body does not decode to the JSON rows")
+        times = [best_of(json.loads, json_body, args.repeat), best_of(orjson.loads, json_body, args.repeat),
+                 best_of(menu_client.decode, msgpack_body, args.repeat)]
+        sizes = [len(json_body), len(msgpack_body), len(gzip.compress(json_body)), len(gzip.compress(msgpack_body))]
+        print(f"{name:<32}" + "".join(f"{size / 1024:>{width}.1f}K" for size, width in zip(sizes, (8, 8, 10, 8)))
+              + "".join(f"{seconds * 1000:>{width}.2f}" for seconds, width in zip(times, (9, 11, 12))))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Synthetic load test for the customer read path.
+
+Seeds a synthetic menu (items, categories, languages, images) into a scratch
+database, starts the app with uvicorn on a local port and drives realistic
+customer sessions (the menu and categories in one random language, the
+language list, a few images) with an async client at increasing concurrency,
+next to --admin-sessions admin clients loading the menu with every
+translation. Throughput and p50/p95/p99 latency per
+endpoint are printed and saved as JSON, so runs can be compared across
+commits.
+
+Run with:
+    python benchmarks/load_test.py --items 200 --languages 9 --concurrency 10,50,100
+    python benchmarks/load_test.py --compare results/before.json results/after.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+import fixtures
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# One customer session: what the QR-code menu loads in the guest's language, plus some dish photos
+SESSION_ENDPOINTS = [
+    ("menu", "/api/menu-items?lang={lang}"),
+    ("categories", "/api/categories-with-translations?lang={lang}"),
+    ("languages", "/api/supported-languages"),
+]
+# The admin panel edits translations, so it loads every language at once
+ADMIN_ENDPOINTS = [
+    ("admin_menu", "/api/menu-items-with-translations"),
+    ("admin_categories", "/api/categories-with-translations"),
+]
+IMAGES_PER_SESSION = 4
+
+
+def seed(work_dir: str, items: int, categories: int, languages: int, images: int, image_size: int):
+    """Create the scratch database, languages file and images"""
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(work_dir, 'menu.db')}"
+    sys.path.insert(0, REPO_DIR)
+    from PIL import Image
+    import migrations
+    from database import engine, SessionLocal
+
+    supported = fixtures.supported_languages(languages)
+    fixtures.write_languages(os.path.join(work_dir, "supported_languages.json"), supported)
+
+    image_dir = os.path.join(work_dir, "static", "images")
+    os.makedirs(image_dir, exist_ok=True)
+    image_paths = []
+    for i in range(images):
+        name = f"synthetic-{i}.jpg"
+        color = (random.randrange(256), random.randrange(256), random.randrange(256))
+        Image.new("RGB", (image_size, image_size), color).save(os.path.join(image_dir, name), quality=85)
+        image_paths.append(f"/static/images/{name}")
+
+    migrations.migrate(engine)
+    db = SessionLocal()
+    fixtures.seed_menu(db, items, categories, supported, image_paths)
+    db.close()
+    return image_paths, ["hr"] + list(supported)
+
+
+def start_server(work_dir: str, port: int) -> subprocess.Popen:
+    env = dict(os.environ, PYTHONPATH=REPO_DIR, OPENAI_API_KEY=os.getenv("OPENAI_API_KEY", "load-test"))
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=work_dir, env=env,
+    )
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with code {process.returncode}")
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/", timeout=1, trust_env=False).status_code == 200:
+                return process
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("Server did not start")
+
+
+def percentile(sorted_values: list, pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+async def run_level(base_url: str, concurrency: int, admins: int, duration: float,
+                    image_paths: list, languages: list) -> dict:
+    latencies = {}
+    errors = {}
+    deadline = time.perf_counter() + duration
+
+    async def fetch(client, name, path):
+        started = time.perf_counter()
+        try:
+            response = await client.get(path)
+            ok = response.status_code == 200
+        except httpx.HTTPError:
+            ok = False
+        latencies.setdefault(name, []).append(time.perf_counter() - started)
+        if not ok:
+            errors[name] = errors.get(name, 0) + 1
+
+    async def customer(client):
+        while time.perf_counter() < deadline:
+            lang = random.choice(languages)
+            for name, path in SESSION_ENDPOINTS:
+                await fetch(client, name, path.format(lang=lang))
+            for path in random.sample(image_paths, min(IMAGES_PER_SESSION, len(image_paths))):
+                await fetch(client, "image", path)
+
+    async def admin(client):
+        while time.perf_counter() < deadline:
+            for name, path in ADMIN_ENDPOINTS:
+                await fetch(client, name, path)
+
+    limits = httpx.Limits(max_connections=concurrency + admins, max_keepalive_connections=concurrency + admins)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60, trust_env=False) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(customer(client) for _ in range(concurrency)),
+                             *(admin(client) for _ in range(admins)))
+        elapsed = time.perf_counter() - started
+
+    endpoints = {}
+    for name, values in latencies.items():
+        values.sort()
+        endpoints[name] = {
+            "requests": len(values),
+            "errors": errors.get(name, 0),
+            "rps": round(len(values) / elapsed, 1),
+            "p50_ms": round(percentile(values, 50) * 1000, 2),
+            "p95_ms": round(percentile(values, 95) * 1000, 2),
+            "p99_ms": round(percentile(values, 99) * 1000, 2),
+        }
+    total = sum(len(values) for values in latencies.values())
+    return {
+        "concurrency": concurrency,
+        "admins": admins,
+        "requests": total,
+        "errors": sum(errors.values()),
+        "rps": round(total / elapsed, 1),
+        "endpoints": endpoints,
+    }
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def print_level(level: dict):
+    print(f"\nconcurrency {level['concurrency']} (+{level.get('admins', 0)} admin): "
+          f"{level['rps']} req/s, {level['errors']} errors")
+    print(f"  {'endpoint':<18}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name, stats in level["endpoints"].items():
+        print(f"  {name:<18}{stats['rps']:>10}{stats['p50_ms']:>10}{stats['p95_ms']:>10}{stats['p99_ms']:>10}")
+
+
+def compare(before_path: str, after_path: str):
+    with open(before_path, encoding="utf-8") as f:
+        before = json.load(f)
+    with open(after_path, encoding="utf-8") as f:
+        after = json.load(f)
+    print(f"{before['revision']} -> {after['revision']}")
+    before_levels = {level["concurrency"]: level for level in before["levels"]}
+    for level in after["levels"]:
+        old = before_levels.get(level["concurrency"])
+        if not old:
+            continue
+        print(f"\nconcurrency {level['concurrency']}: {old['rps']} -> {level['rps']} req/s")
+        for name, stats in level["endpoints"].items():
+            if name in old["endpoints"]:
+                print(f"  {name:<18} p95 {old['endpoints'][name]['p95_ms']} -> {stats['p95_ms']} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the customer read path")
+    parser.add_argument("--items", type=int, default=150)
+    parser.add_argument("--categories", type=int, default=8)
+    parser.add_argument("--languages", type=int, default=9)
+    parser.add_argument("--images", type=int, default=20)
+    parser.add_argument("--image-size", type=int, default=800, help="image width/height in pixels")
+    parser.add_argument("--concurrency", default="10,50,100", help="comma-separated concurrency levels")
+    parser.add_argument("--admin-sessions", type=int, default=1, help="admin clients running alongside each level")
+    parser.add_argument("--duration", type=float, default=15, help="seconds per level")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--out", help="result file (default: benchmarks/results/load-<revision>-<time>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"), help="compare two result files")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    work_dir = tempfile.mkdtemp(prefix="mosaic-load-")
+    print(f"Seeding {args.items} items, {args.categories} categories, {args.languages} languages in {work_dir}")
+    image_paths, languages = seed(work_dir, args.items, args.categories, args.languages, args.images, args.image_size)
+
+    server = start_server(work_dir, args.port)
+    levels = []
+    try:
+        for concurrency in (int(c) for c in args.concurrency.split(",")):
+            level = asyncio.run(run_level(f"http://127.0.0.1:{args.port}", concurrency, args.admin_sessions,
+                                          args.duration, image_paths, languages))
+            print_level(level)
+            levels.append(level)
+    finally:
+        server.terminate()
+        server.wait()
+
+    revision = git_revision()
+    result = {
+        "revision": revision,
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "config": {k: v for k, v in vars(args).items() if k not in ("out", "compare")},
+        "levels": levels,
+    }
+    out = args.out or os.path.join(REPO_DIR, "benchmarks", "results",
+                                   f"load-{revision}-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(out), exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2)
+    print(f"\n✅ Results saved to {out}")
+
+
+if __name__ == "__main__":
+    main()
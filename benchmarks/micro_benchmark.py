@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+In-process micro-benchmarks for the hot paths in main.py, with regression thresholds.
+
+Seeds a shared in-memory SQLite database, runs the app's lifespan and sends
+requests straight into the ASGI app (no server, no network), timing:
+
+- menu_full: GET /api/menu-items-with-translations (every language)
+- menu_localized: GET /api/menu-items?lang=de
+- categories: GET /api/categories, answered from the cached body
+- categories_cold: GET /api/categories after a menu change, so the query and
+  serialization run every time
+- analytics: GET /api/analytics
+- translation_prompt: build the menu item prompt and parse a JSON answer
+  through request_translation and the LLM governor (with a fake client)
+- qr_code: GET /api/qr-code
+- image_upload: POST /api/menu-items with a photo (save, placeholder)
+
+Each benchmark reports the median and best of --repeat timed runs; a
+benchmark's `prepare` step, if any, runs untimed before each of them. With a
+baseline file, a benchmark whose median is more than --threshold percent
+slower than its baseline fails the run (exit code 1). Timings depend on the
+machine, so record a baseline on the box that runs the comparison:
+
+    python benchmarks/micro_benchmark.py --save-baseline
+    python benchmarks/micro_benchmark.py --threshold 20
+    python benchmarks/micro_benchmark.py --only menu_full,categories
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import types
+from io import BytesIO
+
+import fixtures
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE_FILE = os.path.join(REPO_DIR, "benchmarks", "micro_baseline.json")
+
+
+def configure(work_dir: str):
+    """Environment for a self-contained run: in-memory database, no background workers, no network"""
+    os.chdir(work_dir)
+    os.makedirs(os.path.join("static", "images"), exist_ok=True)
+    # Named shared-cache database: every connection of the pool sees the same in-memory data
+    os.environ["DATABASE_URL"] = "sqlite:///file:micro_benchmark?mode=memory&cache=shared&uri=true"
+    os.environ["CACHE_BUS"] = "memory"
+    os.environ["PRETRANSLATE"] = "0"
+    os.environ["VIEW_FLUSH_INTERVAL"] = "3600"
+    os.environ.setdefault("OPENAI_API_KEY", "micro-benchmark")
+    # The governor's rate limits would otherwise dominate translation_prompt
+    os.environ["OPENAI_RPM"] = os.environ["OPENAI_TPM"] = str(10 ** 9)
+    os.environ["OPENAI_MAX_CONCURRENCY"] = "1000"
+    sys.path.insert(0, REPO_DIR)
+
+
+class FakeCompletions:
+    """Answers instantly, so translation_prompt measures our side of the call only"""
+
+    async def create(self, **kwargs):
+        usage = types.SimpleNamespace(prompt_tokens=1300, completion_tokens=30, total_tokens=1330,
+                                      prompt_tokens_details=types.SimpleNamespace(cached_tokens=1152))
+        content = json.dumps({"name": "Grilled squid", "description": "Squid with Swiss chard and potatoes."})
+        message = types.SimpleNamespace(content=content)
+        return types.SimpleNamespace(usage=usage, choices=[types.SimpleNamespace(message=message)])
+
+
+def sample_image() -> bytes:
+    from PIL import Image
+    buffer = BytesIO()
+    Image.new("RGB", (1600, 1200), (180, 90, 40)).save(buffer, format="JPEG", quality=85)
+    return buffer.getvalue()
+
+
+def benchmarks(client, menu_item) -> dict:
+    """name -> coroutine function running the measured operation once"""
+    import main
+    import prompts
+    from cache_bus import bus
+    from llm import UsageJob
+
+    async def get(path):
+        response = await client.get(path)
+        if response.status_code != 200:
+            raise RuntimeError(f"GET {path}: {response.status_code}")
+
+    async def translation_prompt():
+        # A different text each time, so single-flight never shares a call between runs
+        translation_prompt.counter += 1
+        messages = prompts.menu_item_messages(f"{menu_item.name_hr} {translation_prompt.counter}",
+                                              menu_item.description_hr, "German")
+        await main.request_translation(messages, "de", UsageJob("benchmark", prompts.PROMPT_VERSION))
+    translation_prompt.counter = 0
+
+    async def categories_cold():
+        await get("/api/categories")
+    # What a menu edit does: bumps the cache version, dropping the cached body
+    categories_cold.prepare = lambda: bus.invalidate("menu")
+
+    image = sample_image()
+
+    async def image_upload():
+        response = await client.post("/api/menu-items", data={"name_hr": "Lignje na žaru", "price": "14"},
+                                     files={"image": ("lignje.jpg", image, "image/jpeg")})
+        if response.status_code != 200:
+            raise RuntimeError(f"POST /api/menu-items: {response.status_code}")
+
+    return {
+        "menu_full": lambda: get("/api/menu-items-with-translations"),
+        "menu_localized": lambda: get("/api/menu-items?lang=de"),
+        "categories": lambda: get("/api/categories"),
+        "categories_cold": categories_cold,
+        "analytics": lambda: get("/api/analytics"),
+        "translation_prompt": translation_prompt,
+        "qr_code": lambda: get("/api/qr-code"),
+        # Last: every run adds a menu item
+        "image_upload": image_upload,
+    }
+
+
+async def measure(operation, repeat: int, warmup: int) -> dict:
+    prepare = getattr(operation, "prepare", lambda: None)
+    for _ in range(warmup):
+        prepare()
+        await operation()
+    times = []
+    for _ in range(repeat):
+        prepare()
+        started = time.perf_counter()
+        await operation()
+        times.append(time.perf_counter() - started)
+    return {"median_ms": round(statistics.median(times) * 1000, 3), "best_ms": round(min(times) * 1000, 3)}
+
+
+async def run(args) -> dict:
+    import httpx
+    import llm
+    import main
+    from database import get_session_factory
+    from models import MenuItem
+
+    llm.governor._client = types.SimpleNamespace(chat=types.SimpleNamespace(completions=FakeCompletions()))
+    app = main.create_app()
+    results = {}
+    async with main.lifespan(app):
+        db = get_session_factory()()
+        try:
+            languages = fixtures.supported_languages(args.languages)
+            fixtures.write_languages("supported_languages.json", languages)
+            fixtures.seed_menu(db, args.items, args.categories, languages)
+            menu_item = db.query(MenuItem).first()
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://benchmark") as client:
+                selected = benchmarks(client, menu_item)
+                names = args.only.split(",") if args.only else list(selected)
+                for name in names:
+                    if name not in selected:
+                        sys.exit(f"❌ Unknown benchmark: {name} (available: {', '.join(selected)})")
+                    results[name] = await measure(selected[name], args.repeat, args.warmup)
+                    print(f"{name:<20}{results[name]['median_ms']:>10.2f} ms median{results[name]['best_ms']:>10.2f} ms best")
+        finally:
+            db.close()
+    return results
+
+
+def check(results: dict, baseline: dict, threshold: float, current_config: dict) -> list:
+    """Names of the benchmarks more than `threshold` percent slower than the baseline"""
+    regressions = []
+    config = baseline.get("config", {})
+    if any(config.get(key) not in (None, value) for key, value in current_config.items()):
+        print(f"\n⚠️  The baseline was recorded with {config}; the comparison is not like for like")
+    print(f"\n{'benchmark':<20}{'baseline':>12}{'now':>12}{'change':>10}")
+    for name, result in results.items():
+        old = baseline.get("results", {}).get(name)
+        if not old:
+            print(f"{name:<20}{'-':>12}{result['median_ms']:>10.2f}ms{'new':>10}")
+            continue
+        change = (result["median_ms"] / old["median_ms"] - 1) * 100
+        regressed = change > threshold
+        print(f"{name:<20}{old['median_ms']:>10.2f}ms{result['median_ms']:>10.2f}ms{change:>+9.1f}%"
+              f"{'  ❌ regression' if regressed else ''}")
+        if regressed:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmark the hot paths of the API in-process")
+    parser.add_argument("--items", type=int, default=200)
+    parser.add_argument("--categories", type=int, default=8)
+    parser.add_argument("--languages", type=int, default=9)
+    parser.add_argument("--repeat", type=int, default=30, help="timed runs per benchmark")
+    parser.add_argument("--warmup", type=int, default=3, help="untimed runs per benchmark")
+    parser.add_argument("--only", help="comma-separated benchmark names")
+    parser.add_argument("--baseline", default=BASELINE_FILE, help="baseline file to compare against or save")
+    parser.add_argument("--threshold", type=float, default=float(os.getenv("BENCHMARK_THRESHOLD", "25")),
+                        help="allowed slowdown of the median in percent (default 25)")
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the new baseline")
+    args = parser.parse_args()
+    args.baseline = os.path.abspath(args.baseline)
+
+    configure(tempfile.mkdtemp(prefix="mosaic-micro-"))
+    print(f"{args.items} items, {args.categories} categories, {args.languages} languages, "
+          f"{args.repeat} runs each\n")
+    results = asyncio.run(run(args))
+    config = {key: getattr(args, key) for key in ("items", "categories", "languages")}
+
+    if args.save_baseline:
+        baseline = {
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "config": config,
+            "results": results,
+        }
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(baseline, f, indent=2)
+            f.write("\n")
+        print(f"\n✅ Baseline saved to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"\nNo baseline at {args.baseline}; run with --save-baseline to record one")
+        return
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    regressions = check(results, baseline, args.threshold, config)
+    if regressions:
+        sys.exit(f"\n❌ {len(regressions)} benchmark(s) more than {args.threshold:g}% slower than the baseline: "
+                 f"{', '.join(regressions)}")
+    print(f"\n✅ No benchmark more than {args.threshold:g}% slower than the baseline")
+
+
+if __name__ == "__main__":
+    main()
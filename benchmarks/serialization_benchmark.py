@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Serialization cost of the menu list endpoints, per 1,000 items.
+
+Seeds an in-memory database and times two ways of producing the body of
+GET /api/menu-items-with-translations:
+
+- pydantic: load ORM objects, validate them through the response model and
+  encode with the stdlib json module (what FastAPI does for response_model)
+- fast: read_path.menu_item_rows() plus orjson (what the endpoint does now)
+- one language: read_path.localized_menu_item_rows() plus orjson, the ?lang=
+  response the customer menu uses
+
+Both bodies are checked to decode to the same data, with the same key order,
+before anything is timed.
+
+Run with:
+    python benchmarks/serialization_benchmark.py --items 1000 --languages 9
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from typing import List
+
+import fixtures
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def seed(items: int, languages: int):
+    os.environ["DATABASE_URL"] = "sqlite://"
+    sys.path.insert(0, REPO_DIR)
+    db = fixtures.memory_session()
+    fixtures.seed_menu(db, items, 8, fixtures.supported_languages(languages))
+    return db
+
+
+def pydantic_body(db) -> bytes:
+    from pydantic import TypeAdapter
+    from models import MenuItem
+    from schemas import MenuItemWithTranslationsResponse
+    adapter = TypeAdapter(List[MenuItemWithTranslationsResponse])
+    db.expire_all()
+    items = db.query(MenuItem).all()
+    content = adapter.dump_python(adapter.validate_python(items, from_attributes=True), mode="json")
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def fast_body(db) -> bytes:
+    import orjson
+    import read_path
+    db.expire_all()
+    return orjson.dumps(read_path.menu_item_rows(db, with_translations=True))
+
+
+def localized_body(db) -> bytes:
+    import orjson
+    import read_path
+    db.expire_all()
+    return orjson.dumps(read_path.localized_menu_item_rows(db, "l0"))
+
+
+def best_of(function, db, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function(db)
+        times.append(time.perf_counter() - started)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark menu list serialization")
+    parser.add_argument("--items", type=int, default=1000)
+    parser.add_argument("--languages", type=int, default=9)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    db = seed(args.items, args.languages)
+    slow, fast = pydantic_body(db), fast_body(db)
+    # Same data and the same key order
+    if json.dumps(json.loads(slow)) != json.dumps(json.loads(fast)):
+        sys.exit("❌ The fast path produced a different response")
+
+    per_thousand = 1000 / args.items
+    results = {}
+    for name, function in (("pydantic", pydantic_body), ("fast", fast_body), ("one language", localized_body)):
+        results[name] = best_of(function, db, args.repeat)
+        print(f"{name:<14}{results[name] * per_thousand * 1000:>10.1f} ms per 1,000 items")
+    print(f"\n{args.items} items x {args.languages} languages, {len(fast) / 1024:.0f} KiB, "
+          f"{results['pydantic'] / results['fast']:.1f}x faster")
+    print(f"?lang= response: {len(localized_body(db)) / 1024:.0f} KiB")
+
+
+if __name__ == "__main__":
+    main()
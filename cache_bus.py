@@ -0,0 +1,213 @@
+"""
+Cache invalidation across worker processes and hosts.
+
+In-process caches register a callback for a topic:
+
+    bus.register("languages", lambda tenant: _cache.pop(tenant, None))
+
+and writers call bus.invalidate("languages") once their change is saved.
+The local callbacks run right away; every other process sharing the
+database runs them shortly after, for the same topic and tenant.
+
+Backends (CACHE_BUS, default "auto"):
+
+- "database": a cache_versions row per (topic, tenant) in the default
+  database is bumped on every invalidation, and each process polls the
+  table every CACHE_BUS_POLL_INTERVAL seconds. On SQLite the poll first
+  checks PRAGMA data_version, so an idle database costs one pragma.
+- "postgres": the same table, plus NOTIFY on every bump; processes LISTEN
+  and react immediately, polling only as a fallback. Needs psycopg2.
+- "memory": local callbacks only, for tests and single-process setups.
+
+"auto" picks "postgres" for a PostgreSQL DATABASE_URL and "database"
+otherwise. Callbacks run on the poller thread and must be thread-safe.
+"""
+import json
+import os
+import select
+import threading
+import traceback
+from collections import defaultdict
+
+from sqlalchemy import select as sql_select, text, update, insert
+
+from database import current_tenant
+from migrations import ensure_schema
+
+CACHE_BUS = os.getenv("CACHE_BUS", "auto")
+POLL_INTERVAL = float(os.getenv("CACHE_BUS_POLL_INTERVAL", "1.0"))
+NOTIFY_CHANNEL = "cache_bus"
+
+
+class MemoryBus:
+    """Invalidations reach this process only"""
+
+    def __init__(self):
+        self.callbacks = defaultdict(list)
+
+    def register(self, topic: str, callback):
+        """callback(tenant) runs whenever `topic` is invalidated for a tenant"""
+        self.callbacks[topic].append(callback)
+
+    def invalidate(self, topic: str, tenant: str = None):
+        tenant = tenant or current_tenant.get()
+        try:
+            self._publish(topic, tenant)
+        except Exception:
+            # The change itself is already saved; don't fail the request over it
+            traceback.print_exc()
+        self._run(topic, tenant)
+
+    def _publish(self, topic: str, tenant: str):
+        pass
+
+    def _run(self, topic: str, tenant: str):
+        for callback in self.callbacks.get(topic, []):
+            try:
+                callback(tenant)
+            except Exception:
+                # One broken cache must not keep the others stale
+                traceback.print_exc()
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+
+class DatabaseBus(MemoryBus):
+    """Version rows in the shared database, polled by every process"""
+
+    def __init__(self, engine, interval: float = POLL_INTERVAL):
+        super().__init__()
+        self.engine = engine
+        self.interval = interval
+        self.seen = {}  # (topic, tenant) -> last version handled here
+        self.primed = False
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _publish(self, topic: str, tenant: str):
+        from models import CacheVersion
+        ensure_schema(self.engine)
+        key = CacheVersion.topic == topic, CacheVersion.tenant == tenant
+        with self.engine.begin() as conn:
+            bumped = conn.execute(update(CacheVersion).where(*key).values(version=CacheVersion.version + 1))
+            if bumped.rowcount == 0:
+                conn.execute(insert(CacheVersion).values(topic=topic, tenant=tenant, version=1))
+            version = conn.execute(sql_select(CacheVersion.version).where(*key)).scalar()
+            self._notify(conn, topic, tenant, version)
+        with self._lock:
+            # Our own bump: the local callbacks run directly, not again from the poller
+            self.seen[(topic, tenant)] = max(self.seen.get((topic, tenant), 0), version)
+
+    def _notify(self, conn, topic: str, tenant: str, version: int):
+        pass
+
+    def poll(self):
+        """Run the callbacks of every (topic, tenant) bumped by another process since the last poll"""
+        from models import CacheVersion
+        ensure_schema(self.engine)
+        with self.engine.connect() as conn:
+            rows = conn.execute(sql_select(CacheVersion.topic, CacheVersion.tenant, CacheVersion.version)).all()
+        changed = []
+        with self._lock:
+            for topic, tenant, version in rows:
+                seen = self.seen.get((topic, tenant))
+                if version != seen and (seen is not None or self.primed):
+                    changed.append((topic, tenant))
+                self.seen[(topic, tenant)] = max(seen or 0, version)
+            self.primed = True
+        for topic, tenant in changed:
+            self._run(topic, tenant)
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name="cache-bus", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join(timeout=self.interval + 1)
+            self._thread = None
+
+    def _loop(self):
+        pragma_connection = None
+        data_version = None
+        while not self._stop.is_set():
+            try:
+                if self.engine.dialect.name == "sqlite":
+                    # data_version is per connection and only changes when another connection commits
+                    if pragma_connection is None:
+                        pragma_connection = self.engine.raw_connection()
+                    cursor = pragma_connection.cursor()
+                    cursor.execute("PRAGMA data_version")
+                    current = cursor.fetchone()[0]
+                    cursor.close()
+                    if current != data_version or not self.primed:
+                        data_version = current
+                        self.poll()
+                else:
+                    self.poll()
+            except Exception:
+                traceback.print_exc()
+            self._wait()
+        if pragma_connection is not None:
+            pragma_connection.close()
+
+    def _wait(self):
+        self._stop.wait(self.interval)
+
+
+class PostgresBus(DatabaseBus):
+    """DatabaseBus that wakes up on NOTIFY instead of waiting for the next poll"""
+
+    def __init__(self, engine, interval: float = POLL_INTERVAL):
+        super().__init__(engine, interval)
+        self._listener = None
+
+    def _notify(self, conn, topic: str, tenant: str, version: int):
+        payload = json.dumps({"topic": topic, "tenant": tenant, "version": version})
+        conn.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": NOTIFY_CHANNEL, "payload": payload})
+
+    def _wait(self):
+        try:
+            if self._listener is None:
+                self._listener = self.engine.raw_connection()
+                self._listener.driver_connection.autocommit = True
+                self._listener.cursor().execute(f"LISTEN {NOTIFY_CHANNEL}")
+            connection = self._listener.driver_connection
+            if select.select([connection], [], [], self.interval) != ([], [], []):
+                connection.poll()
+                connection.notifies.clear()
+        except Exception:
+            traceback.print_exc()
+            if self._listener is not None:
+                self._listener.invalidate()
+                self._listener = None
+            self._stop.wait(self.interval)
+
+    def stop(self):
+        super().stop()
+        if self._listener is not None:
+            self._listener.close()
+            self._listener = None
+
+
+def create_bus():
+    backend = CACHE_BUS
+    if backend == "memory":
+        return MemoryBus()
+    from database import engine
+    if backend == "auto":
+        backend = "postgres" if engine.dialect.name == "postgresql" else "database"
+    if backend == "postgres":
+        return PostgresBus(engine)
+    return DatabaseBus(engine)
+
+
+bus = create_bus()
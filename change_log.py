@@ -0,0 +1,258 @@
+"""
+Append-only change log of menu mutations, used for delta sync.
+
+Every flush that touches a tracked model writes one change_log row per
+changed entity, on the same connection and therefore in the same
+transaction as the mutation itself. The id of the newest row is the menu
+version. Clients call GET /api/changes?since=<version> and receive the
+current state of every entity changed since then (compacted, so an item
+edited ten times is sent once), or a full snapshot if their version is
+older than the trimmed log.
+
+Customer devices showing one language ask with ?lang= instead and get
+only menu items and categories, as the localized rows of read_path, so
+they can merge them into what they already show.
+"""
+import json
+import os
+from datetime import date, datetime
+from typing import Optional
+
+from sqlalchemy import event, func, insert, inspect, delete
+from sqlalchemy.orm import Session
+
+from models import MenuItem, Category, Translation, CategoryTranslation, RestaurantInfo, ChangeLog
+import read_path
+from schemas import (
+    MenuItemResponse, CategoryResponse, TranslationResponse,
+    CategoryTranslationResponse, RestaurantInfoResponse
+)
+
+# Number of log rows kept; older clients fall back to a full snapshot
+CHANGE_LOG_RETENTION = int(os.getenv("CHANGE_LOG_RETENTION", "10000"))
+# Trim at most once every this many versions to keep writes cheap
+TRIM_EVERY = 500
+
+# Models whose changes are logged, with their public entity name and response schema
+TRACKED_ENTITIES = {
+    MenuItem: ("menu_item", MenuItemResponse),
+    Category: ("category", CategoryResponse),
+    Translation: ("translation", TranslationResponse),
+    CategoryTranslation: ("category_translation", CategoryTranslationResponse),
+    RestaurantInfo: ("restaurant_info", RestaurantInfoResponse),
+}
+ENTITY_MODELS = {name: (model, schema) for model, (name, schema) in TRACKED_ENTITIES.items()}
+
+# Internal columns that clients never need to hear about
+SKIPPED_FIELDS = {"allergen_mask"}
+
+
+def _json_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def describe_change(obj, op: str) -> Optional[dict]:
+    """Compact description of a changed ORM object, or None if untracked"""
+    tracked = TRACKED_ENTITIES.get(type(obj))
+    if tracked is None:
+        return None
+    change = {"entity": tracked[0], "id": obj.id, "op": op}
+    if op == "updated":
+        state = inspect(obj)
+        fields = {}
+        for attr in state.mapper.column_attrs:
+            if attr.key in SKIPPED_FIELDS:
+                continue
+            if state.attrs[attr.key].history.has_changes():
+                fields[attr.key] = _json_value(getattr(obj, attr.key))
+        if not fields:
+            return None
+        change["fields"] = fields
+    return change
+
+
+def write_changes(session: Session, changes: list):
+    """Append changes to the log inside the session's current transaction"""
+    if not changes:
+        return
+    connection = session.connection()
+    rows = [
+        {
+            "entity": change["entity"],
+            "entity_id": str(change["id"]),
+            "op": change["op"],
+            "fields": json.dumps(sorted(change["fields"])) if change.get("fields") else None,
+        }
+        for change in changes
+    ]
+    # The ids of our own rows: max(id) could be another transaction's on PostgreSQL
+    if connection.dialect.insert_executemany_returning:
+        ids = connection.execute(insert(ChangeLog).returning(ChangeLog.id), rows).scalars().all()
+    else:
+        ids = [connection.execute(insert(ChangeLog), row).inserted_primary_key[0] for row in rows]
+    version = max(ids)
+    if version % TRIM_EVERY < len(changes) and version > CHANGE_LOG_RETENTION:
+        connection.execute(delete(ChangeLog).where(ChangeLog.id <= version - CHANGE_LOG_RETENTION))
+
+    # Picked up by live_updates once the transaction commits
+    session.info.setdefault("menu_changes", []).extend(changes)
+    session.info["menu_version"] = version
+
+
+def log_change(session: Session, entity: str, entity_id, op: str):
+    """Record a change that does not go through the ORM (languages, bulk deletes)"""
+    write_changes(session, [{"entity": entity, "id": entity_id, "op": op}])
+
+
+def _log_flushed_changes(session, flush_context):
+    changes = []
+    # after_flush still sees the pending/dirty state, and new rows already have ids
+    for op, objects in (("created", session.new), ("updated", session.dirty), ("deleted", session.deleted)):
+        for obj in objects:
+            change = describe_change(obj, op)
+            if change is not None:
+                changes.append(change)
+    write_changes(session, changes)
+
+
+def _discard_changes(session):
+    session.info.pop("menu_changes", None)
+    session.info.pop("menu_version", None)
+
+
+def register_session_hooks(session_factory):
+    """Log every tracked mutation made through sessions from session_factory"""
+    event.listen(session_factory, "after_flush", _log_flushed_changes)
+    event.listen(session_factory, "after_rollback", _discard_changes)
+
+
+def current_version(db: Session) -> int:
+    return db.query(func.max(ChangeLog.id)).scalar() or 0
+
+
+def _serialize(entity: str, rows) -> list:
+    schema = ENTITY_MODELS[entity][1]
+    return [schema.model_validate(row).model_dump() for row in rows]
+
+
+def snapshot(db: Session, languages: dict) -> dict:
+    """The whole menu, in the same shape as a delta"""
+    entities = {}
+    for entity, (model, _) in ENTITY_MODELS.items():
+        entities[entity] = {"upserted": _serialize(entity, db.query(model).all()), "deleted": []}
+    entities["language"] = {
+        "upserted": [{"code": code, "name": name} for code, name in languages.items()],
+        "deleted": [],
+    }
+    return entities
+
+
+def _covers(db: Session, since: int, version: int) -> bool:
+    """Whether the log still holds every change after `since`"""
+    oldest = db.query(func.min(ChangeLog.id)).scalar()
+    return not (since <= 0 or oldest is None or since < oldest - 1 or since > version)
+
+
+def _latest_ops(db: Session, since: int) -> dict:
+    """(entity, entity_id) -> last operation after `since` (last one wins)"""
+    latest = {}
+    for entity, entity_id, op in (
+        db.query(ChangeLog.entity, ChangeLog.entity_id, ChangeLog.op)
+        .filter(ChangeLog.id > since)
+        .order_by(ChangeLog.id)
+    ):
+        latest[(entity, entity_id)] = op
+    return latest
+
+
+def changes_since(db: Session, since: int, languages: dict) -> dict:
+    """Compacted changes after `since`, or a full snapshot if the log no longer covers it"""
+    version = current_version(db)
+    if not _covers(db, since, version):
+        return {"version": version, "full": True, "entities": snapshot(db, languages)}
+
+    latest = _latest_ops(db, since)
+
+    changed = {}
+    for (entity, entity_id), op in latest.items():
+        bucket = changed.setdefault(entity, {"upserted": set(), "deleted": set()})
+        bucket["deleted" if op == "deleted" else "upserted"].add(entity_id)
+
+    entities = {}
+    for entity, ids in changed.items():
+        if entity == "language":
+            upserted = [{"code": code, "name": languages[code]} for code in sorted(ids["upserted"]) if code in languages]
+            deleted = sorted(ids["deleted"] | {code for code in ids["upserted"] if code not in languages})
+        else:
+            model = ENTITY_MODELS[entity][0]
+            rows = db.query(model).filter(model.id.in_([int(i) for i in ids["upserted"]])).all() if ids["upserted"] else []
+            found = {str(row.id) for row in rows}
+            upserted = _serialize(entity, rows)
+            # Rows that vanished through a bulk delete are reported as deleted
+            deleted = sorted((ids["deleted"] | (ids["upserted"] - found)), key=int)
+            deleted = [int(i) for i in deleted]
+        entities[entity] = {"upserted": upserted, "deleted": deleted}
+
+    return {"version": version, "full": False, "entities": entities}
+
+
+def localized_changes_since(db: Session, since: int, lang: str) -> dict:
+    """Menu items and categories changed after `since`, localized to `lang`.
+
+    Translation changes in other languages are left out. With "full" the lists hold the
+    whole menu and replace it: the log no longer reaches back far enough, or languages changed.
+    """
+    version = current_version(db)
+    latest = _latest_ops(db, since) if _covers(db, since, version) else None
+    if latest is not None and any(entity == "language" for entity, _ in latest):
+        latest = None
+    if latest is None:
+        return {
+            "version": version,
+            "full": True,
+            "menu_items": {"upserted": read_path.localized_menu_item_rows(db, lang), "deleted": []},
+            "categories": {"upserted": read_path.localized_category_rows(db, lang), "deleted": []},
+        }
+
+    ids = {name: {"upserted": set(), "deleted": set()} for name in ENTITY_MODELS}
+    for (entity, entity_id), op in latest.items():
+        if entity in ids:
+            ids[entity]["deleted" if op == "deleted" else "upserted"].add(int(entity_id))
+
+    # A new or edited translation in this language changes its item's (or category's) localized row
+    item_ids = set(ids["menu_item"]["upserted"])
+    if ids["translation"]["upserted"]:
+        item_ids.update(menu_item_id for menu_item_id, in db.query(Translation.menu_item_id).filter(
+            Translation.id.in_(ids["translation"]["upserted"]), Translation.language_code == lang
+        ))
+    # The log does not keep which item a deleted translation belonged to, but that item now has
+    # no translation in this language (or a new one, logged as created), so send all such items
+    if ids["translation"]["deleted"]:
+        translated = db.query(Translation.menu_item_id).filter(Translation.language_code == lang)
+        item_ids.update(menu_item_id for menu_item_id, in db.query(MenuItem.id).filter(MenuItem.id.not_in(translated)))
+    category_ids = set(ids["category"]["upserted"])
+    if ids["category_translation"]["upserted"]:
+        category_ids.update(category_id for category_id, in db.query(CategoryTranslation.category_id).filter(
+            CategoryTranslation.id.in_(ids["category_translation"]["upserted"]), CategoryTranslation.language_code == lang
+        ))
+    if ids["category_translation"]["deleted"]:
+        translated = db.query(CategoryTranslation.category_id).filter(CategoryTranslation.language_code == lang)
+        category_ids.update(category_id for category_id, in db.query(Category.id).filter(Category.id.not_in(translated)))
+
+    items = read_path.localized_menu_item_rows(
+        db, lang, lambda query: query.filter(MenuItem.id.in_(item_ids))
+    ) if item_ids else []
+    categories = read_path.localized_category_rows(
+        db, lang, apply_filters=lambda query: query.filter(Category.id.in_(category_ids))
+    ) if category_ids else []
+    # Rows that vanished through a bulk delete are reported as deleted
+    deleted_items = ids["menu_item"]["deleted"] | (item_ids - {row["id"] for row in items})
+    deleted_categories = ids["category"]["deleted"] | (category_ids - {row["id"] for row in categories})
+    return {
+        "version": version,
+        "full": False,
+        "menu_items": {"upserted": items, "deleted": sorted(deleted_items)},
+        "categories": {"upserted": categories, "deleted": sorted(deleted_categories)},
+    }
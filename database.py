@@ -1,7 +1,11 @@
+from collections import OrderedDict
+from contextvars import ContextVar
+import os
+import threading
+
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-import os
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -10,17 +14,79 @@ load_dotenv()
 # Get database URL from environment variable, default to SQLite for MVP
 SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./menu.db")
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Database URL for additional restaurants (tenants); {tenant} is replaced by the tenant name
+TENANT_DATABASE_URL = os.getenv("TENANT_DATABASE_URL", "sqlite:///./tenants/{tenant}/menu.db")
+# How many tenant databases may be open at once before the least recently used is closed
+TENANT_MAX_OPEN_ENGINES = int(os.getenv("TENANT_MAX_OPEN_ENGINES", "16"))
+
+DEFAULT_TENANT = "default"
+
+# Tenant of the request being handled (set by tenancy.TenantMiddleware)
+current_tenant: ContextVar[str] = ContextVar("current_tenant", default=DEFAULT_TENANT)
+
+def _create_engine(url):
+    connect_args = {"check_same_thread": False} if url.startswith("sqlite") else {}
+    return create_engine(url, connect_args=connect_args)
+
+engine = _create_engine(SQLALCHEMY_DATABASE_URL)
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, info={"tenant": DEFAULT_TENANT})
 
 Base = declarative_base()
 
+# Callbacks run for every session factory, including tenants opened later
+_session_factory_hooks = []
+# tenant -> (engine, sessionmaker), most recently used last
+_tenant_factories = OrderedDict()
+_tenant_lock = threading.Lock()
+
+def on_session_factory(hook):
+    """Register hook(session_factory) for the default and every tenant session factory"""
+    _session_factory_hooks.append(hook)
+    hook(SessionLocal)
+    with _tenant_lock:
+        for _, factory in _tenant_factories.values():
+            hook(factory)
+
+def tenant_database_url(tenant: str) -> str:
+    from tenancy import get_tenant_config
+    return get_tenant_config(tenant).get("database_url") or TENANT_DATABASE_URL.format(tenant=tenant)
+
+def create_tenant_engine(tenant: str):
+    url = tenant_database_url(tenant)
+    if url.startswith("sqlite:///"):
+        os.makedirs(os.path.dirname(os.path.abspath(url[len("sqlite:///"):])), exist_ok=True)
+    return _create_engine(url)
+
+def get_session_factory(tenant: str = None):
+    """Session factory for a tenant, opening (and migrating) its database lazily"""
+    from migrations import ensure_schema
+    tenant = tenant or current_tenant.get()
+    if tenant == DEFAULT_TENANT:
+        ensure_schema(engine)
+        return SessionLocal
+
+    with _tenant_lock:
+        if tenant in _tenant_factories:
+            _tenant_factories.move_to_end(tenant)
+            return _tenant_factories[tenant][1]
+
+        tenant_engine = create_tenant_engine(tenant)
+        ensure_schema(tenant_engine)
+        factory = sessionmaker(autocommit=False, autoflush=False, bind=tenant_engine, info={"tenant": tenant})
+        for hook in _session_factory_hooks:
+            hook(factory)
+        _tenant_factories[tenant] = (tenant_engine, factory)
+
+        # Close the least recently used tenant databases
+        while len(_tenant_factories) > TENANT_MAX_OPEN_ENGINES:
+            _, (old_engine, _) = _tenant_factories.popitem(last=False)
+            old_engine.dispose()
+
+        return factory
+
 def get_db():
-    db = SessionLocal()
+    db = get_session_factory()()
     try:
         yield db
     finally:
         db.close()
-
@@ -1,5 +1,5 @@
-import { useState, useEffect } from 'react'
-import { api, type MenuItem, type Category } from '@/lib/api'
+import { useState, useEffect, useRef } from 'react'
+import { api, type LocalizedMenuItem, type LocalizedCategory, type LocalizedMenuDelta, type MenuChange } from '@/lib/api'
 import { Card, CardContent, CardDescription, CardHeader, CardTitle } from '@/components/ui/card'
 import { Button } from '@/components/ui/button'
 import { Badge } from '@/components/ui/badge'
@@ -9,31 +9,152 @@ import { Globe, AlertCircle } from 'lucide-react'
 
 type Language = 'hr' | 'en' | 'de' | 'it' | 'fr' | 'es' | 'sl' | 'cs' | 'pl' | 'hu'
 
+// Delays before contacting the server after a change, spread so open phones don't all ask at once
+const DELTA_DELAY_MS = 500
+const DELTA_JITTER_MS = 2000
+const RESYNC_JITTER_MS = 5000
+
+const jitter = (ms: number) => Math.floor(Math.random() * ms)
+
+const byId = <T extends { id: number }>(rows: T[], upserted: T[], deleted: number[]): T[] => {
+  const merged = new Map(rows.map((row) => [row.id, row]))
+  upserted.forEach((row) => merged.set(row.id, row))
+  deleted.forEach((id) => merged.delete(id))
+  return Array.from(merged.values())
+}
+
+// Item fields an update event can carry that are shown as they are (name and description
+// depend on the language and the item's translations, so those go through the delta)
+const isLocalItemField = (field: string) => field !== 'name' && field !== 'description' && !field.endsWith('_hr') && !field.endsWith('_en')
+
+// Changes that can be applied from the event alone, without asking the server
+const appliesLocally = (change: MenuChange) =>
+  change.entity === 'restaurant_info' ||
+  ((change.entity === 'menu_item' || change.entity === 'category') && change.op === 'deleted') ||
+  (change.entity === 'menu_item' && change.op === 'updated' && !!change.fields &&
+    Object.keys(change.fields).every(isLocalItemField)) ||
+  (change.entity === 'category' && change.op === 'updated' && !!change.fields &&
+    Object.keys(change.fields).every((field) => field === 'order'))
+
 interface MenuProps {
   language: Language
   onLanguageChange: (lang: Language) => void
 }
 
 export function Menu({ language, onLanguageChange }: MenuProps) {
-  const [items, setItems] = useState<MenuItem[]>([])
-  const [categories, setCategories] = useState<Category[]>([])
+  // Unavailable items are kept too, so an item marked available again can be shown without a reload
+  const [allItems, setAllItems] = useState<LocalizedMenuItem[]>([])
+  const [categories, setCategories] = useState<LocalizedCategory[]>([])
   const [supportedLanguages, setSupportedLanguages] = useState<{code: string, name: string}[]>([])
   const [loading, setLoading] = useState(true)
   const [error, setError] = useState<string | null>(null)
 
+  // The server resolves names in the selected language, so a language change reloads the menu
+  const languageRef = useRef(language)
+  languageRef.current = language
+
   useEffect(() => {
     loadItems()
+  }, [language])
+
+  // The view is counted once per page load, not on the reloads that follow changes
+  const viewRecordedRef = useRef(false)
+
+  // Menu version the shown data is known to include; changes after it are fetched as a delta
+  const versionRef = useRef<number | null>(null)
+
+  // Follow the kitchen's changes while the menu is open. Field updates and deletions in the
+  // event are applied directly; anything else fetches only the changed rows (a burst, e.g. a
+  // batch of translations, collapses into one request). Only a resync reloads everything.
+  useEffect(() => {
+    let deltaTimer: ReturnType<typeof setTimeout> | undefined
+    let resyncTimer: ReturnType<typeof setTimeout> | undefined
+    let deltaPending = false
+
+    const applyDelta = (delta: LocalizedMenuDelta) => {
+      setAllItems((rows) => byId(delta.full ? [] : rows, delta.menu_items.upserted, delta.menu_items.deleted)
+        .sort((a, b) => a.id - b.id))
+      setCategories((rows) => byId(delta.full ? [] : rows, delta.categories.upserted, delta.categories.deleted)
+        .sort((a, b) => a.order - b.order || a.id - b.id))
+      versionRef.current = delta.version
+    }
+
+    const fetchDelta = async () => {
+      const since = versionRef.current ?? 0
+      try {
+        applyDelta(await api.getLocalizedChanges(since, languageRef.current))
+      } catch (error) {
+        console.error('Failed to update menu:', error)
+      } finally {
+        deltaPending = false
+      }
+    }
+
+    const applyChanges = (changes: MenuChange[]) => {
+      changes.forEach((change) => {
+        if (change.entity === 'menu_item') {
+          setAllItems((rows) => change.op === 'deleted'
+            ? rows.filter((item) => item.id !== change.id)
+            : rows.map((item) => item.id === change.id ? { ...item, ...change.fields } as LocalizedMenuItem : item))
+        } else if (change.entity === 'category') {
+          setCategories((rows) => change.op === 'deleted'
+            ? rows.filter((category) => category.id !== change.id)
+            : rows.map((category) => category.id === change.id ? { ...category, ...change.fields } as LocalizedCategory : category)
+                .sort((a, b) => a.order - b.order || a.id - b.id))
+        }
+      })
+    }
+
+    const unsubscribe = api.subscribeToMenuChanges((event) => {
+      if (event.hello) {
+        // Connected before the first load finished: that load includes this version
+        if (versionRef.current === null) versionRef.current = event.version
+        return
+      }
+      if (event.resync) {
+        clearTimeout(resyncTimer)
+        resyncTimer = setTimeout(() => {
+          versionRef.current = event.version
+          loadItems()
+        }, jitter(RESYNC_JITTER_MS))
+        return
+      }
+      const changes = event.changes ?? []
+      if (!deltaPending && changes.every(appliesLocally)) {
+        applyChanges(changes)
+        versionRef.current = event.version
+        return
+      }
+      // The delta covers this event and everything before it
+      if (!deltaPending) {
+        deltaPending = true
+        deltaTimer = setTimeout(fetchDelta, DELTA_DELAY_MS + jitter(DELTA_JITTER_MS))
+      }
+    })
+    return () => {
+      clearTimeout(deltaTimer)
+      clearTimeout(resyncTimer)
+      unsubscribe()
+    }
   }, [])
 
   const loadItems = async () => {
     try {
       const [itemsData, categoriesData, languagesData] = await Promise.all([
-        api.getMenuItemsWithTranslations(),
-        api.getCategoriesWithTranslations(),
+        api.getLocalizedMenuItems(languageRef.current),
+        api.getLocalizedCategories(languageRef.current),
         fetch('http://localhost:8000/api/supported-languages').then(r => r.json())
       ])
-      setItems(itemsData.filter(item => item.is_available))
+      setAllItems(itemsData)
       setCategories(categoriesData)
+      if (!viewRecordedRef.current) {
+        viewRecordedRef.current = true
+        api.recordMenuView(
+          languageRef.current,
+          itemsData.filter(item => item.is_available).map(item => item.id),
+          categoriesData.map(category => category.id)
+        ).catch((error) => console.error('Failed to record menu view:', error))
+      }
       setSupportedLanguages(languagesData.languages || [])
       setLoading(false)
       setError(null)
@@ -44,38 +165,7 @@ export function Menu({ language, onLanguageChange }: MenuProps) {
     }
   }
 
-  const getTranslatedCategoryName = (category: Category): string => {
-    // If Croatian, return Croatian name
-    if (language === 'hr') {
-      return category.name
-    }
-
-    // Try to find translation for the selected language
-    const translation = category.translations?.find(t => t.language_code === language)
-    if (translation) {
-      return translation.name
-    }
-
-    // Fallback to Croatian if no translation exists
-    return category.name
-  }
-
-  const getTranslatedText = (item: MenuItem, field: 'name' | 'description'): string => {
-    // If Croatian, return Croatian text
-    if (language === 'hr') {
-      return field === 'name' ? item.name_hr : (item.description_hr || '')
-    }
-
-    // Try to find translation for the selected language
-    const translation = item.translations?.find(t => t.language_code === language)
-    if (translation) {
-      return field === 'name' ? translation.name : (translation.description || '')
-    }
-
-    // Fallback to Croatian if no translation exists
-    return field === 'name' ? item.name_hr : (item.description_hr || '')
-  }
-
+  const items = allItems.filter(item => item.is_available)
   const uncategorized = items.filter(item => !item.category || item.category === '')
 
   const getLabel = (hr: string, en: string, de: string, it: string, fr: string) => {
@@ -89,7 +179,7 @@ export function Menu({ language, onLanguageChange }: MenuProps) {
     }
   }
 
-  const getAllergenBadges = (item: MenuItem) => {
+  const getAllergenBadges = (item: LocalizedMenuItem) => {
     const badges: Array<{ label: string; emoji: string; className: string }> = []
     if (item.is_vegetarian) badges.push({ 
       label: getLabel('Vegetarijansko', 'Vegetarian', 'Vegetarisch', 'Vegetariano', 'Végétarien'), 
@@ -291,7 +381,7 @@ export function Menu({ language, onLanguageChange }: MenuProps) {
                   {String(idx + 1).padStart(2, '0')}
                 </div>
                 <h2 className="text-3xl font-bold text-amber-900 border-b border-white pb-4 flex-1 pt-2">
-                  {getTranslatedCategoryName(category)}
+                  {category.display_name}
                 </h2>
               </div>
               <div className="grid grid-cols-1 md:grid-cols-2 lg:grid-cols-3 gap-6">
@@ -304,8 +394,12 @@ export function Menu({ language, onLanguageChange }: MenuProps) {
                         {item.image_path ? (
                           <img
                             src={`http://localhost:8000${item.image_path}`}
-                            alt={getTranslatedText(item, 'name')}
+                            alt={item.name}
+                            width={item.image_width ?? undefined}
+                            height={item.image_height ?? undefined}
+                            loading="lazy"
                             className="w-full h-48 object-cover"
+                            style={item.image_placeholder ? { backgroundImage: `url(${item.image_placeholder})`, backgroundSize: 'cover' } : undefined}
                           />
                         ) : (
                           <div className="w-full h-48 bg-muted flex items-center justify-center">
@@ -314,11 +408,11 @@ export function Menu({ language, onLanguageChange }: MenuProps) {
                         )}
                         <CardHeader>
                           <CardTitle className="text-lg text-amber-900">
-                            {getTranslatedText(item, 'name')}
+                            {item.name}
                           </CardTitle>
-                          {getTranslatedText(item, 'description') && (
+                          {item.description && (
                             <CardDescription className="text-amber-700">
-                              {getTranslatedText(item, 'description')}
+                              {item.description}
                             </CardDescription>
                           )}
                           {allergenBadges.length > 0 && (
@@ -364,8 +458,12 @@ export function Menu({ language, onLanguageChange }: MenuProps) {
                       {item.image_path ? (
                         <img
                           src={`http://localhost:8000${item.image_path}`}
-                          alt={getTranslatedText(item, 'name')}
+                          alt={item.name}
+                          width={item.image_width ?? undefined}
+                          height={item.image_height ?? undefined}
+                          loading="lazy"
                           className="w-full h-48 object-cover"
+                          style={item.image_placeholder ? { backgroundImage: `url(${item.image_placeholder})`, backgroundSize: 'cover' } : undefined}
                         />
                       ) : (
                         <div className="w-full h-48 bg-muted flex items-center justify-center">
@@ -374,11 +472,11 @@ export function Menu({ language, onLanguageChange }: MenuProps) {
                       )}
                       <CardHeader>
                         <CardTitle className="text-lg text-amber-900">
-                          {getTranslatedText(item, 'name')}
+                          {item.name}
                         </CardTitle>
-                        {getTranslatedText(item, 'description') && (
+                        {item.description && (
                           <CardDescription className="text-amber-700">
-                            {getTranslatedText(item, 'description')}
+                            {item.description}
                           </CardDescription>
                         )}
                         {allergenBadges.length > 0 && (
@@ -6,9 +6,15 @@ import { api } from '@/lib/api'
 export function QRCodePage() {
   const [qrData, setQrData] = useState<{ qr_code: string; menu_url: string } | null>(null)
   const [loading, setLoading] = useState(true)
+  const [languages, setLanguages] = useState<{ code: string; name: string }[]>([])
+  const [printLanguage, setPrintLanguage] = useState('hr')
 
   useEffect(() => {
     loadQRCode()
+    fetch('http://localhost:8000/api/supported-languages')
+      .then(r => r.json())
+      .then(data => setLanguages(data.languages || []))
+      .catch(error => console.error('Failed to load languages:', error))
   }, [])
 
   const loadQRCode = async () => {
@@ -68,6 +74,38 @@ export function QRCodePage() {
           </Button>
         </CardContent>
       </Card>
+
+      <Card className="w-full max-w-md mx-auto">
+        <CardHeader>
+          <CardTitle>Jelovnik za ispis</CardTitle>
+          <CardDescription>
+            Preuzmite jelovnik na odabranom jeziku kao PDF za ispis ili kao kartice za stolove.
+          </CardDescription>
+        </CardHeader>
+        <CardContent className="space-y-4">
+          <select
+            className="w-full rounded-md border bg-background px-3 py-2 text-sm"
+            value={printLanguage}
+            onChange={(e) => setPrintLanguage(e.target.value)}
+          >
+            <option value="hr">Hrvatski</option>
+            {languages.map(lang => (
+              <option key={lang.code} value={lang.code}>{lang.name}</option>
+            ))}
+          </select>
+          <div className="grid grid-cols-3 gap-2">
+            <Button variant="outline" onClick={() => window.open(api.printMenuUrl(printLanguage, 'a4'))}>
+              A4 (PDF)
+            </Button>
+            <Button variant="outline" onClick={() => window.open(api.printMenuUrl(printLanguage, 'a5'))}>
+              A5 (PDF)
+            </Button>
+            <Button variant="outline" onClick={() => window.open(api.printMenuUrl(printLanguage, 'card'))}>
+              Kartice (PDF)
+            </Button>
+          </div>
+        </CardContent>
+      </Card>
     </div>
   )
 }
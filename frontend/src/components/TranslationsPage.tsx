@@ -17,6 +17,7 @@ import { Badge } from '@/components/ui/badge'
 import { Languages, Plus, Edit2, Trash2, Loader2, Sparkles, CheckCircle2, AlertCircle, Flag } from 'lucide-react'
 import { toast } from 'sonner'
 import { Progress } from '@/components/ui/progress'
+import { api } from '@/lib/api'
 
 interface Translation {
   id: number
@@ -51,6 +52,7 @@ export function TranslationsPage() {
   const [showBatchDialog, setShowBatchDialog] = useState(false)
   const [selectedLanguages, setSelectedLanguages] = useState<string[]>([])
   const [generating, setGenerating] = useState(false)
+  const [generationProgress, setGenerationProgress] = useState({ done: 0, total: 0 })
   const [editName, setEditName] = useState('')
   const [editDescription, setEditDescription] = useState('')
   const [showFlags, setShowFlags] = useState(true)
@@ -88,24 +90,43 @@ export function TranslationsPage() {
 
     try {
       setGenerating(true)
-      const response = await fetch(`http://localhost:8000/api/translations/generate/${selectedItem.id}`, {
-        method: 'POST',
-        headers: {
-          'Content-Type': 'application/json',
-        },
-        body: JSON.stringify(selectedLanguages)
+      setGenerationProgress({ done: 0, total: selectedLanguages.length })
+      let generated = 0
+      const errors: string[] = []
+      const itemId = selectedItem.id
+
+      // Each language shows up as soon as it is translated (and is already saved)
+      await api.streamItemTranslations(itemId, selectedLanguages, (message) => {
+        if (message.type === 'done') return
+        setGenerationProgress((progress) => ({ ...progress, done: progress.done + 1 }))
+        if (message.type === 'error') {
+          errors.push(message.error)
+          return
+        }
+        generated += 1
+        const translation: Translation = {
+          id: message.id,
+          menu_item_id: message.menu_item_id,
+          language_code: message.language_code,
+          language_name: message.language_name,
+          name: message.name,
+          description: message.description ?? '',
+          is_ai_generated: message.is_ai_generated,
+        }
+        setMenuItems((items) => items.map((item) =>
+          item.id === itemId ? { ...item, translations: [...item.translations, translation] } : item
+        ))
       })
 
-      const data = await response.json()
-      
-      if (data.success) {
-        toast.success(`Generirano ${data.translations.length} prijevoda`)
-        fetchData()
+      if (generated > 0) {
+        toast.success(`Generirano ${generated} prijevoda`)
         setShowGenerateDialog(false)
         setSelectedLanguages([])
-      } else {
-        toast.error(data.errors.join(', '))
       }
+      if (errors.length > 0) {
+        toast.error(errors.join(', '))
+      }
+      fetchData()
     } catch (error) {
       console.error('Error generating translations:', error)
       toast.error("Neuspješno generiranje prijevoda")
@@ -515,7 +536,7 @@ export function TranslationsPage() {
               {generating ? (
                 <>
                   <Loader2 className="h-4 w-4 animate-spin" />
-                  Generiranje...
+                  Generiranje... ({generationProgress.done}/{generationProgress.total})
                 </>
               ) : (
                 <>
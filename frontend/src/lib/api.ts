@@ -30,6 +30,9 @@ export interface MenuItem {
   price: number
   category: string | null
   image_path: string | null
+  image_width?: number | null
+  image_height?: number | null
+  image_placeholder?: string | null
   is_available: boolean
   is_vegetarian: boolean
   is_vegan: boolean
@@ -40,9 +43,16 @@ export interface MenuItem {
   contains_shellfish: boolean
   contains_eggs: boolean
   is_spicy: boolean
+  allergen_mask?: number
   translations?: Translation[]
 }
 
+// A menu item in one language (?lang=): name and description already fall back to Croatian
+export type LocalizedMenuItem = Omit<MenuItem, 'name_hr' | 'name_en' | 'description_hr' | 'description_en' | 'translations'> & {
+  name: string
+  description: string | null
+}
+
 export interface CategoryTranslation {
   id: number
   category_id: number
@@ -59,6 +69,14 @@ export interface Category {
   translations?: CategoryTranslation[]
 }
 
+// A category in one language (?lang=): name stays the Croatian key menu items refer to
+export interface LocalizedCategory {
+  id: number
+  name: string
+  order: number
+  display_name: string
+}
+
 export interface Analytics {
   total_items: number
   available_items: number
@@ -78,6 +96,73 @@ export interface Analytics {
   total_categories: number
 }
 
+// Customer menu views from /api/analytics/views (one point per day or hour, views per language code)
+export interface ViewPoint {
+  date: string
+  views: number
+  [language: string]: string | number
+}
+
+export interface ViewAnalytics {
+  bucket: 'day' | 'hour'
+  since: string
+  languages: string[]
+  series: ViewPoint[]
+  top_items: { id: number; name: string; views: number }[]
+  top_categories: { id: number; name: string; views: number }[]
+}
+
+export interface MenuChange {
+  entity: string
+  id: number | string
+  op: 'created' | 'updated' | 'deleted'
+  fields?: Record<string, unknown>
+}
+
+export interface MenuChangeEvent {
+  version: number
+  changes?: MenuChange[]
+  hello?: boolean
+  resync?: boolean
+}
+
+// GET /api/changes?lang=: changed rows in one language; with full they replace the whole menu
+export interface LocalizedMenuDelta {
+  version: number
+  full: boolean
+  menu_items: { upserted: LocalizedMenuItem[]; deleted: number[] }
+  categories: { upserted: LocalizedCategory[]; deleted: number[] }
+}
+
+export type TranslationStreamMessage<T> =
+  | ({ type: 'translation' } & T)
+  | { type: 'error'; language_code: string; error: string }
+  | { type: 'done'; generated: number; errors: number }
+
+// POST the language codes and call onMessage for every NDJSON line as it arrives
+async function streamNdjson<T>(url: string, languageCodes: string[], onMessage: (message: T) => void): Promise<void> {
+  const response = await fetch(url, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify(languageCodes),
+  })
+  if (!response.ok || !response.body) {
+    throw new Error(`Request failed with status ${response.status}`)
+  }
+  const reader = response.body.getReader()
+  const decoder = new TextDecoder()
+  let buffer = ''
+  for (;;) {
+    const { done, value } = await reader.read()
+    if (done) break
+    buffer += decoder.decode(value, { stream: true })
+    const lines = buffer.split('\n')
+    buffer = lines.pop() ?? ''
+    lines.filter((line) => line.trim()).forEach((line) => onMessage(JSON.parse(line)))
+  }
+  if (buffer.trim()) onMessage(JSON.parse(buffer))
+}
+
 export const api = {
   getMenuItems: async (): Promise<MenuItem[]> => {
     const response = await axios.get<MenuItem[]>(`${API_BASE_URL}/api/menu-items`)
@@ -88,6 +173,25 @@ export const api = {
     const response = await axios.get<MenuItem[]>(`${API_BASE_URL}/api/menu-items-with-translations`)
     return response.data
   },
+
+  getLocalizedMenuItems: async (lang: string): Promise<LocalizedMenuItem[]> => {
+    const response = await axios.get<LocalizedMenuItem[]>(`${API_BASE_URL}/api/menu-items-with-translations`, { params: { lang } })
+    return response.data
+  },
+  
+  getLocalizedChanges: async (since: number, lang: string): Promise<LocalizedMenuDelta> => {
+    const response = await axios.get<LocalizedMenuDelta>(`${API_BASE_URL}/api/changes`, { params: { since, lang } })
+    return response.data
+  },
+  
+  // Live menu updates over Server-Sent Events. Returns an unsubscribe function.
+  subscribeToMenuChanges: (onChange: (event: MenuChangeEvent) => void): (() => void) => {
+    const source = new EventSource(`${API_BASE_URL}/api/menu/events`)
+    source.addEventListener('hello', (e) => onChange({ ...JSON.parse((e as MessageEvent).data), hello: true }))
+    source.addEventListener('change', (e) => onChange(JSON.parse((e as MessageEvent).data)))
+    source.addEventListener('resync', (e) => onChange({ ...JSON.parse((e as MessageEvent).data), resync: true }))
+    return () => source.close()
+  },
   
   createMenuItem: async (data: FormData): Promise<MenuItem> => {
     const response = await axios.post<MenuItem>(`${API_BASE_URL}/api/menu-items`, data, {
@@ -127,6 +231,16 @@ export const api = {
     return response.data
   },
 
+  // Counts one customer menu view; sent once per page load, never on data reloads
+  recordMenuView: async (lang: string, items: number[], categories: number[]): Promise<void> => {
+    await axios.post(`${API_BASE_URL}/api/analytics/views`, { lang, items, categories })
+  },
+
+  getViewAnalytics: async (days: number, bucket: 'day' | 'hour' = 'day'): Promise<ViewAnalytics> => {
+    const response = await axios.get<ViewAnalytics>(`${API_BASE_URL}/api/analytics/views`, { params: { days, bucket } })
+    return response.data
+  },
+
   getCategories: async (): Promise<string[]> => {
     const response = await axios.get<{ categories: string[]; categories_with_ids: Category[] }>(`${API_BASE_URL}/api/categories`)
     return response.data.categories
@@ -142,6 +256,11 @@ export const api = {
     return response.data
   },
 
+  getLocalizedCategories: async (lang: string): Promise<LocalizedCategory[]> => {
+    const response = await axios.get<LocalizedCategory[]>(`${API_BASE_URL}/api/categories-with-translations`, { params: { lang } })
+    return response.data
+  },
+
   getCategoryByName: async (name: string): Promise<Category> => {
     const response = await axios.get<Category>(`${API_BASE_URL}/api/categories/by-name/${encodeURIComponent(name)}`)
     return response.data
@@ -165,6 +284,25 @@ export const api = {
     await axios.put(`${API_BASE_URL}/api/categories/reorder`, categories)
   },
 
+  // Generate translations, reporting each language as soon as it is done
+  streamItemTranslations: (
+    itemId: number,
+    languageCodes: string[],
+    onMessage: (message: TranslationStreamMessage<Translation>) => void
+  ): Promise<void> =>
+    streamNdjson(`${API_BASE_URL}/api/translations/generate/${itemId}/stream`, languageCodes, onMessage),
+
+  streamCategoryTranslations: (
+    categoryId: number,
+    languageCodes: string[],
+    onMessage: (message: TranslationStreamMessage<CategoryTranslation>) => void
+  ): Promise<void> =>
+    streamNdjson(`${API_BASE_URL}/api/category-translations/generate/${categoryId}/stream`, languageCodes, onMessage),
+
+  // Print-ready menu for a language: a PDF, or the first page as a PNG
+  printMenuUrl: (lang: string, layout: 'a4' | 'a5' | 'card' = 'a4', format: 'pdf' | 'png' = 'pdf'): string =>
+    `${API_BASE_URL}/api/print-menu?lang=${encodeURIComponent(lang)}&layout=${layout}&format=${format}`,
+
   getQrCode: async (): Promise<{ qr_code: string; menu_url: string }> => {
     const response = await axios.get<{ qr_code: string; menu_url: string }>(`${API_BASE_URL}/api/qr-code`)
     return response.data
@@ -0,0 +1,135 @@
+"""
+Idempotency-Key support for the translation generate endpoints.
+
+A client that sends the same Idempotency-Key header again, after a double
+click or a retry following a proxy timeout, gets the stored response of
+the first request instead of a second run that pays for the same OpenAI
+calls. Keys are stored per tenant in idempotency_keys for
+IDEMPOTENCY_TTL_HOURS.
+
+- same key, first request still running in this process: wait for it and
+  return its response
+- same key, still running in another process: 409, retry later
+- same key, different request (path, query or body): 422
+- the first request fails with an exception: the key is released, so a
+  retry runs again
+"""
+import asyncio
+import hashlib
+import json
+import os
+from datetime import datetime, timedelta
+
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response
+from sqlalchemy.exc import IntegrityError
+
+from database import current_tenant, get_session_factory
+
+IDEMPOTENCY_TTL_HOURS = int(os.getenv("IDEMPOTENCY_TTL_HOURS", "24"))
+MAX_KEY_LENGTH = 255
+
+# (tenant, key) -> (fingerprint, future of (status_code, body)) for requests running in this process
+_in_flight = {}
+
+
+def fingerprint(request, body=None) -> str:
+    """Hash identifying a request: method, path, query string and (parsed) body"""
+    payload = json.dumps(
+        [request.method, request.url.path, sorted(request.query_params.multi_items()), body],
+        ensure_ascii=False, default=str
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _claim(key: str, request_fingerprint: str):
+    """Reserve the key; returns None if claimed, else the stored row as (fingerprint, status_code, body)"""
+    from models import IdempotencyKey
+    db = get_session_factory()()
+    try:
+        db.query(IdempotencyKey).filter(
+            IdempotencyKey.created_at < datetime.utcnow() - timedelta(hours=IDEMPOTENCY_TTL_HOURS)
+        ).delete(synchronize_session=False)
+        db.add(IdempotencyKey(key=key, fingerprint=request_fingerprint))
+        try:
+            db.commit()
+            return None
+        except IntegrityError:
+            db.rollback()
+        row = db.get(IdempotencyKey, key)
+        return (row.fingerprint, row.status_code, row.body) if row else None
+    finally:
+        db.close()
+
+
+def _store(key: str, status_code: int, body: str):
+    from models import IdempotencyKey
+    db = get_session_factory()()
+    try:
+        db.query(IdempotencyKey).filter(IdempotencyKey.key == key).update({"status_code": status_code, "body": body})
+        db.commit()
+    finally:
+        db.close()
+
+
+def _release(key: str):
+    from models import IdempotencyKey
+    db = get_session_factory()()
+    try:
+        db.query(IdempotencyKey).filter(IdempotencyKey.key == key).delete()
+        db.commit()
+    finally:
+        db.close()
+
+
+def _replay(status_code: int, body: str) -> Response:
+    return Response(content=body, status_code=status_code, media_type="application/json",
+                    headers={"Idempotent-Replayed": "true"})
+
+
+async def idempotent(key, request_fingerprint: str, handler) -> Response:
+    """Run `await handler()` (which returns a JSON response) once per Idempotency-Key"""
+    if not key:
+        return await handler()
+    if len(key) > MAX_KEY_LENGTH:
+        raise HTTPException(status_code=400, detail="Idempotency-Key je predug")
+
+    local_key = (current_tenant.get(), key)
+    running = _in_flight.get(local_key)
+    if running is not None:
+        running_fingerprint, future = running
+        if running_fingerprint != request_fingerprint:
+            raise HTTPException(status_code=422, detail="Idempotency-Key je već korišten za drugi zahtjev")
+        return _replay(*await asyncio.shield(future))
+
+    future = asyncio.get_running_loop().create_future()
+    _in_flight[local_key] = (request_fingerprint, future)
+    try:
+        stored = await run_in_threadpool(_claim, key, request_fingerprint)
+        if stored is not None:
+            stored_fingerprint, status_code, body = stored
+            if stored_fingerprint != request_fingerprint:
+                raise HTTPException(status_code=422, detail="Idempotency-Key je već korišten za drugi zahtjev")
+            if status_code is None:
+                raise HTTPException(status_code=409, detail="Zahtjev s ovim Idempotency-Key se još obrađuje")
+            future.set_result((status_code, body))
+            return _replay(status_code, body)
+
+        try:
+            response = await handler()
+        except BaseException:
+            await run_in_threadpool(_release, key)
+            raise
+        body = response.body.decode("utf-8")
+        await run_in_threadpool(_store, key, response.status_code, body)
+        future.set_result((response.status_code, body))
+        return response
+    except BaseException as e:
+        if not future.done():
+            future.set_exception(e)
+            # Waiting duplicates see the exception; nobody else has to retrieve it
+            future.exception()
+        raise
+    finally:
+        _in_flight.pop(local_key, None)
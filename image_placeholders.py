@@ -0,0 +1,86 @@
+"""
+Low-quality image placeholders for dish photos.
+
+For every MenuItem.image_path we store the intrinsic width/height and a tiny
+blurred WebP (about PLACEHOLDER_SIZE px on the long side) as a data URI, a
+few hundred bytes. The menu endpoints return them with the item, so the
+customer page can lay out every card at the right aspect ratio and paint the
+placeholder immediately, before the full photo has downloaded.
+
+Placeholders are computed when an image is uploaded. Backfill existing
+images with:
+    python image_placeholders.py [--tenant <name>] [--force]
+"""
+import argparse
+import base64
+import os
+from io import BytesIO
+from typing import Optional
+
+from metrics import IMAGE_PROCESSING
+
+PLACEHOLDER_SIZE = int(os.getenv("IMAGE_PLACEHOLDER_SIZE", "20"))
+PLACEHOLDER_QUALITY = 40
+PLACEHOLDER_BLUR = 1.0
+
+
+def compute_placeholder(file_path: str) -> Optional[tuple]:
+    """(width, height, data URI) of an image file, or None if it cannot be read"""
+    # Pillow is only loaded when an image is processed
+    from PIL import Image, ImageFilter, ImageOps
+    try:
+        with IMAGE_PROCESSING.labels("placeholder").time(), Image.open(file_path) as img:
+            # Phones store rotated photos with an EXIF orientation; use the size as displayed
+            orientation = img.getexif().get(0x0112, 1)
+            width, height = (img.height, img.width) if orientation in (5, 6, 7, 8) else img.size
+            # JPEGs can be decoded at 1/8 scale, which is all we need
+            img.draft("RGB", (PLACEHOLDER_SIZE * 4, PLACEHOLDER_SIZE * 4))
+            small = ImageOps.exif_transpose(img)
+            small.thumbnail((PLACEHOLDER_SIZE, PLACEHOLDER_SIZE))
+            if small.mode not in ("RGB", "RGBA"):
+                small = small.convert("RGBA" if "A" in small.getbands() else "RGB")
+            small = small.filter(ImageFilter.GaussianBlur(PLACEHOLDER_BLUR))
+            buffer = BytesIO()
+            small.save(buffer, format="WEBP", quality=PLACEHOLDER_QUALITY)
+    except (OSError, ValueError):
+        return None
+    return width, height, "data:image/webp;base64," + base64.b64encode(buffer.getvalue()).decode("ascii")
+
+
+def apply_placeholder(menu_item) -> bool:
+    """Fill the item's image size and placeholder from its image file"""
+    result = compute_placeholder(menu_item.image_path.lstrip("/")) if menu_item.image_path else None
+    menu_item.image_width, menu_item.image_height, menu_item.image_placeholder = result or (None, None, None)
+    return result is not None
+
+
+def backfill(db, force: bool = False) -> dict:
+    """Compute placeholders for items with an image but without a placeholder (all with force)"""
+    from models import MenuItem
+    query = db.query(MenuItem).filter(MenuItem.image_path.isnot(None))
+    if not force:
+        query = query.filter(MenuItem.image_placeholder.is_(None))
+    done = failed = 0
+    for menu_item in query.all():
+        if apply_placeholder(menu_item):
+            done += 1
+        else:
+            failed += 1
+    db.commit()
+    return {"updated": done, "missing_or_unreadable": failed}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compute image placeholders for existing menu items")
+    parser.add_argument("--tenant", help="restaurant (tenant) to backfill")
+    parser.add_argument("--force", action="store_true", help="recompute placeholders that already exist")
+    args = parser.parse_args()
+
+    from database import get_session_factory, current_tenant, DEFAULT_TENANT
+    current_tenant.set(args.tenant or DEFAULT_TENANT)
+    db = get_session_factory()()
+    try:
+        result = backfill(db, force=args.force)
+    finally:
+        db.close()
+    print(f"✅ {result['updated']} placeholders computed, {result['missing_or_unreadable']} images missing or unreadable")
@@ -0,0 +1,178 @@
+"""
+Live menu change push to connected customer devices (Server-Sent Events).
+
+Mutations recorded by change_log during a flush are broadcast as one compact
+event per committed transaction, tagged with the resulting menu version:
+
+    {"version": 42, "changes": [{"entity": "menu_item", "id": 7, "op": "updated",
+                                 "fields": {"is_available": false}}]}
+
+Each subscriber owns a small bounded queue. A client that cannot keep up does
+not grow memory on the server: its queue is cleared and it receives a single
+"resync" event telling it to refetch the menu. Idle connections only cost a
+heartbeat comment every HEARTBEAT_INTERVAL seconds.
+
+Every commit also invalidates the "menu" topic on the cache bus. Other
+worker processes then read the new change log entries and push them to
+their own subscribers (without field values, which the log does not keep).
+"""
+import asyncio
+import json
+import os
+from typing import Optional
+
+from sqlalchemy import event
+
+from cache_bus import bus
+from database import get_session_factory
+from models import ChangeLog
+
+HEARTBEAT_INTERVAL = float(os.getenv("LIVE_UPDATES_HEARTBEAT", "20"))
+SUBSCRIBER_QUEUE_SIZE = int(os.getenv("LIVE_UPDATES_QUEUE_SIZE", "32"))
+MAX_SUBSCRIBERS = int(os.getenv("LIVE_UPDATES_MAX_CLIENTS", "2000"))
+
+
+class Subscriber:
+    """A single connected client"""
+
+    def __init__(self, queue_size: int):
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.dropped = 0
+
+    def offer(self, message):
+        """Enqueue without ever blocking the publisher"""
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # Slow consumer: throw away the backlog and ask it to refetch instead.
+            # The refetch covers everything up to and including this version.
+            self.dropped += 1
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait({"version": message["version"], "resync": True})
+
+
+class MenuChangeBroadcaster:
+    """Fan-out of committed menu changes to SSE subscribers in this process"""
+
+    def __init__(self, queue_size: int = SUBSCRIBER_QUEUE_SIZE, max_subscribers: int = MAX_SUBSCRIBERS):
+        self.queue_size = queue_size
+        self.max_subscribers = max_subscribers
+        self.subscribers = set()
+        self.version = None  # Loaded from the change log on first use
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def subscribe(self) -> Optional[Subscriber]:
+        if len(self.subscribers) >= self.max_subscribers:
+            return None
+        self.loop = asyncio.get_running_loop()
+        subscriber = Subscriber(self.queue_size)
+        self.subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        self.subscribers.discard(subscriber)
+
+    def reset_version(self, version: int):
+        self.version = version
+
+    def publish(self, changes: list, version: int):
+        """Push the changes committed as menu `version` to every subscriber"""
+        if not changes:
+            return
+        self.version = max(self.version or 0, version)
+        message = {"version": version, "changes": changes}
+        if not self.subscribers or self.loop is None:
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self.loop:
+            self._fan_out(message)
+        elif not self.loop.is_closed():
+            # Commits from worker threads (e.g. sync endpoints) hop onto the loop
+            self.loop.call_soon_threadsafe(self._fan_out, message)
+
+    def _fan_out(self, message):
+        for subscriber in list(self.subscribers):
+            subscriber.offer(message)
+
+    async def stream(self, subscriber: Subscriber, last_version: Optional[int] = None):
+        """Yield SSE frames for one subscriber until it disconnects"""
+        try:
+            # Tell the client the current version; a reconnecting client that
+            # missed events (or a server restart) must refetch.
+            yield self._frame("hello", {"version": self.version}, self.version)
+            if last_version is not None and last_version != self.version:
+                yield self._frame("resync", {"version": self.version}, self.version)
+            while True:
+                try:
+                    message = await asyncio.wait_for(subscriber.queue.get(), timeout=HEARTBEAT_INTERVAL)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                if message.get("resync"):
+                    yield self._frame("resync", {"version": message["version"]}, message["version"])
+                else:
+                    yield self._frame("change", message, message["version"])
+        finally:
+            self.unsubscribe(subscriber)
+
+    @staticmethod
+    def _frame(event_name: str, data: dict, event_id: int) -> str:
+        payload = json.dumps(data, ensure_ascii=False, separators=(",", ":"), default=str)
+        return f"id: {event_id}\nevent: {event_name}\ndata: {payload}\n\n"
+
+
+# One broadcaster per tenant, so restaurants never see each other's changes
+_broadcasters = {}
+
+
+def get_broadcaster(tenant: str) -> MenuChangeBroadcaster:
+    broadcaster = _broadcasters.get(tenant)
+    if broadcaster is None:
+        broadcaster = _broadcasters.setdefault(tenant, MenuChangeBroadcaster())
+    return broadcaster
+
+
+def _publish_changes(session):
+    # Collected by change_log while flushing, published only once committed
+    changes = session.info.pop("menu_changes", None)
+    version = session.info.pop("menu_version", None)
+    if changes:
+        tenant = session.info.get("tenant")
+        get_broadcaster(tenant).publish(changes, version)
+        bus.invalidate("menu", tenant)
+
+
+def catch_up(tenant: str):
+    """Push changes committed by other processes to this process's subscribers"""
+    broadcaster = _broadcasters.get(tenant)
+    if broadcaster is None or broadcaster.version is None:
+        return
+    if not broadcaster.subscribers:
+        # Loaded again from the change log when the next client connects
+        broadcaster.version = None
+        return
+    db = get_session_factory(tenant)()
+    try:
+        rows = (
+            db.query(ChangeLog.id, ChangeLog.entity, ChangeLog.entity_id, ChangeLog.op)
+            .filter(ChangeLog.id > broadcaster.version)
+            .order_by(ChangeLog.id)
+            .all()
+        )
+    finally:
+        db.close()
+    if rows:
+        changes = [
+            {"entity": entity, "id": int(entity_id) if entity_id.isdigit() else entity_id, "op": op}
+            for _, entity, entity_id, op in rows
+        ]
+        broadcaster.publish(changes, rows[-1][0])
+
+
+def register_session_hooks(session_factory):
+    """Broadcast changes whenever a session created by session_factory commits"""
+    event.listen(session_factory, "after_commit", _publish_changes)
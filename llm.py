@@ -0,0 +1,313 @@
+"""
+Shared client-side governor for all OpenAI calls.
+
+Every translation goes through LLMGovernor.chat_json(), which
+
+- waits on token buckets for requests/minute and tokens/minute, so a batch
+  runs close to the provider limits without tripping them,
+- retries rate limits, timeouts and 5xx errors with jittered exponential
+  backoff, honoring Retry-After when the provider sends it,
+- adapts concurrency to the observed 429 rate (halved on a rate limit,
+  grown by one slot after a window of clean calls); a burst of 429s halves
+  it once, as only calls started after the last decrease can decrease it,
+- refuses new calls once the daily token budget is spent,
+- records prompt, cached and completion tokens of every call in the
+  UsageJob passed to it, so translation jobs can be costed.
+
+The limits are per worker process; divide the provider limits by the
+number of workers when configuring them.
+"""
+import asyncio
+import json
+import os
+import random
+import time
+import uuid
+from datetime import date
+from typing import Optional
+
+import metrics
+
+LLM_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+REQUESTS_PER_MINUTE = int(os.getenv("OPENAI_RPM", "500"))
+TOKENS_PER_MINUTE = int(os.getenv("OPENAI_TPM", "200000"))
+MAX_CONCURRENCY = int(os.getenv("OPENAI_MAX_CONCURRENCY", "8"))
+DAILY_TOKEN_BUDGET = int(os.getenv("OPENAI_DAILY_TOKEN_BUDGET", "0"))  # 0 = unlimited
+MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "6"))
+# USD per million tokens, for cost estimates (defaults: gpt-4o-mini)
+PRICE_PROMPT = float(os.getenv("OPENAI_PRICE_PROMPT", "0.15"))
+PRICE_CACHED = float(os.getenv("OPENAI_PRICE_CACHED", "0.075"))
+PRICE_COMPLETION = float(os.getenv("OPENAI_PRICE_COMPLETION", "0.60"))
+
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 60.0
+# Rough completion size used to reserve tokens before the call
+EXPECTED_COMPLETION_TOKENS = 150
+
+
+def _openai():
+    # Imported on first call: the SDK is most of the app's import time
+    import openai
+    return openai
+
+
+def retryable_errors() -> tuple:
+    openai = _openai()
+    return (
+        openai.RateLimitError,
+        openai.APIConnectionError,
+        openai.APITimeoutError,
+        openai.InternalServerError,
+    )
+
+
+class BudgetExceeded(Exception):
+    """The daily token budget has been used up"""
+
+
+def usage_tokens(usage) -> tuple:
+    """(prompt, cached, completion) tokens of a response's usage block"""
+    if usage is None:
+        return 0, 0, 0
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached = getattr(details, "cached_tokens", None) or 0
+    return usage.prompt_tokens or 0, cached, usage.completion_tokens or 0
+
+
+def estimate_cost(prompt_tokens: int, cached_tokens: int, completion_tokens: int) -> float:
+    """Estimated USD; cached prompt tokens are billed at the cached rate"""
+    return (
+        (prompt_tokens - cached_tokens) * PRICE_PROMPT
+        + cached_tokens * PRICE_CACHED
+        + completion_tokens * PRICE_COMPLETION
+    ) / 1_000_000
+
+
+class UsageJob:
+    """Token usage of one translation job (an endpoint call or a batch), call by call"""
+
+    def __init__(self, kind: str, prompt_version: str):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.prompt_version = prompt_version
+        self.calls = []
+
+    def record(self, language: str, usage, latency: float):
+        prompt_tokens, cached_tokens, completion_tokens = usage_tokens(usage)
+        self.calls.append({
+            "language_code": language,
+            "prompt_tokens": prompt_tokens,
+            "cached_tokens": cached_tokens,
+            "completion_tokens": completion_tokens,
+            "latency_ms": round(latency * 1000, 1),
+        })
+
+    def summary(self) -> dict:
+        totals = {
+            key: sum(call[key] for call in self.calls)
+            for key in ("prompt_tokens", "cached_tokens", "completion_tokens")
+        }
+        return {
+            "job_id": self.id,
+            "prompt_version": self.prompt_version,
+            "calls": len(self.calls),
+            **totals,
+            "latency_ms": round(sum(call["latency_ms"] for call in self.calls), 1),
+            "cost_usd": round(estimate_cost(**totals), 6),
+        }
+
+
+class TokenBucket:
+    """Continuously refilling bucket of `capacity` units per minute"""
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.tokens = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` units are available (0 if they are now)"""
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def take(self, amount: float):
+        self._refill()
+        self.tokens -= amount
+
+    def give_back(self, amount: float):
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+
+def estimate_tokens(messages: list) -> int:
+    """Cheap prompt size estimate (about four characters per token)"""
+    return sum(len(m["content"]) for m in messages) // 4 + 4 * len(messages)
+
+
+def retry_after(error: Exception) -> Optional[float]:
+    """Delay requested by the provider, if any"""
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    headers = response.headers
+    try:
+        if "retry-after-ms" in headers:
+            return float(headers["retry-after-ms"]) / 1000
+        if "retry-after" in headers:
+            return float(headers["retry-after"])
+    except ValueError:
+        return None
+    return None
+
+
+class LLMGovernor:
+    def __init__(self, requests_per_minute: int = REQUESTS_PER_MINUTE, tokens_per_minute: int = TOKENS_PER_MINUTE,
+                 max_concurrency: int = MAX_CONCURRENCY, daily_token_budget: int = DAILY_TOKEN_BUDGET,
+                 max_retries: int = MAX_RETRIES, client=None):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.max_concurrency = max_concurrency
+        self.concurrency = float(max_concurrency)
+        self.in_flight = 0
+        self.clean_calls = 0
+        # Bumped on every decrease; a 429 from a call started in an older epoch is already accounted for
+        self.decrease_epoch = 0
+        self.daily_token_budget = daily_token_budget
+        self.tokens_used = {}
+        self.max_retries = max_retries
+        self._client = client
+        self._condition = None
+
+    @property
+    def client(self):
+        # Retries are handled here, not by the SDK
+        if self._client is None:
+            self._client = _openai().AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"), max_retries=0)
+        return self._client
+
+    def _cond(self) -> asyncio.Condition:
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        return self._condition
+
+    def tokens_used_today(self) -> int:
+        return self.tokens_used.get(date.today(), 0)
+
+    def _check_budget(self, estimate: int):
+        if self.daily_token_budget and self.tokens_used_today() + estimate > self.daily_token_budget:
+            raise BudgetExceeded("Dnevni budžet tokena za prijevode je potrošen")
+
+    async def _acquire(self, estimate: int):
+        cond = self._cond()
+        async with cond:
+            while True:
+                if self.in_flight < max(1, int(self.concurrency)):
+                    wait = max(self.requests.wait_time(1), self.tokens.wait_time(estimate))
+                    if wait == 0:
+                        self.requests.take(1)
+                        self.tokens.take(estimate)
+                        self.in_flight += 1
+                        return
+                    try:
+                        await asyncio.wait_for(cond.wait(), timeout=wait)
+                    except asyncio.TimeoutError:
+                        pass
+                else:
+                    await cond.wait()
+
+    async def wait_idle(self):
+        """Wait until no call is in flight, so background work yields to everything else"""
+        cond = self._cond()
+        async with cond:
+            while self.in_flight:
+                await cond.wait()
+
+    async def _release(self):
+        cond = self._cond()
+        async with cond:
+            self.in_flight -= 1
+            cond.notify_all()
+
+    def _on_rate_limited(self, epoch: int):
+        # Multiplicative decrease, once per window: the other calls that were already in
+        # flight ran at the old concurrency, so their 429s say nothing new
+        if epoch != self.decrease_epoch:
+            return
+        self.concurrency = max(1.0, self.concurrency / 2)
+        self.decrease_epoch += 1
+        self.clean_calls = 0
+
+    def _on_success(self):
+        # Additive increase after a full window of calls without a 429
+        self.clean_calls += 1
+        if self.clean_calls >= int(self.concurrency) and self.concurrency < self.max_concurrency:
+            self.concurrency = min(self.max_concurrency, self.concurrency + 1)
+            self.clean_calls = 0
+
+    def _record_usage(self, estimate: int, used: int):
+        today = date.today()
+        self.tokens_used = {today: self.tokens_used.get(today, 0) + used}
+        # Correct the reservation with the real token count
+        if used < estimate:
+            self.tokens.give_back(estimate - used)
+        else:
+            self.tokens.take(used - estimate)
+
+    async def chat_json(self, messages: list, temperature: float = 0.3, language: str = "unknown",
+                        usage_job: Optional[UsageJob] = None) -> dict:
+        """Run a JSON-mode chat completion under the shared limits and return the parsed JSON"""
+        estimate = estimate_tokens(messages) + EXPECTED_COMPLETION_TOKENS
+        self._check_budget(estimate)
+
+        attempt = 0
+        while True:
+            await self._acquire(estimate)
+            epoch = self.decrease_epoch
+            started = time.perf_counter()
+            try:
+                response = await self.client.chat.completions.create(
+                    model=LLM_MODEL,
+                    messages=messages,
+                    temperature=temperature,
+                    response_format={"type": "json_object"}
+                )
+            except retryable_errors() as e:
+                await self._release()
+                metrics.observe_llm_error(language, e)
+                if isinstance(e, _openai().RateLimitError):
+                    self._on_rate_limited(epoch)
+                attempt += 1
+                if attempt > self.max_retries:
+                    raise
+                metrics.observe_llm_retry(language)
+                # Full jitter, unless the provider told us exactly how long to wait
+                delay = retry_after(e)
+                if delay is None:
+                    delay = random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+                await asyncio.sleep(delay)
+                continue
+            except Exception as e:
+                await self._release()
+                metrics.observe_llm_error(language, e)
+                raise
+
+            await self._release()
+            self._on_success()
+            usage = getattr(response, "usage", None)
+            latency = time.perf_counter() - started
+            metrics.observe_llm_call(language, latency, usage)
+            if usage_job is not None:
+                usage_job.record(language, usage, latency)
+            self._record_usage(estimate, usage.total_tokens if usage else estimate)
+            return json.loads(response.choices[0].message.content)
+
+
+governor = LLMGovernor()
@@ -1,56 +1,109 @@
-from fastapi import FastAPI, Depends, HTTPException, UploadFile, File, Form
+import time
+
+# Startup timing report: import, app construction and schema check phases
+_STARTED = time.perf_counter()
+STARTUP_TIMINGS = {}
+
+from fastapi import FastAPI, APIRouter, Depends, HTTPException, UploadFile, File, Form, Request, Header, Body, Query
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse, StreamingResponse, Response, PlainTextResponse, FileResponse
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
+from contextlib import asynccontextmanager
+from sqlalchemy import func, case
 from sqlalchemy.orm import Session
 import os
+import sys
+import asyncio
 import shutil
 from typing import List, Optional
-import qrcode
 from io import BytesIO
 import base64
-from dotenv import load_dotenv
-from openai import OpenAI
-
-# Load environment variables
-load_dotenv()
+import json
+import hashlib
+import orjson
+from datetime import datetime, timedelta
 
-from database import get_db, engine, Base
-from models import MenuItem, Category, RestaurantInfo, Translation
+# database loads the .env file
+from database import get_db, engine, get_session_factory, on_session_factory, current_tenant, DEFAULT_TENANT
+from models import MenuItem, Category, RestaurantInfo, Translation, CategoryTranslation, LLMUsage, BatchJob, MenuView, ALLERGEN_BITS
 from schemas import (
     MenuItemCreate, MenuItemUpdate, MenuItemResponse, 
     CategoryCreate, CategoryResponse, 
     RestaurantInfoCreate, RestaurantInfoResponse,
     TranslationCreate, TranslationUpdate, TranslationResponse,
-    MenuItemWithTranslationsResponse
-)
-
-# Create database tables
-Base.metadata.create_all(bind=engine)
-
-app = FastAPI()
-
-# CORS middleware
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["http://localhost:5173", "http://localhost:5174", "http://localhost:3000"],  # Vite default ports
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    MenuItemWithTranslationsResponse, MenuViewBeacon
 )
+from live_updates import get_broadcaster, register_session_hooks, catch_up
+from cache_bus import bus
+from pretranslate import pretranslation
+from view_analytics import views
+from image_placeholders import compute_placeholder, apply_placeholder
+from idempotency import idempotent, fingerprint
+import change_log
+import migrations
+import read_path
+import menu_format
+from llm import governor, UsageJob, BudgetExceeded, estimate_cost
+import prompts
+from metrics import MetricsMiddleware, TRANSLATION_MEMORY_HITS, IMAGE_PROCESSING, render_metrics
+from profiling import ProfilingMiddleware, list_reports, load_report
+import slow_queries
+from tenancy import TenantMiddleware, get_tenant_config, tenant_path, translation_quota
 
-# Create necessary directories
-os.makedirs("static/images", exist_ok=True)
+STARTUP_TIMINGS["imports"] = time.perf_counter() - _STARTED
 
-# Mount static files
-app.mount("/static", StaticFiles(directory="static"), name="static")
+router = APIRouter()
 
 # Simple authentication (for MVP - in production use proper auth)
 # Get admin password from environment variable, default to "admin123" for MVP
 ADMIN_PASSWORD = os.getenv("ADMIN_PASSWORD", "admin123")
 
-# Initialize OpenAI client
-openai_client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+def require_admin(x_admin_password: Optional[str] = Header(None)):
+    """Dependency for admin-only endpoints"""
+    if x_admin_password != ADMIN_PASSWORD:
+        raise HTTPException(status_code=401, detail="Netočna lozinka!")
+
+# Translation calls in progress: (tenant, language, prompt hash) -> [task, number of waiting callers]
+_translations_in_flight = {}
+
+# All OpenAI calls go through the shared rate limit / retry governor; the prompts live in prompts.py
+async def request_translation(messages: list, lang_code: str, usage_job: UsageJob) -> dict:
+    """Ask GPT-4o-mini for a JSON translation.
+    
+    Concurrent requests for the same text and language (a double click, the pre-translation
+    worker racing the admin's generate button) share one call; its usage is recorded in the
+    job of the caller that started it.
+    """
+    prompt_hash = hashlib.sha256(json.dumps(messages, ensure_ascii=False).encode("utf-8")).hexdigest()
+    key = (current_tenant.get(), lang_code, prompt_hash)
+    entry = _translations_in_flight.get(key)
+    if entry is None:
+        task = asyncio.ensure_future(governor.chat_json(messages, language=lang_code, usage_job=usage_job))
+        entry = _translations_in_flight[key] = [task, 0]
+        task.add_done_callback(
+            lambda done: _translations_in_flight.pop(key) if _translations_in_flight.get(key, [None])[0] is done else None
+        )
+    task = entry[0]
+    entry[1] += 1
+    try:
+        # One caller going away must not cancel the call for the others
+        return await asyncio.shield(task)
+    finally:
+        entry[1] -= 1
+        if entry[1] == 0 and not task.done():
+            task.cancel()
+
+def menu_item_messages(menu_item: MenuItem, language_name: str) -> list:
+    return prompts.menu_item_messages(menu_item.name_hr, menu_item.description_hr, language_name)
+
+def category_messages(category: Category, language_name: str) -> list:
+    return prompts.category_messages(category.name, language_name)
+
+def save_usage(db: Session, job: UsageJob, start: int = 0):
+    """Add the job's per-call token usage (from call `start` on) to the session (committed with the translations)"""
+    for call in job.calls[start:]:
+        db.add(LLMUsage(job_id=job.id, kind=job.kind, prompt_version=job.prompt_version, **call))
 
 # Supported languages for translation (default set)
 DEFAULT_SUPPORTED_LANGUAGES = {
@@ -67,31 +120,316 @@ DEFAULT_SUPPORTED_LANGUAGES = {
 
 # Load supported languages from file or use default
 LANGUAGES_FILE = "supported_languages.json"
+# Supported languages per tenant, refreshed from the file by the language endpoints
+_supported_languages = {}
+
 def load_supported_languages():
     try:
-        if os.path.exists(LANGUAGES_FILE):
-            with open(LANGUAGES_FILE, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        return DEFAULT_SUPPORTED_LANGUAGES.copy()
+        path = tenant_path(LANGUAGES_FILE)
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                languages = json.load(f)
+        else:
+            languages = DEFAULT_SUPPORTED_LANGUAGES.copy()
     except:
-        return DEFAULT_SUPPORTED_LANGUAGES.copy()
+        languages = DEFAULT_SUPPORTED_LANGUAGES.copy()
+    _supported_languages[current_tenant.get()] = languages
+    return languages
 
 def save_supported_languages(languages):
     try:
-        with open(LANGUAGES_FILE, 'w', encoding='utf-8') as f:
+        path = tenant_path(LANGUAGES_FILE)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
             json.dump(languages, f, ensure_ascii=False, indent=2)
         return True
     except:
         return False
 
-SUPPORTED_LANGUAGES = load_supported_languages()
+def commit_languages(db: Session, languages: dict, previous: dict) -> bool:
+    """Save the languages file and commit the transaction logging the change.
+
+    The file is written first, so clients told about the change by the commit find it there;
+    if the commit fails the previous file is put back.
+    """
+    if not save_supported_languages(languages):
+        db.rollback()
+        return False
+    try:
+        db.commit()
+    except Exception:
+        save_supported_languages(previous)
+        raise
+    # Every worker (this one included) reloads the file on next use
+    bus.invalidate("languages")
+    return True
+
+def supported_languages():
+    """Supported languages of the current tenant (cached until invalidated on the cache bus)"""
+    languages = _supported_languages.get(current_tenant.get())
+    if languages is None:
+        languages = load_supported_languages()
+    return languages
+
+def _ndjson(message: dict) -> bytes:
+    return (json.dumps(message, ensure_ascii=False) + "\n").encode("utf-8")
+
+def translation_exists(db: Session, translation) -> bool:
+    """Whether a translation for the same parent and language is already saved"""
+    model = type(translation)
+    parent_key = "menu_item_id" if model is Translation else "category_id"
+    return db.query(model.id).filter(
+        getattr(model, parent_key) == getattr(translation, parent_key),
+        model.language_code == translation.language_code
+    ).first() is not None
+
+async def stream_translations(language_codes: List[str], existing_codes: set, kind: str,
+                              build_messages, build_translation, response_schema):
+    """NDJSON stream with one line per language as soon as it is translated (or fails), then a summary line.
+    
+    The languages run concurrently under the LLM governor. Every translation is committed as it
+    arrives, so a failure or a closed connection keeps the ones that already succeeded.
+    """
+    languages = supported_languages()
+    usage_job = UsageJob(kind, prompts.PROMPT_VERSION)
+    generated = 0
+    errors = 0
+    pending = {}
+    
+    for lang_code in language_codes:
+        if lang_code not in languages:
+            error = f"Nepodržan jezik: {lang_code}"
+        elif lang_code in existing_codes:
+            TRANSLATION_MEMORY_HITS.labels(kind).inc()
+            error = f"Prijevod za {languages[lang_code]} već postoji"
+        elif not translation_quota.try_consume():
+            error = f"Dnevna kvota prijevoda je potrošena ({languages[lang_code]})"
+        else:
+            pending[lang_code] = build_messages(languages[lang_code])
+            continue
+        errors += 1
+        yield _ndjson({"type": "error", "language_code": lang_code, "error": error})
+    
+    async def translate(lang_code, messages):
+        try:
+            return lang_code, await request_translation(messages, lang_code, usage_job), None
+        except Exception as e:
+            return lang_code, None, e
+    
+    tasks = [asyncio.create_task(translate(lang_code, messages)) for lang_code, messages in pending.items()]
+    # Own short-lived session: the request's session may be closed before the stream ends
+    db = get_session_factory()()
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            lang_code, translation_data, error = await next_done
+            if error is None:
+                try:
+                    translation = build_translation(lang_code, languages[lang_code], translation_data)
+                    if translation_exists(db, translation):
+                        # Another request saved this language while the call was running
+                        raise ValueError("prijevod je u međuvremenu već spremljen")
+                    db.add(translation)
+                    db.commit()
+                    generated += 1
+                    yield _ndjson({"type": "translation", **response_schema.model_validate(translation).model_dump()})
+                    continue
+                except Exception as e:
+                    db.rollback()
+                    error = e
+            errors += 1
+            yield _ndjson({
+                "type": "error",
+                "language_code": lang_code,
+                "error": f"Greška pri generiranju prijevoda za {languages[lang_code]}: {str(error)}"
+            })
+    finally:
+        # Client went away: stop the calls that have not finished yet
+        for task in tasks:
+            task.cancel()
+        try:
+            save_usage(db, usage_job)
+            db.commit()
+        finally:
+            db.close()
+    
+    yield _ndjson({"type": "done", "generated": generated, "errors": errors, "usage": usage_job.summary()})
+
+async def pretranslate(kind: str, model, translation_model, parent_key: str, entity_id: int, retranslate: bool,
+                       build_messages, apply_translation):
+    """Translate one entity into every supported language it is missing, at background priority.
+    
+    With retranslate (the Croatian text changed), AI-generated translations are replaced as well;
+    manually edited ones are never touched.
+    """
+    languages = supported_languages()
+    usage_job = UsageJob(kind, prompts.PROMPT_VERSION)
+    db = get_session_factory()()
+    try:
+        for lang_code, language_name in languages.items():
+            entity = db.get(model, entity_id)
+            if entity is None:
+                return  # Deleted in the meantime
+            current = db.query(translation_model).filter(
+                getattr(translation_model, parent_key) == entity_id,
+                translation_model.language_code == lang_code
+            ).first()
+            if current is not None and not (retranslate and current.is_ai_generated):
+                continue
+            messages = build_messages(entity, language_name)
+            # No transaction stays open while waiting for the model
+            db.commit()
+            if not translation_quota.try_consume():
+                return
+            await governor.wait_idle()
+            try:
+                translation_data = await request_translation(messages, lang_code, usage_job)
+            except BudgetExceeded:
+                return
+            except Exception as e:
+                print(f"⚠️  Pre-translation of {kind} {entity_id} into {language_name} failed: {e}")
+                continue
+            if current is None:
+                current = translation_model(language_code=lang_code, language_name=language_name, is_ai_generated=True)
+                setattr(current, parent_key, entity_id)
+                db.add(current)
+            apply_translation(current, translation_data)
+            db.commit()
+    finally:
+        save_usage(db, usage_job)
+        db.commit()
+        db.close()
+
+def apply_item_translation(translation: Translation, translation_data: dict):
+    translation.name = translation_data["name"]
+    translation.description = translation_data.get("description", "")
+
+def apply_category_translation(translation: CategoryTranslation, translation_data: dict):
+    translation.name = translation_data["name"]
+
+async def pretranslate_menu_item(menu_item_id: int, retranslate: bool):
+    await pretranslate("menu_item", MenuItem, Translation, "menu_item_id", menu_item_id, retranslate,
+                       menu_item_messages, apply_item_translation)
+
+async def pretranslate_category(category_id: int, retranslate: bool):
+    await pretranslate("category", Category, CategoryTranslation, "category_id", category_id, retranslate,
+                       category_messages, apply_category_translation)
+
+@router.get("/metrics")
+async def get_metrics():
+    """Prometheus metrics for this deployment"""
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
+@router.get("/api/admin/profiles", dependencies=[Depends(require_admin)])
+async def get_profiles():
+    """List stored request profiles, newest first"""
+    return JSONResponse({"profiles": list_reports()})
 
-@app.get("/")
+@router.get("/api/admin/profiles/{profile_id}", dependencies=[Depends(require_admin)])
+async def get_profile(profile_id: str, format: str = "json"):
+    """A stored request profile; format=collapsed returns stacks for flame graph tools"""
+    report = load_report(profile_id)
+    if not report:
+        raise HTTPException(status_code=404, detail="Profil nije pronađen")
+    if format == "collapsed":
+        return PlainTextResponse(report["collapsed"])
+    return JSONResponse(report)
+
+SLOW_QUERY_SORTS = ("max_ms", "total_ms", "mean_ms", "count", "slow", "lock_wait_ms")
+
+@router.get("/api/admin/slow-queries", dependencies=[Depends(require_admin)])
+async def get_slow_queries(top: int = 20, sort: str = "max_ms"):
+    """Slowest normalized SQL statements of this worker since it started, with their plans"""
+    if sort not in SLOW_QUERY_SORTS:
+        raise HTTPException(status_code=400, detail=f"Nepoznato sortiranje: {sort} ({', '.join(SLOW_QUERY_SORTS)})")
+    return JSONResponse(slow_queries.top(max(1, top), sort))
+
+@router.get("/api/admin/llm-usage", dependencies=[Depends(require_admin)])
+async def get_llm_usage(days: int = 7, jobs: int = 20, db: Session = Depends(get_db)):
+    """Token usage and estimated cost per day, job kind and prompt version, plus the latest jobs"""
+    since = datetime.utcnow() - timedelta(days=days)
+    totals = (
+        func.count(LLMUsage.id),
+        func.sum(LLMUsage.prompt_tokens),
+        func.sum(LLMUsage.cached_tokens),
+        func.sum(LLMUsage.completion_tokens),
+        func.avg(LLMUsage.latency_ms),
+    )
+    
+    def describe(calls, prompt_tokens, cached_tokens, completion_tokens, latency_ms):
+        return {
+            "calls": calls,
+            "prompt_tokens": prompt_tokens,
+            "cached_tokens": cached_tokens,
+            "completion_tokens": completion_tokens,
+            "cache_hit_ratio": round(cached_tokens / prompt_tokens, 3) if prompt_tokens else 0,
+            "avg_latency_ms": round(latency_ms or 0.0, 1),
+            "cost_usd": round(estimate_cost(prompt_tokens, cached_tokens, completion_tokens), 6),
+        }
+    
+    day = func.date(LLMUsage.created_at)
+    daily = db.query(day, LLMUsage.kind, LLMUsage.prompt_version, *totals).filter(
+        LLMUsage.created_at >= since
+    ).group_by(day, LLMUsage.kind, LLMUsage.prompt_version).order_by(day.desc()).all()
+    
+    latest = db.query(
+        LLMUsage.job_id, LLMUsage.kind, LLMUsage.prompt_version, func.min(LLMUsage.created_at), *totals
+    ).group_by(LLMUsage.job_id, LLMUsage.kind, LLMUsage.prompt_version).order_by(
+        func.min(LLMUsage.created_at).desc()
+    ).limit(jobs).all()
+    
+    return JSONResponse({
+        "daily": [
+            {"date": str(usage_date), "kind": kind, "prompt_version": version, **describe(*row)}
+            for usage_date, kind, version, *row in daily
+        ],
+        "jobs": [
+            {"job_id": job_id, "kind": kind, "prompt_version": version, "started_at": started.isoformat(), **describe(*row)}
+            for job_id, kind, version, started, *row in latest
+        ],
+    })
+
+@router.get("/")
 async def root():
     """Root endpoint - API info"""
     return JSONResponse({"message": "API is running. Use the React frontend at http://localhost:5173"})
 
-@app.post("/admin/login")
+@router.get("/api/menu/events")
+async def menu_events(request: Request):
+    """Server-Sent Events stream of menu changes for open customer menus"""
+    broadcaster = get_broadcaster(current_tenant.get())
+    if broadcaster.version is None:
+        # Short-lived session: idle streams must not hold database connections
+        db = get_session_factory()()
+        try:
+            broadcaster.reset_version(change_log.current_version(db))
+        finally:
+            db.close()
+    
+    subscriber = broadcaster.subscribe()
+    if subscriber is None:
+        raise HTTPException(status_code=503, detail="Too many live connections")
+    
+    last_event_id = request.headers.get("last-event-id")
+    last_version = int(last_event_id) if last_event_id and last_event_id.isdigit() else None
+    
+    return StreamingResponse(
+        broadcaster.stream(subscriber, last_version),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/api/changes")
+async def get_changes(since: int = 0, lang: Optional[str] = None, db: Session = Depends(get_db)):
+    """Entities changed since a menu version, or a full snapshot if the log no longer reaches back that far.
+    
+    With ?lang= only menu items and categories, as the rows of the ?lang= menu endpoints.
+    """
+    if lang:
+        return ORJSONResponse(change_log.localized_changes_since(db, since, lang))
+    return JSONResponse(change_log.changes_since(db, since, supported_languages()))
+
+@router.post("/admin/login")
 async def admin_login_post(password: str = Form(...)):
     """Handle admin login"""
     if password == ADMIN_PASSWORD:
@@ -99,7 +437,7 @@ async def admin_login_post(password: str = Form(...)):
     else:
         return JSONResponse({"success": False, "error": "Netočna lozinka!"}, status_code=401)
 
-@app.get("/api/restaurant-info", response_model=RestaurantInfoResponse)
+@router.get("/api/restaurant-info", response_model=RestaurantInfoResponse)
 async def get_restaurant_info(db: Session = Depends(get_db)):
     """Get restaurant information"""
     info = db.query(RestaurantInfo).first()
@@ -108,7 +446,7 @@ async def get_restaurant_info(db: Session = Depends(get_db)):
         return RestaurantInfoResponse(id=0, name="Restaurant Menu", description="", address="", phone="", email="")
     return info
 
-@app.post("/api/restaurant-info", response_model=RestaurantInfoResponse)
+@router.post("/api/restaurant-info", response_model=RestaurantInfoResponse)
 async def save_restaurant_info(info: RestaurantInfoCreate, db: Session = Depends(get_db)):
     """Save or update restaurant information"""
     existing = db.query(RestaurantInfo).first()
@@ -126,12 +464,83 @@ async def save_restaurant_info(info: RestaurantInfoCreate, db: Session = Depends
     db.refresh(existing)
     return existing
 
-@app.get("/api/menu-items", response_model=List[MenuItemResponse])
-async def get_menu_items(db: Session = Depends(get_db)):
-    """Get all menu items"""
-    return db.query(MenuItem).all()
+def image_location(filename: str):
+    """File system path and public URL for an uploaded image of the current tenant"""
+    directory = os.path.join("static", "images")
+    if current_tenant.get() != DEFAULT_TENANT:
+        # Tenant images live under static/tenants/<tenant>/images
+        directory = os.path.join("static", "tenants", current_tenant.get(), "images")
+    os.makedirs(directory, exist_ok=True)
+    file_path = os.path.join(directory, filename)
+    return file_path, "/" + file_path.replace(os.sep, "/")
+
+def parse_allergen_names(value: Optional[str]) -> int:
+    """Turn a comma-separated list of allergen names into a bitmask"""
+    mask = 0
+    if not value:
+        return mask
+    for name in value.split(","):
+        name = name.strip().lower()
+        if not name:
+            continue
+        if name not in ALLERGEN_BITS:
+            raise HTTPException(status_code=400, detail=f"Nepoznat alergen: {name}")
+        mask |= ALLERGEN_BITS[name]
+    return mask
+
+def filter_by_allergens(query, exclude: Optional[str], require: Optional[str]):
+    """Apply ?exclude=nuts,gluten&require=vegan as a single bitwise predicate"""
+    exclude_mask = parse_allergen_names(exclude)
+    require_mask = parse_allergen_names(require)
+    if exclude_mask & require_mask:
+        raise HTTPException(status_code=400, detail="Alergen ne može biti istovremeno isključen i obavezan")
+    if not exclude_mask and not require_mask:
+        return query
+    # Bits we care about must match exactly: required ones set, excluded ones clear. A bitwise
+    # predicate can't use the allergen_mask index, so list every mask (at most 512) that passes.
+    checked = exclude_mask | require_mask
+    masks = [mask for mask in range(1 << len(ALLERGEN_BITS)) if mask & checked == require_mask]
+    return query.filter(MenuItem.allergen_mask.in_(masks))
+
+def requested_fields(available: tuple, fields: Optional[str]) -> tuple:
+    """Validate ?fields=a,b against the fields of the response"""
+    try:
+        return read_path.project(available, fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Nepoznata polja: {e}")
+
+def view_language(lang: str) -> str:
+    """Language to count a view under; unknown codes share one bucket"""
+    return lang if lang == read_path.SOURCE_LANGUAGE or lang in supported_languages() else "other"
+
+def rows_response(request: Request, rows: list) -> Response:
+    """JSON rows, or their columnar MessagePack encoding (menu_format.py) when the Accept header asks for it"""
+    if menu_format.accepts_msgpack(request.headers.get("accept")):
+        return Response(menu_format.encode(rows), media_type=menu_format.MEDIA_TYPE, headers={"Vary": "Accept"})
+    return ORJSONResponse(rows, headers={"Vary": "Accept"})
 
-@app.post("/api/menu-items", response_model=MenuItemResponse)
+def menu_item_response(request: Request, db: Session, exclude, require, lang, fields, with_translations: bool):
+    """Menu items, all languages or (with ?lang=) one, optionally projected with ?fields="""
+    apply_filters = lambda query: filter_by_allergens(query, exclude, require)
+    if lang:
+        selected = requested_fields(read_path.LOCALIZED_MENU_ITEM_FIELDS, fields)
+        return rows_response(request, read_path.localized_menu_item_rows(db, lang, apply_filters, selected))
+    available = read_path.MENU_ITEM_WITH_TRANSLATIONS_FIELDS if with_translations else read_path.MENU_ITEM_FIELDS
+    return rows_response(request, read_path.menu_item_rows(db, apply_filters, fields=requested_fields(available, fields)))
+
+@router.get("/api/menu-items", response_model=List[MenuItemResponse])
+async def get_menu_items(
+    request: Request,
+    exclude: Optional[str] = None,
+    require: Optional[str] = None,
+    lang: Optional[str] = None,
+    fields: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """Get all menu items, optionally filtered by allergens"""
+    return menu_item_response(request, db, exclude, require, lang, fields, with_translations=False)
+
+@router.post("/api/menu-items", response_model=MenuItemResponse)
 async def create_menu_item(
     name_hr: str = Form(...),
     description_hr: Optional[str] = Form(None),
@@ -153,12 +562,13 @@ async def create_menu_item(
     """Create a new menu item"""
     image_path = None
     
+    placeholder = None
     if image:
         # Save uploaded image
-        file_path = f"static/images/{image.filename}"
-        with open(file_path, "wb") as buffer:
+        file_path, image_path = image_location(image.filename)
+        with IMAGE_PROCESSING.labels("upload").time(), open(file_path, "wb") as buffer:
             shutil.copyfileobj(image.file, buffer)
-        image_path = f"/static/images/{image.filename}"
+        placeholder = await run_in_threadpool(compute_placeholder, file_path)
     
     def str_to_bool(value: Optional[str]) -> bool:
         return value.lower() in ("true", "on", "1") if value else False
@@ -182,14 +592,16 @@ async def create_menu_item(
         contains_eggs=str_to_bool(contains_eggs),
         is_spicy=str_to_bool(is_spicy)
     )
+    menu_item.image_width, menu_item.image_height, menu_item.image_placeholder = placeholder or (None, None, None)
     
     db.add(menu_item)
     db.commit()
     db.refresh(menu_item)
+    pretranslation.enqueue("menu_item", menu_item.id)
     
     return menu_item
 
-@app.put("/api/menu-items/{item_id}", response_model=MenuItemResponse)
+@router.put("/api/menu-items/{item_id}", response_model=MenuItemResponse)
 async def update_menu_item(
     item_id: int,
     name_hr: Optional[str] = Form(None),
@@ -218,6 +630,11 @@ async def update_menu_item(
     def str_to_bool(value: Optional[str]) -> bool:
         return value.lower() in ("true", "on", "1") if value else False
     
+    # New Croatian text makes the AI translations stale
+    source_changed = (name_hr is not None and name_hr != menu_item.name_hr) or (
+        description_hr is not None and description_hr != menu_item.description_hr
+    )
+    
     if name_hr is not None:
         menu_item.name_hr = name_hr
         menu_item.name_en = name_hr  # Keep English field in sync with Croatian
@@ -251,17 +668,18 @@ async def update_menu_item(
     
     if image:
         # Save new image
-        file_path = f"static/images/{image.filename}"
-        with open(file_path, "wb") as buffer:
+        file_path, menu_item.image_path = image_location(image.filename)
+        with IMAGE_PROCESSING.labels("upload").time(), open(file_path, "wb") as buffer:
             shutil.copyfileobj(image.file, buffer)
-        menu_item.image_path = f"/static/images/{image.filename}"
+        await run_in_threadpool(apply_placeholder, menu_item)
     
     db.commit()
     db.refresh(menu_item)
+    pretranslation.enqueue("menu_item", menu_item.id, retranslate=source_changed)
     
     return menu_item
 
-@app.delete("/api/menu-items/{item_id}")
+@router.delete("/api/menu-items/{item_id}")
 async def delete_menu_item(item_id: int, db: Session = Depends(get_db)):
     """Delete a menu item"""
     menu_item = db.query(MenuItem).filter(MenuItem.id == item_id).first()
@@ -280,32 +698,32 @@ async def delete_menu_item(item_id: int, db: Session = Depends(get_db)):
     
     return {"message": "Stavka je obrisana"}
 
-@app.get("/api/analytics")
+@router.get("/api/analytics")
 async def get_analytics(db: Session = Depends(get_db)):
     """Get analytics data for dashboard"""
-    all_items = db.query(MenuItem).all()
+    # Totals and allergen counts in a single aggregate pass over allergen_mask
+    totals = db.query(
+        func.count(MenuItem.id),
+        func.sum(case((MenuItem.is_available == True, 1), else_=0)),
+        *[
+            func.sum(case((MenuItem.allergen_mask.op("&")(bit) != 0, 1), else_=0))
+            for bit in ALLERGEN_BITS.values()
+        ]
+    ).one()
     
-    total_items = len(all_items)
-    available_items = len([item for item in all_items if item.is_available])
+    total_items = totals[0]
+    available_items = totals[1] or 0
     unavailable_items = total_items - available_items
     
     # Count by category
     categories = {}
-    for item in all_items:
-        cat = item.category or "Bez kategorije"
-        categories[cat] = categories.get(cat, 0) + 1
+    for cat, count in db.query(MenuItem.category, func.count(MenuItem.id)).group_by(MenuItem.category):
+        cat = cat or "Bez kategorije"
+        categories[cat] = categories.get(cat, 0) + count
     
     # Allergen counts
     allergen_counts = {
-        "vegetarian": len([item for item in all_items if item.is_vegetarian]),
-        "vegan": len([item for item in all_items if item.is_vegan]),
-        "gluten": len([item for item in all_items if item.contains_gluten]),
-        "dairy": len([item for item in all_items if item.contains_dairy]),
-        "nuts": len([item for item in all_items if item.contains_nuts]),
-        "fish": len([item for item in all_items if item.contains_fish]),
-        "shellfish": len([item for item in all_items if item.contains_shellfish]),
-        "eggs": len([item for item in all_items if item.contains_eggs]),
-        "spicy": len([item for item in all_items if item.is_spicy]),
+        name: count or 0 for name, count in zip(ALLERGEN_BITS, totals[2:])
     }
     
     return JSONResponse({
@@ -317,6 +735,90 @@ async def get_analytics(db: Session = Depends(get_db)):
         "total_categories": len(categories)
     })
 
+VIEW_ENTITIES = {"menu": None, "item": MenuItem, "category": Category}
+
+# Ids of the menu items and categories per tenant, for checking view beacons (cache bus "menu" topic)
+_menu_ids_cache = {}
+_menu_ids_generation = {}
+
+def invalidate_menu_ids(tenant: str):
+    _menu_ids_generation[tenant] = _menu_ids_generation.get(tenant, 0) + 1
+    _menu_ids_cache.pop(tenant, None)
+
+def menu_ids(db: Session) -> dict:
+    """entity -> ids of the current tenant's menu items ("item") and categories ("category")"""
+    tenant = current_tenant.get()
+    ids = _menu_ids_cache.get(tenant)
+    if ids is None:
+        generation = _menu_ids_generation.get(tenant, 0)
+        ids = {
+            "item": frozenset(item_id for item_id, in db.query(MenuItem.id)),
+            "category": frozenset(category_id for category_id, in db.query(Category.id)),
+        }
+        if _menu_ids_generation.get(tenant, 0) == generation:
+            _menu_ids_cache[tenant] = ids
+    return ids
+
+@router.post("/api/analytics/views", status_code=204)
+async def record_menu_view(beacon: MenuViewBeacon, db: Session = Depends(get_db)):
+    """Count one customer menu view (sent once per page load, not on data reloads)"""
+    # Anyone can call this: only ids on the menu are counted, so made-up ones can't fill menu_views
+    known = menu_ids(db)
+    language = view_language(beacon.lang)
+    views.record("menu", (0,), language)
+    views.record("item", known["item"].intersection(beacon.items), language)
+    views.record("category", known["category"].intersection(beacon.categories), language)
+    return Response(status_code=204)
+
+@router.get("/api/analytics/views")
+async def get_view_analytics(
+    days: int = 30,
+    bucket: str = "day",
+    entity: str = "menu",
+    top: int = 10,
+    db: Session = Depends(get_db)
+):
+    """Customer menu views over time (per hour or day and language) and the most viewed items and categories"""
+    if bucket not in ("hour", "day"):
+        raise HTTPException(status_code=400, detail="bucket mora biti hour ili day")
+    if entity not in VIEW_ENTITIES:
+        raise HTTPException(status_code=400, detail=f"Nepoznat entitet: {entity}")
+    days = max(1, min(days, 366))
+    since = (datetime.utcnow() - timedelta(days=days)).replace(minute=0, second=0, microsecond=0)
+    
+    # Stored per hour; days are summed here from at most 24 rows per language
+    series = {}
+    languages = set()
+    for hour, language, count in db.query(
+        MenuView.bucket, MenuView.language_code, func.sum(MenuView.count)
+    ).filter(
+        MenuView.entity == entity, MenuView.bucket >= since
+    ).group_by(MenuView.bucket, MenuView.language_code):
+        key = hour.isoformat() if bucket == "hour" else hour.date().isoformat()
+        point = series.setdefault(key, {"date": key, "views": 0})
+        point["views"] += count
+        point[language] = point.get(language, 0) + count
+        languages.add(language)
+    
+    def most_viewed(name: str, model) -> list:
+        total = func.sum(MenuView.count)
+        label = model.name_hr if model is MenuItem else model.name
+        rows = db.query(MenuView.entity_id, label, total).join(
+            model, model.id == MenuView.entity_id
+        ).filter(
+            MenuView.entity == name, MenuView.bucket >= since
+        ).group_by(MenuView.entity_id, label).order_by(total.desc()).limit(top)
+        return [{"id": entity_id, "name": entity_name, "views": count} for entity_id, entity_name, count in rows]
+    
+    return JSONResponse({
+        "bucket": bucket,
+        "since": since.isoformat(),
+        "languages": sorted(languages),
+        "series": [series[key] for key in sorted(series)],
+        "top_items": most_viewed("item", MenuItem),
+        "top_categories": most_viewed("category", Category),
+    })
+
 # Predefined categories
 PREDEFINED_CATEGORIES = [
     "HLADNA PREDJELA",
@@ -327,43 +829,71 @@ PREDEFINED_CATEGORIES = [
     "DESERT"
 ]
 
-@app.get("/api/categories")
-async def get_categories(db: Session = Depends(get_db)):
-    """Get all categories from database and predefined ones"""
-    # Get categories from database (this is the source of truth)
-    db_categories = db.query(Category).order_by(Category.order, Category.id).all()
-    category_dict = {cat.name: cat.id for cat in db_categories}
-    categories_set = set(category_dict.keys())
-    
-    # Add predefined categories if they don't exist in database
-    max_order = max([cat.order for cat in db_categories], default=-1)
-    for idx, cat in enumerate(PREDEFINED_CATEGORIES):
-        if cat not in categories_set:
-            # Check if category exists in DB, if not add it
-            existing = db.query(Category).filter(Category.name == cat).first()
-            if not existing:
-                new_cat = Category(name=cat, order=max_order + idx + 1)
-                db.add(new_cat)
-                db.flush()
-                category_dict[cat] = new_cat.id
-                categories_set.add(cat)
-            else:
-                category_dict[cat] = existing.id
-                categories_set.add(cat)
-    
+def predefined_categories(tenant: str = None):
+    """Predefined categories of the current (or given) tenant"""
+    return get_tenant_config(tenant).get("predefined_categories", PREDEFINED_CATEGORIES)
+
+def seed_predefined_categories(db: Session, tenant: str = None, only_if_empty: bool = True) -> List[str]:
+    """Add the tenant's predefined categories that are missing, after the existing ones.
+    
+    With only_if_empty this runs once per database: a restaurant that has categories
+    (or deleted the predefined ones) is left alone.
+    """
+    existing = {name for name, in db.query(Category.name)}
+    if existing and only_if_empty:
+        return []
+    next_order = (db.query(func.max(Category.order)).scalar() or 0) + 1 if existing else 0
+    added = [name for name in predefined_categories(tenant) if name not in existing]
+    for offset, name in enumerate(added):
+        db.add(Category(name=name, order=next_order + offset))
     db.commit()
-    
-    # Fetch again to get updated order
-    db_categories = db.query(Category).order_by(Category.order, Category.id).all()
-    categories_list = [cat.name for cat in db_categories]
-    categories_with_ids = [{"id": cat.id, "name": cat.name, "order": cat.order} for cat in db_categories]
-    
-    return JSONResponse({
-        "categories": categories_list,  # For backward compatibility
-        "categories_with_ids": categories_with_ids  # New format with IDs and order
-    })
+    return added
+
+def seed_tenant_categories(session_factory):
+    """Seed a restaurant's database when it is first opened in this process"""
+    tenant = session_factory.kw["info"]["tenant"]
+    if tenant == DEFAULT_TENANT:
+        # Seeded at startup, after its schema check
+        return
+    db = session_factory()
+    try:
+        seed_predefined_categories(db, tenant)
+    finally:
+        db.close()
+
+def seed_default_categories():
+    db = get_session_factory(DEFAULT_TENANT)()
+    try:
+        seed_predefined_categories(db, DEFAULT_TENANT)
+    finally:
+        db.close()
+
+# Rendered GET /api/categories body per tenant, dropped on every menu change (cache bus "menu" topic)
+_categories_cache = {}
+_categories_generation = {}
+
+def invalidate_categories(tenant: str):
+    _categories_generation[tenant] = _categories_generation.get(tenant, 0) + 1
+    _categories_cache.pop(tenant, None)
+
+@router.get("/api/categories")
+async def get_categories(db: Session = Depends(get_db)):
+    """Get all categories (read-only; predefined ones are seeded at startup or by /api/categories/initialize)"""
+    tenant = current_tenant.get()
+    body = _categories_cache.get(tenant)
+    if body is None:
+        generation = _categories_generation.get(tenant, 0)
+        rows = db.query(Category.id, Category.name, Category.order).order_by(Category.order, Category.id).all()
+        body = orjson.dumps({
+            "categories": [row.name for row in rows],  # For backward compatibility
+            "categories_with_ids": [{"id": row.id, "name": row.name, "order": row.order} for row in rows]  # New format with IDs and order
+        })
+        # Not cached if a change landed while reading; the next request reads again
+        if _categories_generation.get(tenant, 0) == generation:
+            _categories_cache[tenant] = body
+    return Response(content=body, media_type="application/json")
 
-@app.get("/api/categories/by-name/{category_name}")
+@router.get("/api/categories/by-name/{category_name}")
 async def get_category_by_name(category_name: str, db: Session = Depends(get_db)):
     """Get category by name"""
     category = db.query(Category).filter(Category.name == category_name).first()
@@ -371,7 +901,7 @@ async def get_category_by_name(category_name: str, db: Session = Depends(get_db)
         raise HTTPException(status_code=404, detail="Kategorija nije pronađena")
     return category
 
-@app.post("/api/categories", response_model=CategoryResponse)
+@router.post("/api/categories", response_model=CategoryResponse)
 async def create_category(category: CategoryCreate, db: Session = Depends(get_db)):
     """Create a new category"""
     # Check if category already exists
@@ -387,10 +917,11 @@ async def create_category(category: CategoryCreate, db: Session = Depends(get_db
     db.add(new_category)
     db.commit()
     db.refresh(new_category)
+    pretranslation.enqueue("category", new_category.id)
     
     return new_category
 
-@app.put("/api/categories/reorder")
+@router.put("/api/categories/reorder")
 async def reorder_categories(categories_order: List[dict], db: Session = Depends(get_db)):
     """Reorder categories"""
     for idx, item in enumerate(categories_order):
@@ -401,7 +932,7 @@ async def reorder_categories(categories_order: List[dict], db: Session = Depends
     db.commit()
     return {"message": "Kategorije su preuredene"}
 
-@app.put("/api/categories/{category_id}", response_model=CategoryResponse)
+@router.put("/api/categories/{category_id}", response_model=CategoryResponse)
 async def update_category(
     category_id: int,
     category: CategoryCreate,
@@ -432,10 +963,12 @@ async def update_category(
     
     db.commit()
     db.refresh(db_category)
+    if category.name != old_name:
+        pretranslation.enqueue("category", db_category.id, retranslate=True)
     
     return db_category
 
-@app.delete("/api/categories/{category_id}")
+@router.delete("/api/categories/{category_id}")
 async def delete_category(category_id: int, db: Session = Depends(get_db)):
     """Delete a category"""
     category = db.query(Category).filter(Category.id == category_id).first()
@@ -454,43 +987,57 @@ async def delete_category(category_id: int, db: Session = Depends(get_db)):
     
     return {"message": "Kategorija je obrisana"}
 
-@app.post("/api/categories/initialize")
+@router.post("/api/categories/initialize")
 async def initialize_categories(db: Session = Depends(get_db)):
-    """Initialize predefined categories (ensures they exist in the system)"""
-    # Categories are stored as strings on menu items, so this endpoint
-    # just ensures the predefined categories are available in the system
-    # They will appear in the categories list even if no items use them yet
+    """Initialize predefined categories (adds the ones missing from the database)"""
+    added = seed_predefined_categories(db, only_if_empty=False)
     return JSONResponse({
         "message": "Kategorije su inicijalizirane",
-        "categories": PREDEFINED_CATEGORIES
+        "categories": predefined_categories(),
+        "added": added
     })
 
 # Category Translation endpoints
-@app.get("/api/categories-with-translations")
-async def get_categories_with_translations(db: Session = Depends(get_db)):
-    """Get all categories with their translations"""
-    from schemas import CategoryWithTranslationsResponse
-    categories = db.query(Category).order_by(Category.order, Category.id).all()
-    return [CategoryWithTranslationsResponse.from_orm(cat) for cat in categories]
-
-@app.post("/api/category-translations/generate/{category_id}")
+@router.get("/api/categories-with-translations")
+async def get_categories_with_translations(
+    request: Request,
+    lang: Optional[str] = None,
+    fields: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """Get all categories with their translations, or (with ?lang=) with the name in one language"""
+    if lang:
+        selected = requested_fields(read_path.LOCALIZED_CATEGORY_FIELDS, fields)
+        return rows_response(request, read_path.localized_category_rows(db, lang, selected))
+    selected = requested_fields(read_path.CATEGORY_WITH_TRANSLATIONS_FIELDS, fields)
+    return rows_response(request, read_path.category_rows(db, selected))
+
+@router.post("/api/category-translations/generate/{category_id}")
 async def generate_category_translations(
     category_id: int, 
     language_codes: List[str],
+    request: Request,
+    idempotency_key: Optional[str] = Header(None),
     db: Session = Depends(get_db)
 ):
     """Generate AI translations for a category in specified languages"""
+    return await idempotent(idempotency_key, fingerprint(request, language_codes),
+                            lambda: _generate_category_translations(category_id, language_codes, db))
+
+async def _generate_category_translations(category_id: int, language_codes: List[str], db: Session):
     from models import CategoryTranslation
     
     category = db.query(Category).filter(Category.id == category_id).first()
     if not category:
         raise HTTPException(status_code=404, detail="Kategorija nije pronađena")
     
+    languages = supported_languages()
+    usage_job = UsageJob("category", prompts.PROMPT_VERSION)
     translations = []
     errors = []
     
     for lang_code in language_codes:
-        if lang_code not in SUPPORTED_LANGUAGES:
+        if lang_code not in languages:
             errors.append(f"Nepodržan jezik: {lang_code}")
             continue
         
@@ -501,62 +1048,91 @@ async def generate_category_translations(
         ).first()
         
         if existing:
-            errors.append(f"Prijevod za {SUPPORTED_LANGUAGES[lang_code]} već postoji")
+            TRANSLATION_MEMORY_HITS.labels("category").inc()
+            errors.append(f"Prijevod za {languages[lang_code]} već postoji")
+            continue
+        
+        if not translation_quota.try_consume():
+            errors.append(f"Dnevna kvota prijevoda je potrošena ({languages[lang_code]})")
             continue
         
         try:
             # Generate translation using GPT-4o-mini
-            prompt = f"""Translate the following restaurant menu category name from Croatian to {SUPPORTED_LANGUAGES[lang_code]}.
-Keep the translation natural and appropriate for a restaurant menu category.
-
-Croatian Category Name: {category.name}
-
-Provide the translation in the following JSON format:
-{{
-    "name": "translated category name"
-}}"""
+            messages = category_messages(category, languages[lang_code])
             
-            response = openai_client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": "You are a professional translator specialized in restaurant menus. Always respond with valid JSON."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.3,
-                response_format={"type": "json_object"}
-            )
-            
-            import json
-            translation_data = json.loads(response.choices[0].message.content)
+            translation_data = await request_translation(messages, lang_code, usage_job)
             
             # Create translation record
             translation = CategoryTranslation(
                 category_id=category_id,
                 language_code=lang_code,
-                language_name=SUPPORTED_LANGUAGES[lang_code],
+                language_name=languages[lang_code],
                 name=translation_data["name"],
                 is_ai_generated=True
             )
             
+            # Checked again right before saving: a concurrent request may have saved it meanwhile
+            if translation_exists(db, translation):
+                errors.append(f"Prijevod za {languages[lang_code]} već postoji")
+                continue
             db.add(translation)
+            db.commit()
             translations.append({
                 "language_code": lang_code,
-                "language_name": SUPPORTED_LANGUAGES[lang_code],
+                "language_name": languages[lang_code],
                 "name": translation_data["name"]
             })
             
         except Exception as e:
-            errors.append(f"Greška pri generiranju prijevoda za {SUPPORTED_LANGUAGES[lang_code]}: {str(e)}")
+            db.rollback()
+            errors.append(f"Greška pri generiranju prijevoda za {languages[lang_code]}: {str(e)}")
     
+    save_usage(db, usage_job)
     db.commit()
     
     return JSONResponse({
         "success": len(translations) > 0,
         "translations": translations,
-        "errors": errors
+        "errors": errors,
+        "usage": usage_job.summary()
     })
 
-@app.put("/api/category-translations/{translation_id}")
+@router.post("/api/category-translations/generate/{category_id}/stream")
+async def stream_category_translations(
+    category_id: int,
+    language_codes: List[str],
+    db: Session = Depends(get_db)
+):
+    """Generate AI translations for a category, streaming each language as NDJSON as soon as it is done"""
+    from models import CategoryTranslation
+    from schemas import CategoryTranslationResponse
+    
+    category = db.query(Category).filter(Category.id == category_id).first()
+    if not category:
+        raise HTTPException(status_code=404, detail="Kategorija nije pronađena")
+    existing = {code for (code,) in db.query(CategoryTranslation.language_code).filter(
+        CategoryTranslation.category_id == category_id
+    )}
+    
+    def build_translation(lang_code, language_name, translation_data):
+        return CategoryTranslation(
+            category_id=category_id,
+            language_code=lang_code,
+            language_name=language_name,
+            name=translation_data["name"],
+            is_ai_generated=True
+        )
+    
+    return StreamingResponse(
+        stream_translations(
+            language_codes, existing, "category",
+            lambda language_name: category_messages(category, language_name),
+            build_translation, CategoryTranslationResponse
+        ),
+        media_type="application/x-ndjson"
+    )
+
+@router.put("/api/category-translations/{translation_id}")
 async def update_category_translation(
     translation_id: int,
     name: str,
@@ -574,7 +1150,7 @@ async def update_category_translation(
     
     return {"message": "Prijevod je ažuriran"}
 
-@app.delete("/api/category-translations/{translation_id}")
+@router.delete("/api/category-translations/{translation_id}")
 async def delete_category_translation(translation_id: int, db: Session = Depends(get_db)):
     """Delete a category translation"""
     from models import CategoryTranslation
@@ -588,14 +1164,56 @@ async def delete_category_translation(translation_id: int, db: Session = Depends
     
     return {"message": "Prijevod je obrisan"}
 
-@app.get("/api/qr-code")
+@router.post("/api/export/static", dependencies=[Depends(require_admin)])
+async def export_static(html: bool = False, full: bool = False, db: Session = Depends(get_db)):
+    """Export the customer menu as static JSON/HTML files for a CDN (only changed languages are rebuilt)"""
+    from static_export import export_static_menu, STATIC_EXPORT_DIR
+    out_dir = STATIC_EXPORT_DIR
+    if current_tenant.get() != DEFAULT_TENANT:
+        out_dir = os.path.join(STATIC_EXPORT_DIR, current_tenant.get())
+    result = await run_in_threadpool(export_static_menu, db, supported_languages(), out_dir, with_html=html, full=full)
+    return JSONResponse(result)
+
+@router.get("/api/print-menu")
+async def print_menu_file(
+    lang: str = "hr",
+    layout: str = "a4",
+    file_format: str = Query("pdf", alias="format"),
+    page: int = 1,
+    db: Session = Depends(get_db)
+):
+    """Print-ready menu in one language: a paginated PDF, or one high-resolution PNG page"""
+    # Pillow and the render worker are only loaded when a menu is printed
+    import print_menu
+    from static_export import BASE_LANGUAGE
+    languages = dict([BASE_LANGUAGE], **supported_languages())
+    if lang not in languages:
+        raise HTTPException(status_code=400, detail=f"Nepodržan jezik: {lang}")
+    if layout not in print_menu.LAYOUTS:
+        raise HTTPException(status_code=400, detail=f"Nepoznat izgled: {layout}")
+    if file_format not in print_menu.FORMATS:
+        raise HTTPException(status_code=400, detail=f"Nepoznat format: {file_format}")
+    
+    files = await print_menu.print_files(db, current_tenant.get(), lang, languages[lang], layout, file_format)
+    if not 1 <= page <= len(files):
+        raise HTTPException(status_code=404, detail="Stranica ne postoji")
+    suffix = f"-{page}" if file_format == "png" else ""
+    return FileResponse(
+        files[page - 1],
+        media_type=print_menu.FORMATS[file_format],
+        filename=f"menu-{lang}-{layout}{suffix}.{file_format}",
+        headers={"X-Page-Count": str(len(files))} if file_format == "png" else None
+    )
+
+@router.get("/api/qr-code")
 async def generate_qr_code_api():
     """Generate QR code for the menu - API endpoint"""
     # Get the base URL from environment or use default
     # For production, set MENU_URL environment variable to your public URL
     menu_url = os.getenv("MENU_URL", "http://localhost:5173")  # Frontend URL
     
-    # Generate QR code
+    # Generate QR code (qrcode and Pillow are only loaded when a code is requested)
+    import qrcode
     qr = qrcode.QRCode(version=1, box_size=10, border=5)
     qr.add_data(menu_url)
     qr.make(fit=True)
@@ -613,45 +1231,44 @@ async def generate_qr_code_api():
     })
 
 # Translation endpoints
-@app.get("/api/supported-languages")
+@router.get("/api/supported-languages")
 async def get_supported_languages():
     """Get list of supported languages for translation"""
-    global SUPPORTED_LANGUAGES
-    SUPPORTED_LANGUAGES = load_supported_languages()  # Reload from file
+    languages = supported_languages()
     return JSONResponse({
         "languages": [
             {"code": code, "name": name} 
-            for code, name in SUPPORTED_LANGUAGES.items()
+            for code, name in languages.items()
         ]
     })
 
-@app.post("/api/languages/add")
-async def add_language(language: dict):
+@router.post("/api/languages/add")
+async def add_language(language: dict, db: Session = Depends(get_db)):
     """Add a new supported language"""
-    global SUPPORTED_LANGUAGES
     code = language.get("code")
     name = language.get("name")
     
     if not code or not name:
         raise HTTPException(status_code=400, detail="Language code and name are required")
     
-    SUPPORTED_LANGUAGES = load_supported_languages()
-    if code in SUPPORTED_LANGUAGES:
+    languages = load_supported_languages()
+    if code in languages:
         raise HTTPException(status_code=400, detail="Language already exists")
     
-    SUPPORTED_LANGUAGES[code] = name
-    if save_supported_languages(SUPPORTED_LANGUAGES):
+    previous = dict(languages)
+    languages[code] = name
+    change_log.log_change(db, "language", code, "created")
+    if commit_languages(db, languages, previous):
         return JSONResponse({"message": f"Language {name} added successfully"})
     else:
         raise HTTPException(status_code=500, detail="Failed to save languages")
 
-@app.delete("/api/languages/remove/{language_code}")
+@router.delete("/api/languages/remove/{language_code}")
 async def remove_language(language_code: str, db: Session = Depends(get_db)):
     """Remove a supported language and delete all translations for it"""
-    global SUPPORTED_LANGUAGES
-    SUPPORTED_LANGUAGES = load_supported_languages()
+    languages = load_supported_languages()
     
-    if language_code not in SUPPORTED_LANGUAGES:
+    if language_code not in languages:
         raise HTTPException(status_code=404, detail="Language not found")
     
     # Delete all translations for this language
@@ -661,13 +1278,15 @@ async def remove_language(language_code: str, db: Session = Depends(get_db)):
     from models import CategoryTranslation
     db.query(CategoryTranslation).filter(CategoryTranslation.language_code == language_code).delete()
     
-    db.commit()
+    # Bulk deletes bypass the ORM events; clients drop the language's translations with it
+    change_log.log_change(db, "language", language_code, "deleted")
     
     # Remove from supported languages
-    language_name = SUPPORTED_LANGUAGES[language_code]
-    del SUPPORTED_LANGUAGES[language_code]
+    previous = dict(languages)
+    language_name = languages[language_code]
+    del languages[language_code]
     
-    if save_supported_languages(SUPPORTED_LANGUAGES):
+    if commit_languages(db, languages, previous):
         return JSONResponse({
             "message": f"Language {language_name} removed successfully",
             "translations_deleted": deleted_count
@@ -675,13 +1294,20 @@ async def remove_language(language_code: str, db: Session = Depends(get_db)):
     else:
         raise HTTPException(status_code=500, detail="Failed to save languages")
 
-@app.get("/api/menu-items-with-translations", response_model=List[MenuItemWithTranslationsResponse])
-async def get_menu_items_with_translations(db: Session = Depends(get_db)):
-    """Get all menu items with their translations"""
-    items = db.query(MenuItem).all()
-    return items
+@router.get("/api/menu-items-with-translations", response_model=List[MenuItemWithTranslationsResponse])
+async def get_menu_items_with_translations(
+    request: Request,
+    exclude: Optional[str] = None,
+    require: Optional[str] = None,
+    lang: Optional[str] = None,
+    fields: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """Get all menu items with their translations, optionally filtered by allergens"""
+    # Read-heavy customer endpoint: plain rows encoded with orjson, no per-row Pydantic validation
+    return menu_item_response(request, db, exclude, require, lang, fields, with_translations=True)
 
-@app.get("/api/translations/{menu_item_id}", response_model=List[TranslationResponse])
+@router.get("/api/translations/{menu_item_id}", response_model=List[TranslationResponse])
 async def get_translations(menu_item_id: int, db: Session = Depends(get_db)):
     """Get all translations for a specific menu item"""
     menu_item = db.query(MenuItem).filter(MenuItem.id == menu_item_id).first()
@@ -691,22 +1317,30 @@ async def get_translations(menu_item_id: int, db: Session = Depends(get_db)):
     translations = db.query(Translation).filter(Translation.menu_item_id == menu_item_id).all()
     return translations
 
-@app.post("/api/translations/generate/{menu_item_id}")
+@router.post("/api/translations/generate/{menu_item_id}")
 async def generate_translations(
     menu_item_id: int, 
     language_codes: List[str],
+    request: Request,
+    idempotency_key: Optional[str] = Header(None),
     db: Session = Depends(get_db)
 ):
     """Generate AI translations for a menu item in specified languages"""
+    return await idempotent(idempotency_key, fingerprint(request, language_codes),
+                            lambda: _generate_translations(menu_item_id, language_codes, db))
+
+async def _generate_translations(menu_item_id: int, language_codes: List[str], db: Session):
     menu_item = db.query(MenuItem).filter(MenuItem.id == menu_item_id).first()
     if not menu_item:
         raise HTTPException(status_code=404, detail="Stavka menija nije pronađena")
     
+    languages = supported_languages()
+    usage_job = UsageJob("menu_item", prompts.PROMPT_VERSION)
     translations = []
     errors = []
     
     for lang_code in language_codes:
-        if lang_code not in SUPPORTED_LANGUAGES:
+        if lang_code not in languages:
             errors.append(f"Nepodržan jezik: {lang_code}")
             continue
         
@@ -717,66 +1351,91 @@ async def generate_translations(
         ).first()
         
         if existing:
-            errors.append(f"Prijevod za {SUPPORTED_LANGUAGES[lang_code]} već postoji")
+            TRANSLATION_MEMORY_HITS.labels("menu_item").inc()
+            errors.append(f"Prijevod za {languages[lang_code]} već postoji")
+            continue
+        
+        if not translation_quota.try_consume():
+            errors.append(f"Dnevna kvota prijevoda je potrošena ({languages[lang_code]})")
             continue
         
         try:
             # Generate translation using GPT-4o-mini
-            prompt = f"""Translate the following restaurant menu item from Croatian to {SUPPORTED_LANGUAGES[lang_code]}.
-Keep the translation natural and appetizing for a restaurant menu.
-
-Croatian Name: {menu_item.name_hr}
-Croatian Description: {menu_item.description_hr or ''}
-
-Provide the translation in the following JSON format:
-{{
-    "name": "translated name",
-    "description": "translated description"
-}}"""
-            
-            response = openai_client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": "You are a professional translator specialized in restaurant menus. Always respond with valid JSON."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.3,
-                response_format={"type": "json_object"}
-            )
+            messages = menu_item_messages(menu_item, languages[lang_code])
             
-            import json
-            translation_data = json.loads(response.choices[0].message.content)
+            translation_data = await request_translation(messages, lang_code, usage_job)
             
             # Create translation record
             translation = Translation(
                 menu_item_id=menu_item_id,
                 language_code=lang_code,
-                language_name=SUPPORTED_LANGUAGES[lang_code],
+                language_name=languages[lang_code],
                 name=translation_data["name"],
                 description=translation_data.get("description", ""),
                 is_ai_generated=True
             )
             
+            # Checked again right before saving: a concurrent request may have saved it meanwhile
+            if translation_exists(db, translation):
+                errors.append(f"Prijevod za {languages[lang_code]} već postoji")
+                continue
             db.add(translation)
+            db.commit()
             translations.append({
                 "language_code": lang_code,
-                "language_name": SUPPORTED_LANGUAGES[lang_code],
+                "language_name": languages[lang_code],
                 "name": translation_data["name"],
                 "description": translation_data.get("description", "")
             })
             
         except Exception as e:
-            errors.append(f"Greška pri generiranju prijevoda za {SUPPORTED_LANGUAGES[lang_code]}: {str(e)}")
+            db.rollback()
+            errors.append(f"Greška pri generiranju prijevoda za {languages[lang_code]}: {str(e)}")
     
+    save_usage(db, usage_job)
     db.commit()
     
     return JSONResponse({
         "success": len(translations) > 0,
         "translations": translations,
-        "errors": errors
+        "errors": errors,
+        "usage": usage_job.summary()
     })
 
-@app.put("/api/translations/{translation_id}", response_model=TranslationResponse)
+@router.post("/api/translations/generate/{menu_item_id}/stream")
+async def stream_item_translations(
+    menu_item_id: int,
+    language_codes: List[str],
+    db: Session = Depends(get_db)
+):
+    """Generate AI translations for a menu item, streaming each language as NDJSON as soon as it is done"""
+    menu_item = db.query(MenuItem).filter(MenuItem.id == menu_item_id).first()
+    if not menu_item:
+        raise HTTPException(status_code=404, detail="Stavka menija nije pronađena")
+    existing = {code for (code,) in db.query(Translation.language_code).filter(
+        Translation.menu_item_id == menu_item_id
+    )}
+    
+    def build_translation(lang_code, language_name, translation_data):
+        return Translation(
+            menu_item_id=menu_item_id,
+            language_code=lang_code,
+            language_name=language_name,
+            name=translation_data["name"],
+            description=translation_data.get("description", ""),
+            is_ai_generated=True
+        )
+    
+    return StreamingResponse(
+        stream_translations(
+            language_codes, existing, "menu_item",
+            lambda language_name: menu_item_messages(menu_item, language_name),
+            build_translation, TranslationResponse
+        ),
+        media_type="application/x-ndjson"
+    )
+
+@router.put("/api/translations/{translation_id}", response_model=TranslationResponse)
 async def update_translation(
     translation_id: int,
     translation_update: TranslationUpdate,
@@ -800,7 +1459,7 @@ async def update_translation(
     
     return translation
 
-@app.delete("/api/translations/{translation_id}")
+@router.delete("/api/translations/{translation_id}")
 async def delete_translation(translation_id: int, db: Session = Depends(get_db)):
     """Delete a translation"""
     translation = db.query(Translation).filter(Translation.id == translation_id).first()
@@ -812,93 +1471,255 @@ async def delete_translation(translation_id: int, db: Session = Depends(get_db))
     
     return {"message": "Prijevod je obrisan"}
 
-@app.post("/api/translations/batch-generate")
+# Batch translations are committed in chunks, so SQLite's write lock is only held for a
+# chunk's inserts and a crash loses at most one chunk of paid-for translations
+BATCH_CHUNK_SIZE = int(os.getenv("TRANSLATION_BATCH_CHUNK_SIZE", "20"))
+
+def batch_job_summary(job: BatchJob) -> dict:
+    return {
+        "job_id": job.id,
+        "language_codes": job.language_codes.split(","),
+        "status": job.status,
+        "total": job.total,
+        "completed": job.completed,
+        "errors": job.errors,
+        "chunks": job.chunks,
+        "created_at": job.created_at.isoformat(),
+        "updated_at": job.updated_at.isoformat() if job.updated_at else None,
+    }
+
+@router.post("/api/translations/batch-generate")
 async def batch_generate_translations(
-    language_codes: List[str],
+    request: Request,
+    language_codes: Optional[List[str]] = Body(None),
+    resume: Optional[int] = None,
+    chunk_size: int = BATCH_CHUNK_SIZE,
+    idempotency_key: Optional[str] = Header(None),
     db: Session = Depends(get_db)
 ):
-    """Generate translations for all menu items in specified languages"""
-    menu_items = db.query(MenuItem).all()
+    """Generate translations for all menu items in specified languages, or resume an interrupted batch"""
+    return await idempotent(idempotency_key, fingerprint(request, language_codes),
+                            lambda: _batch_generate_translations(language_codes, resume, chunk_size, db))
+
+async def _batch_generate_translations(language_codes: Optional[List[str]], resume: Optional[int],
+                                       chunk_size: int, db: Session):
+    if resume is not None:
+        job = db.query(BatchJob).filter(BatchJob.id == resume).first()
+        if not job:
+            raise HTTPException(status_code=404, detail="Batch posao nije pronađen")
+        language_codes = job.language_codes.split(",")
+    elif not language_codes:
+        raise HTTPException(status_code=400, detail="Odaberite barem jedan jezik")
+    chunk_size = max(1, chunk_size)
+    
+    # Plain rows: they stay readable after each chunk's commit without reloading the items
+    menu_items = db.query(MenuItem.id, MenuItem.name_hr, MenuItem.description_hr).order_by(MenuItem.id).all()
     
     if not menu_items:
         raise HTTPException(status_code=404, detail="Nema stavki menija")
     
+    languages = supported_languages()
+    usage_job = UsageJob("batch", prompts.PROMPT_VERSION)
     total_generated = 0
     total_errors = 0
     results = []
     
+    # Existing translations in one query instead of one per (item, language); on resume
+    # these include everything the interrupted run already committed
+    existing = set(db.query(Translation.menu_item_id, Translation.language_code).filter(
+        Translation.language_code.in_(language_codes)
+    ))
+    
+    pending = []
     for menu_item in menu_items:
         for lang_code in language_codes:
-            if lang_code not in SUPPORTED_LANGUAGES:
+            if lang_code not in languages:
                 total_errors += 1
                 continue
             
-            # Check if translation already exists
-            existing = db.query(Translation).filter(
-                Translation.menu_item_id == menu_item.id,
-                Translation.language_code == lang_code
-            ).first()
-            
-            if existing:
+            if (menu_item.id, lang_code) in existing:
+                TRANSLATION_MEMORY_HITS.labels("menu_item").inc()
                 continue
             
-            try:
-                # Generate translation using GPT-4o-mini
-                prompt = f"""Translate the following restaurant menu item from Croatian to {SUPPORTED_LANGUAGES[lang_code]}.
-Keep the translation natural and appetizing for a restaurant menu.
-
-Croatian Name: {menu_item.name_hr}
-Croatian Description: {menu_item.description_hr or ''}
-
-Provide the translation in the following JSON format:
-{{
-    "name": "translated name",
-    "description": "translated description"
-}}"""
-                
-                response = openai_client.chat.completions.create(
-                    model="gpt-4o-mini",
-                    messages=[
-                        {"role": "system", "content": "You are a professional translator specialized in restaurant menus. Always respond with valid JSON."},
-                        {"role": "user", "content": prompt}
-                    ],
-                    temperature=0.3,
-                    response_format={"type": "json_object"}
-                )
-                
-                import json
-                translation_data = json.loads(response.choices[0].message.content)
-                
-                # Create translation record
-                translation = Translation(
-                    menu_item_id=menu_item.id,
-                    language_code=lang_code,
-                    language_name=SUPPORTED_LANGUAGES[lang_code],
-                    name=translation_data["name"],
-                    description=translation_data.get("description", ""),
-                    is_ai_generated=True
-                )
-                
-                db.add(translation)
-                total_generated += 1
-                
-            except Exception as e:
+            if not translation_quota.try_consume():
                 total_errors += 1
                 results.append({
                     "menu_item": menu_item.name_hr,
-                    "language": SUPPORTED_LANGUAGES[lang_code],
-                    "error": str(e)
+                    "language": languages[lang_code],
+                    "error": "Dnevna kvota prijevoda je potrošena"
                 })
+                continue
+            
+            pending.append((menu_item, lang_code))
+    
+    if resume is None:
+        job = BatchJob(language_codes=",".join(language_codes), total=len(pending))
+        db.add(job)
+    job.status = "running"
+    job.errors = total_errors
+    # Nothing stays open while the model is working
+    db.commit()
+    
+    async def translate(menu_item, lang_code):
+        # Generate translation using GPT-4o-mini
+        messages = menu_item_messages(menu_item, languages[lang_code])
+        return await request_translation(messages, lang_code, usage_job)
     
+    saved_calls = 0
+    try:
+        for start in range(0, len(pending), chunk_size):
+            chunk = pending[start:start + chunk_size]
+            # The governor keeps the concurrent calls within the provider limits
+            outcomes = await asyncio.gather(
+                *(translate(menu_item, lang_code) for menu_item, lang_code in chunk),
+                return_exceptions=True
+            )
+            
+            # Saved by a concurrent request while this chunk was being translated
+            saved_meanwhile = set(db.query(Translation.menu_item_id, Translation.language_code).filter(
+                Translation.menu_item_id.in_({menu_item.id for menu_item, _ in chunk}),
+                Translation.language_code.in_({lang_code for _, lang_code in chunk})
+            ))
+            
+            chunk_generated = chunk_errors = 0
+            for (menu_item, lang_code), translation_data in zip(chunk, outcomes):
+                try:
+                    if isinstance(translation_data, Exception):
+                        raise translation_data
+                    if (menu_item.id, lang_code) in saved_meanwhile:
+                        continue
+                    
+                    # Create translation record
+                    translation = Translation(
+                        menu_item_id=menu_item.id,
+                        language_code=lang_code,
+                        language_name=languages[lang_code],
+                        name=translation_data["name"],
+                        description=translation_data.get("description", ""),
+                        is_ai_generated=True
+                    )
+                    
+                    db.add(translation)
+                    chunk_generated += 1
+                    
+                except Exception as e:
+                    chunk_errors += 1
+                    results.append({
+                        "menu_item": menu_item.name_hr,
+                        "language": languages[lang_code],
+                        "error": str(e)
+                    })
+            
+            # One short write transaction per chunk: its translations, their usage and the checkpoint
+            save_usage(db, usage_job, saved_calls)
+            saved_calls = len(usage_job.calls)
+            job.completed += chunk_generated
+            job.errors += chunk_errors
+            job.chunks += 1
+            db.commit()
+            total_generated += chunk_generated
+            total_errors += chunk_errors
+    except BaseException:
+        # Committed chunks stay; POST ?resume=<job_id> translates the rest
+        db.rollback()
+        job.status = "interrupted"
+        db.commit()
+        raise
+    
+    job.status = "completed"
     db.commit()
     
     return JSONResponse({
         "success": True,
+        "job_id": job.id,
         "total_generated": total_generated,
         "total_errors": total_errors,
-        "results": results
+        "results": results,
+        "usage": usage_job.summary()
     })
 
+@router.get("/api/translations/batch-generate/jobs")
+async def list_batch_jobs(limit: int = 20, db: Session = Depends(get_db)):
+    """Most recent batch translation jobs with their checkpoints"""
+    jobs = db.query(BatchJob).order_by(BatchJob.id.desc()).limit(limit).all()
+    return JSONResponse([batch_job_summary(job) for job in jobs])
+
+_hooks_registered = False
+
+def _register_hooks():
+    # Once per process, even if create_app() is called again (e.g. by tests)
+    global _hooks_registered
+    if not _hooks_registered:
+        # Record every mutation in the change log and push it to connected customer devices
+        on_session_factory(change_log.register_session_hooks)
+        on_session_factory(register_session_hooks)
+        # In-process caches, invalidated across workers by the cache bus
+        bus.register("languages", lambda tenant: _supported_languages.pop(tenant, None))
+        bus.register("menu", catch_up)
+        bus.register("menu", invalidate_categories)
+        bus.register("menu", invalidate_menu_ids)
+        # New restaurant databases start with the predefined categories
+        on_session_factory(seed_tenant_categories)
+        # Translate new and edited dishes and categories in the background
+        pretranslation.register("menu_item", pretranslate_menu_item)
+        pretranslation.register("category", pretranslate_category)
+        _hooks_registered = True
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Check the schema version once at boot instead of on the first request
+    started = time.perf_counter()
+    await run_in_threadpool(migrations.ensure_schema, engine)
+    STARTUP_TIMINGS["schema"] = time.perf_counter() - started
+    await run_in_threadpool(seed_default_categories)
+    STARTUP_TIMINGS["total"] = time.perf_counter() - _STARTED
+    print("⏱️  Startup: " + ", ".join(f"{phase} {seconds * 1000:.0f} ms" for phase, seconds in STARTUP_TIMINGS.items()))
+    bus.start()
+    pretranslation.start()
+    views.start()
+    yield
+    await run_in_threadpool(views.stop)
+    await pretranslation.stop()
+    if "print_menu" in sys.modules:
+        sys.modules["print_menu"].shutdown()
+    bus.stop()
+
+def create_app() -> FastAPI:
+    """Build the application; heavy libraries and the database are only touched at startup or first use"""
+    started = time.perf_counter()
+    _register_hooks()
+    app = FastAPI(lifespan=lifespan)
+
+    # Per-route latency metrics (inside the tenant middleware, so paths are already stripped)
+    app.add_middleware(MetricsMiddleware, router_app=app)
+
+    # Opt-in per-request profiling (X-Profile: 1 plus the admin password header)
+    app.add_middleware(ProfilingMiddleware, admin_password=ADMIN_PASSWORD)
+
+    # Route each request to its restaurant (tenant) by host or /t/<tenant> prefix
+    app.add_middleware(TenantMiddleware)
+
+    # CORS middleware
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["http://localhost:5173", "http://localhost:5174", "http://localhost:3000"],  # Vite default ports
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+    # Create necessary directories
+    os.makedirs("static/images", exist_ok=True)
+
+    # Mount static files
+    app.mount("/static", StaticFiles(directory="static"), name="static")
+
+    app.include_router(router)
+    STARTUP_TIMINGS["app"] = time.perf_counter() - started
+    return app
+
+app = create_app()
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
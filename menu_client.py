@@ -0,0 +1,91 @@
+"""
+Python client for the menu read API, for kiosks, table tablets and scripts.
+
+    from menu_client import MenuClient
+
+    client = MenuClient("http://192.168.1.10:8000")            # or tenant="bistro"
+    items = client.menu_items(lang="de")                        # one language
+    items = client.menu_items(with_translations=True)           # every language
+    categories = client.categories(lang="de")
+
+By default it asks for the compact MessagePack encoding (menu_format.py on
+the server) and decodes it into the same list of dicts the JSON endpoints
+return; pass binary=False to use JSON. Needs only the standard library and
+msgpack, so it can be copied onto a device on its own.
+"""
+import json
+import urllib.parse
+import urllib.request
+
+import msgpack
+
+MSGPACK_MEDIA_TYPE = "application/vnd.mosaic.menu+msgpack"
+SUPPORTED_VERSION = 1
+
+
+def _rows(table: dict, strings: list, string_columns: set, parent_ids: list = None) -> list:
+    columns = table["columns"]
+    count = table["count"]
+    for field in string_columns.intersection(columns):
+        columns[field] = [None if index is None else strings[index] for index in columns[field]]
+    flags = table.get("flags", {})
+    masks = columns.get("_flags") or columns.get("allergen_mask")
+
+    children = {}
+    for field, child in table.get("children", {}).items():
+        ids = [row_id for row_id, n in zip(columns["id"], child["counts"]) for _ in range(n)]
+        child_rows = iter(_rows(child, strings, string_columns, ids))
+        children[field] = [[next(child_rows) for _ in range(n)] for n in child["counts"]]
+
+    # One value list per field in response order, then one dict per row
+    values = []
+    for field in table["fields"]:
+        if field in flags:
+            bit = flags[field]
+            values.append([bool(mask & bit) for mask in masks])
+        elif field in children:
+            values.append(children[field])
+        elif field == table.get("parent_key"):
+            values.append(parent_ids)
+        else:
+            values.append(columns[field])
+    fields = table["fields"]
+    return [dict(zip(fields, row)) for row in zip(*values)] if fields else [{} for _ in range(count)]
+
+
+def decode(payload: bytes) -> list:
+    """Rows (list of dicts, as in the JSON response) from a columnar MessagePack payload"""
+    table = msgpack.unpackb(payload, raw=False)
+    if table.get("format") != "mosaic-columnar" or table.get("version", 0) > SUPPORTED_VERSION:
+        raise ValueError(f"Unsupported menu format: {table.get('format')} version {table.get('version')}")
+    return _rows(table, table["strings"], set(table["string_columns"]))
+
+
+class MenuClient:
+    def __init__(self, base_url: str, tenant: str = None, binary: bool = True, timeout: float = 10):
+        self.base_url = base_url.rstrip("/") + (f"/t/{tenant}" if tenant else "")
+        self.binary = binary
+        self.timeout = timeout
+
+    def get(self, path: str, **params) -> list:
+        """GET a menu read endpoint and return its decoded rows"""
+        query = urllib.parse.urlencode({key: value for key, value in params.items() if value is not None})
+        request = urllib.request.Request(
+            self.base_url + path + (f"?{query}" if query else ""),
+            headers={"Accept": MSGPACK_MEDIA_TYPE if self.binary else "application/json"},
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            body = response.read()
+            if response.headers.get_content_type() == MSGPACK_MEDIA_TYPE:
+                return decode(body)
+            return json.loads(body)
+
+    def menu_items(self, lang: str = None, with_translations: bool = False, fields: str = None,
+                   exclude: str = None, require: str = None) -> list:
+        """Menu items: with lang in that language, else with every translation if asked for"""
+        path = "/api/menu-items-with-translations" if with_translations else "/api/menu-items"
+        return self.get(path, lang=lang, fields=fields, exclude=exclude, require=require)
+
+    def categories(self, lang: str = None, fields: str = None) -> list:
+        """Categories with their translations, or with lang their name in that language"""
+        return self.get("/api/categories-with-translations", lang=lang, fields=fields)
@@ -0,0 +1,111 @@
+"""
+Compact binary encoding of the menu read endpoints for kiosks and table tablets.
+
+A client sending
+
+    Accept: application/vnd.mosaic.menu+msgpack
+
+gets the same rows as the JSON response, encoded with MessagePack in a
+columnar layout instead of one object per item:
+
+    {
+      "format": "mosaic-columnar", "version": 1, "count": 120,
+      "fields": ["id", "name", ..., "contains_gluten", ..., "allergen_mask"],
+      "strings": ["RIBLJA JELA", "German", "de", ...],
+      "string_columns": ["category", "language_code", "language_name"],
+      "flags": {"is_vegetarian": 1, "contains_gluten": 4, ...},
+      "columns": {"id": [...], "name": [...], "category": [0, 0, 3, ...],
+                  "allergen_mask": [...], ...},
+      "children": {"translations": {"parent_key": "menu_item_id",
+                                    "counts": [9, 9, ...], ...same layout...}}
+    }
+
+- key names are sent once per column, not once per row
+- repeated strings (category, language code and name) are indices into the
+  shared "strings" table
+- the boolean allergen flags travel only as bits of allergen_mask
+  (models.ALLERGEN_BITS), or of a "_flags" column when the rows leave
+  allergen_mask out; "flags" gives the bit of every flag field
+- nested lists (translations) become a child table with the number of
+  children per row; their parent id column is left out
+
+menu_client.decode() turns a payload back into exactly the JSON rows.
+Compare sizes and decode times with benchmarks/format_benchmark.py.
+"""
+import msgpack
+
+from models import ALLERGEN_BITS, ALLERGEN_FLAGS
+
+MEDIA_TYPE = "application/vnd.mosaic.menu+msgpack"
+MSGPACK_TYPES = (MEDIA_TYPE, "application/msgpack", "application/x-msgpack")
+FORMAT = "mosaic-columnar"
+VERSION = 1
+
+STRING_COLUMNS = ("category", "language_code", "language_name")
+PARENT_KEYS = ("menu_item_id", "category_id")
+FLAG_BITS = {column: ALLERGEN_BITS[name] for name, column in ALLERGEN_FLAGS.items()}
+
+
+def accepts_msgpack(accept: str) -> bool:
+    """Whether the Accept header prefers MessagePack over JSON (by q-value, then order)"""
+    if not accept:
+        return False
+    best_msgpack = best_json = (-1.0, 0)
+    for position, part in enumerate(accept.split(",")):
+        media_type, *params = [piece.strip() for piece in part.split(";")]
+        quality = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        rank = (quality, -position)
+        if media_type.lower() in MSGPACK_TYPES:
+            best_msgpack = max(best_msgpack, rank)
+        elif media_type.lower() in ("application/json", "application/*", "*/*"):
+            best_json = max(best_json, rank)
+    return best_msgpack[0] > 0 and best_msgpack > best_json
+
+
+def _table(rows: list, strings: dict, parent_id=None) -> dict:
+    fields = list(rows[0]) if rows else []
+    flags = {field: FLAG_BITS[field] for field in fields if field in FLAG_BITS}
+    table = {"fields": fields, "count": len(rows), "columns": {}}
+    if flags:
+        table["flags"] = flags
+
+    for field in fields:
+        if field in flags:
+            continue
+        values = [row[field] for row in rows]
+        if parent_id is not None and field in PARENT_KEYS and values == parent_id:
+            # Same as the parent's id: rebuilt by the decoder
+            table["parent_key"] = field
+            continue
+        if values and isinstance(values[0], list):
+            counts = [len(children) for children in values]
+            parent_ids = [row["id"] for row, count in zip(rows, counts) for _ in range(count)]
+            child = _table([child for children in values for child in children], strings, parent_ids)
+            child["counts"] = counts
+            table.setdefault("children", {})[field] = child
+            continue
+        if field in STRING_COLUMNS:
+            values = [None if value is None else strings.setdefault(value, len(strings)) for value in values]
+        table["columns"][field] = values
+
+    if flags:
+        # The flags as bits of allergen_mask (taken from the rows when they include it)
+        masks = [sum(bit for field, bit in flags.items() if row[field]) for row in rows]
+        stored = table["columns"].get("allergen_mask")
+        if stored != masks:
+            table["columns"]["_flags"] = masks
+    return table
+
+
+def encode(rows: list) -> bytes:
+    """MessagePack columnar encoding of a list of response rows (dicts with the same keys)"""
+    strings = {}
+    table = _table(rows, strings)
+    table.update(format=FORMAT, version=VERSION, strings=list(strings), string_columns=list(STRING_COLUMNS))
+    return msgpack.packb(table, use_bin_type=True)
@@ -0,0 +1,143 @@
+"""
+Prometheus metrics for request, database and LLM performance.
+
+Exposed on GET /metrics. With several uvicorn workers set
+PROMETHEUS_MULTIPROC_DIR to an empty, writable directory before starting
+the server; every worker then writes its samples there and /metrics
+aggregates all of them, whichever worker answers the scrape.
+"""
+import os
+import time
+from contextvars import ContextVar
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest
+)
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.routing import Match
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+DB_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1)
+LLM_BUCKETS = (0.25, 0.5, 1, 2, 4, 8, 16, 32, 64)
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "Request latency per route",
+    ["method", "route", "status"], buckets=LATENCY_BUCKETS
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight", "Requests currently being handled", multiprocess_mode="livesum"
+)
+DB_QUERIES = Counter("db_queries_total", "SQL statements executed per route", ["route"])
+DB_QUERY_LATENCY = Histogram(
+    "db_query_duration_seconds", "SQL statement duration per route", ["route"], buckets=DB_BUCKETS
+)
+DB_LOCK_ERRORS = Counter("db_lock_errors_total", "Statements that failed because the database was locked", ["route"])
+DB_LOCK_WAIT = Histogram(
+    "db_lock_wait_seconds", "Time SQL statements waited for a SQLite lock (statements that had to wait)",
+    ["route"], buckets=DB_BUCKETS + (2.5, 5)
+)
+LLM_LATENCY = Histogram(
+    "llm_request_duration_seconds", "OpenAI call latency per language", ["language"], buckets=LLM_BUCKETS
+)
+LLM_TOKENS = Counter("llm_tokens_total", "OpenAI tokens used per language", ["language", "kind"])
+LLM_ERRORS = Counter("llm_errors_total", "Failed OpenAI calls per language", ["language", "error"])
+LLM_RETRIES = Counter("llm_retries_total", "Retried OpenAI calls per language", ["language"])
+TRANSLATION_MEMORY_HITS = Counter(
+    "translation_memory_hits_total", "Translations served from the database instead of the LLM", ["kind"]
+)
+IMAGE_PROCESSING = Histogram(
+    "image_processing_seconds", "Time spent saving and converting images", ["operation"], buckets=LATENCY_BUCKETS
+)
+
+# Route template of the request being handled, used to label DB metrics
+current_route: ContextVar[str] = ContextVar("current_route", default="background")
+
+
+def route_template(app, scope) -> str:
+    """Path template (e.g. /api/menu-items/{item_id}) so labels stay low-cardinality"""
+    for route in app.router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return getattr(route, "path", "unmatched")
+    return "unmatched"
+
+
+class MetricsMiddleware:
+    """Per-route latency histogram and in-flight gauge"""
+
+    def __init__(self, app, router_app=None):
+        self.app = app
+        self.router_app = router_app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        route = route_template(self.router_app, scope)
+        token = current_route.set(route)
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        REQUESTS_IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            REQUEST_LATENCY.labels(scope["method"], route, str(status["code"])).observe(time.perf_counter() - start)
+            REQUESTS_IN_FLIGHT.dec()
+            current_route.reset(token)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = conn.info["query_start"].pop()
+    route = current_route.get()
+    DB_QUERIES.labels(route).inc()
+    DB_QUERY_LATENCY.labels(route).observe(time.perf_counter() - start)
+
+
+@event.listens_for(Engine, "handle_error")
+def _handle_error(context):
+    starts = context.connection.info.get("query_start") if context.connection is not None else None
+    if starts:
+        starts.pop()
+    if "database is locked" in str(context.original_exception):
+        DB_LOCK_ERRORS.labels(current_route.get()).inc()
+
+
+def observe_llm_call(language: str, duration: float, usage=None):
+    LLM_LATENCY.labels(language).observe(duration)
+    if usage is not None:
+        details = getattr(usage, "prompt_tokens_details", None)
+        LLM_TOKENS.labels(language, "prompt").inc(usage.prompt_tokens or 0)
+        LLM_TOKENS.labels(language, "cached").inc(getattr(details, "cached_tokens", None) or 0)
+        LLM_TOKENS.labels(language, "completion").inc(usage.completion_tokens or 0)
+
+
+def observe_llm_error(language: str, error: Exception):
+    LLM_ERRORS.labels(language, type(error).__name__).inc()
+
+
+def observe_llm_retry(language: str):
+    LLM_RETRIES.labels(language).inc()
+
+
+def render_metrics():
+    """Prometheus text exposition, aggregated over all workers in multiprocess mode"""
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
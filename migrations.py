@@ -0,0 +1,157 @@
+"""
+Versioned schema migrations.
+
+Each database stores its schema version in the schema_version table.
+ensure_schema() runs once per engine: at startup for the default database
+and when a restaurant's (tenant's) database is first opened. A new database
+gets the full schema from the models and is stamped with the latest version;
+an existing one runs its pending migrations in order. Migrations check
+before they change anything, so databases that were upgraded with the old
+one-off migrate_* scripts are handled too.
+
+Run manually with:
+    python migrations.py                 # migrate the default database
+    python migrations.py --tenant <name> # migrate one restaurant's database
+    python migrations.py --status
+"""
+import argparse
+import threading
+import time
+import weakref
+
+from sqlalchemy import Column, Integer, MetaData, Table, inspect, select, text
+from sqlalchemy.exc import DBAPIError
+
+from database import Base, engine as default_engine, create_tenant_engine
+
+_metadata = MetaData()
+schema_version = Table("schema_version", _metadata, Column("version", Integer, nullable=False))
+
+def _columns(conn, table: str) -> list:
+    return [column["name"] for column in inspect(conn).get_columns(table)]
+
+def _create_table(model):
+    def migrate(conn):
+        model.__table__.create(conn, checkfirst=True)
+    return migrate
+
+def _add_category_order(conn):
+    if "order" not in _columns(conn, "categories"):
+        conn.execute(text('ALTER TABLE categories ADD COLUMN "order" INTEGER DEFAULT 0'))
+        # Keep the existing order (by id)
+        conn.execute(text('UPDATE categories SET "order" = id - 1'))
+
+def _add_allergen_mask(conn):
+    from models import ALLERGEN_FLAGS, ALLERGEN_BITS
+    if "allergen_mask" not in _columns(conn, "menu_items"):
+        conn.execute(text("ALTER TABLE menu_items ADD COLUMN allergen_mask INTEGER NOT NULL DEFAULT 0"))
+    mask_expr = " | ".join(
+        f"(CASE WHEN {column} THEN {ALLERGEN_BITS[name]} ELSE 0 END)"
+        for name, column in ALLERGEN_FLAGS.items()
+    )
+    conn.execute(text(f"UPDATE menu_items SET allergen_mask = {mask_expr}"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_menu_items_allergen_mask ON menu_items (allergen_mask)"))
+
+def _add_image_placeholders(conn):
+    columns = _columns(conn, "menu_items")
+    for column, column_type in (("image_width", "INTEGER"), ("image_height", "INTEGER"), ("image_placeholder", "VARCHAR")):
+        if column not in columns:
+            conn.execute(text(f"ALTER TABLE menu_items ADD COLUMN {column} {column_type}"))
+    # Existing images get their placeholders from: python image_placeholders.py
+
+def _migrations():
+    from models import Translation, CategoryTranslation, ChangeLog, LLMUsage, CacheVersion, BatchJob, MenuView, IdempotencyKey, TranslationQuotaUsage
+    # (version, description, migrate(conn)); append only, never renumber
+    return [
+        (1, "categories.order column", _add_category_order),
+        (2, "translations table", _create_table(Translation)),
+        (3, "category_translations table", _create_table(CategoryTranslation)),
+        (4, "menu_items.allergen_mask column", _add_allergen_mask),
+        (5, "change_log table", _create_table(ChangeLog)),
+        (6, "llm_usage table", _create_table(LLMUsage)),
+        (7, "cache_versions table", _create_table(CacheVersion)),
+        (8, "menu_items image size and placeholder columns", _add_image_placeholders),
+        (9, "batch_jobs table", _create_table(BatchJob)),
+        (10, "menu_views table", _create_table(MenuView)),
+        (11, "idempotency_keys table", _create_table(IdempotencyKey)),
+        (12, "translation_quota table", _create_table(TranslationQuotaUsage)),
+    ]
+
+def latest_version() -> int:
+    return _migrations()[-1][0]
+
+def current_version(conn):
+    """Schema version of a database, 0 for one created before versioning, None for an empty one"""
+    tables = inspect(conn).get_table_names()
+    if "schema_version" in tables:
+        return conn.execute(select(schema_version.c.version)).scalar() or 0
+    return 0 if "menu_items" in tables else None
+
+def _set_version(conn, version: int):
+    conn.execute(schema_version.delete())
+    conn.execute(schema_version.insert().values(version=version))
+
+def migrate(bind, verbose: bool = False) -> int:
+    """Bring a database up to the latest schema version and return that version"""
+    with bind.begin() as conn:
+        version = current_version(conn)
+        latest = latest_version()
+        if version is None:
+            Base.metadata.create_all(bind=conn)
+            _metadata.create_all(bind=conn)
+            _set_version(conn, latest)
+            if verbose:
+                print(f"✅ Created schema version {latest}")
+            return latest
+
+        _metadata.create_all(bind=conn)
+        for number, description, step in _migrations():
+            if number <= version:
+                continue
+            if verbose:
+                print(f"   - {number}: {description}")
+            step(conn)
+            _set_version(conn, number)
+        # Tables added to the models without a migration of their own
+        Base.metadata.create_all(bind=conn)
+        if verbose:
+            print(f"✅ Schema is at version {latest}" if version < latest else f"ℹ️  Schema already at version {latest}")
+        return latest
+
+MIGRATE_ATTEMPTS = 3
+
+# Engines whose schema has been checked by this process
+_checked = weakref.WeakSet()
+_lock = threading.Lock()
+
+def ensure_schema(bind):
+    """Migrate a database the first time this process uses it"""
+    if bind in _checked:
+        return
+    with _lock:
+        if bind not in _checked:
+            for attempt in range(MIGRATE_ATTEMPTS):
+                try:
+                    migrate(bind)
+                    break
+                except DBAPIError:
+                    # Several workers booting at once race on the same database; the
+                    # retry sees the other worker's changes (every step is idempotent)
+                    if attempt == MIGRATE_ATTEMPTS - 1:
+                        raise
+                    time.sleep(0.5)
+            _checked.add(bind)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migrate the menu database to the latest schema")
+    parser.add_argument("--tenant", help="restaurant (tenant) whose database to migrate")
+    parser.add_argument("--status", action="store_true", help="only print the schema version")
+    args = parser.parse_args()
+
+    target = create_tenant_engine(args.tenant) if args.tenant else default_engine
+    if args.status:
+        with target.connect() as conn:
+            print(f"Schema version: {current_version(conn)} (latest {latest_version()})")
+    else:
+        print("Running migrations...")
+        migrate(target, verbose=True)
@@ -1,7 +1,32 @@
-from sqlalchemy import Column, Integer, String, Float, Boolean, ForeignKey, Text
+from datetime import datetime
+from sqlalchemy import Column, Integer, String, Float, Boolean, ForeignKey, Text, Date, DateTime, event
 from sqlalchemy.orm import relationship
 from database import Base
 
+# Allergen / dietary flags, keyed by the short name used in the API
+# (e.g. ?exclude=nuts,gluten&require=vegan). The order defines the bit
+# position inside MenuItem.allergen_mask, so only ever append to it.
+ALLERGEN_FLAGS = {
+    "vegetarian": "is_vegetarian",
+    "vegan": "is_vegan",
+    "gluten": "contains_gluten",
+    "dairy": "contains_dairy",
+    "nuts": "contains_nuts",
+    "fish": "contains_fish",
+    "shellfish": "contains_shellfish",
+    "eggs": "contains_eggs",
+    "spicy": "is_spicy",
+}
+ALLERGEN_BITS = {name: 1 << idx for idx, name in enumerate(ALLERGEN_FLAGS)}
+
+def compute_allergen_mask(item) -> int:
+    """Pack the boolean allergen columns of a menu item into a bitmask"""
+    mask = 0
+    for name, column in ALLERGEN_FLAGS.items():
+        if getattr(item, column):
+            mask |= ALLERGEN_BITS[name]
+    return mask
+
 class RestaurantInfo(Base):
     __tablename__ = "restaurant_info"
     
@@ -32,6 +57,10 @@ class MenuItem(Base):
     description_en = Column(String)  # English description
     price = Column(Float, nullable=False)
     image_path = Column(String)  # Path to uploaded image
+    # Intrinsic size and a tiny blurred WebP data URI, see image_placeholders.py
+    image_width = Column(Integer)
+    image_height = Column(Integer)
+    image_placeholder = Column(String)
     category = Column(String)  # e.g., "Glavna jela", "Deserti", etc.
     is_available = Column(Boolean, default=True)
     
@@ -46,9 +75,19 @@ class MenuItem(Base):
     contains_eggs = Column(Boolean, default=False)
     is_spicy = Column(Boolean, default=False)
     
+    # All allergen flags above packed into one integer (see ALLERGEN_BITS).
+    # Kept in sync automatically; the boolean columns remain the editable view.
+    allergen_mask = Column(Integer, default=0, nullable=False, index=True)
+    
     # Relationship to translations
     translations = relationship("Translation", back_populates="menu_item", cascade="all, delete-orphan")
 
+@event.listens_for(MenuItem, "before_insert")
+@event.listens_for(MenuItem, "before_update")
+def sync_allergen_mask(mapper, connection, target):
+    """Keep allergen_mask in sync with the boolean allergen columns"""
+    target.allergen_mask = compute_allergen_mask(target)
+
 class Translation(Base):
     __tablename__ = "translations"
     
@@ -76,3 +115,84 @@ class CategoryTranslation(Base):
     # Relationship to category
     category = relationship("Category", back_populates="translations")
 
+
+class ChangeLog(Base):
+    __tablename__ = "change_log"
+    # AUTOINCREMENT so versions are never reused after the log is trimmed
+    __table_args__ = {"sqlite_autoincrement": True}
+    
+    id = Column(Integer, primary_key=True)  # Doubles as the menu version
+    entity = Column(String(30), nullable=False)  # e.g. "menu_item", "category", "language"
+    entity_id = Column(String, nullable=False)  # Row id, or language code for languages
+    op = Column(String(10), nullable=False)  # "created", "updated" or "deleted"
+    fields = Column(Text)  # JSON list of changed field names (updates only)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class LLMUsage(Base):
+    __tablename__ = "llm_usage"
+    
+    id = Column(Integer, primary_key=True)
+    job_id = Column(String(32), nullable=False, index=True)  # One translation request or batch
+    kind = Column(String(30), nullable=False)  # "menu_item", "category" or "batch"
+    prompt_version = Column(String(20), nullable=False)
+    language_code = Column(String(10), nullable=False)
+    prompt_tokens = Column(Integer, nullable=False, default=0)
+    cached_tokens = Column(Integer, nullable=False, default=0)  # Served from the provider's prompt cache
+    completion_tokens = Column(Integer, nullable=False, default=0)
+    latency_ms = Column(Float, nullable=False, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+
+class CacheVersion(Base):
+    __tablename__ = "cache_versions"
+    
+    # Bumped by cache_bus.invalidate(); every worker polls these rows
+    topic = Column(String(50), primary_key=True)
+    tenant = Column(String(63), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+
+class BatchJob(Base):
+    __tablename__ = "batch_jobs"
+    
+    # Checkpoint of a batch translation, updated with every committed chunk
+    id = Column(Integer, primary_key=True)
+    language_codes = Column(String, nullable=False)  # Comma-separated, reused when the job is resumed
+    status = Column(String(20), nullable=False, default="running")  # "running", "completed" or "interrupted"
+    total = Column(Integer, nullable=False, default=0)  # Pairs left to translate when the job was created
+    completed = Column(Integer, nullable=False, default=0)
+    errors = Column(Integer, nullable=False, default=0)  # Of the latest run; failed pairs are retried on resume
+    chunks = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class MenuView(Base):
+    __tablename__ = "menu_views"
+    
+    # Views per hour, written in batches by view_analytics (never once per request)
+    bucket = Column(DateTime, primary_key=True)  # Start of the hour, UTC
+    entity = Column(String(20), primary_key=True)  # "menu", "item" or "category"
+    entity_id = Column(Integer, primary_key=True)  # 0 for "menu"
+    language_code = Column(String(10), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_keys"
+    
+    # Stored responses of requests sent with an Idempotency-Key header
+    key = Column(String(255), primary_key=True)
+    fingerprint = Column(String(64), nullable=False)  # Hash of method, path, query and body
+    status_code = Column(Integer)  # None while the first request is still running
+    body = Column(Text)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+
+class TranslationQuotaUsage(Base):
+    __tablename__ = "translation_quota"
+    
+    # AI translation calls per day, shared by every worker (see tenancy.TranslationQuota)
+    day = Column(Date, primary_key=True)
+    used = Column(Integer, nullable=False, default=0)
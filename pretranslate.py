@@ -0,0 +1,102 @@
+"""
+Background pre-translation of new and edited menu items and categories.
+
+Creating or editing a dish or a category enqueues its translation into
+every supported language, so guests see their own language within seconds
+instead of Croatian until someone opens the translations page.
+
+Jobs are debounced and coalesced per (tenant, kind, id): every enqueue
+moves the job to PRETRANSLATE_DELAY seconds after the latest edit, so
+several quick saves of the same form produce one job. One worker task per
+process runs the due jobs one after another, one language at a time, and
+only starts a call while no other translation call is in flight: the
+admin's own generation and batch jobs always go first.
+
+The handlers doing the work are registered by main.py. The queue lives in
+memory; jobs still pending when a worker stops are lost, and the
+translations page or batch-generate fills the gaps.
+
+Every call counts against the tenant's daily_translation_quota and the
+governor's daily token budget (OPENAI_DAILY_TOKEN_BUDGET), which is how
+its cost is capped; a job stops when either runs out. A tenant opts out
+with "pretranslate": false in tenants.json, and PRETRANSLATE=0 turns it
+off for the whole deployment.
+"""
+import asyncio
+import os
+import time
+import traceback
+
+from database import current_tenant
+from tenancy import get_tenant_config
+
+PRETRANSLATE = os.getenv("PRETRANSLATE", "1") == "1"
+PRETRANSLATE_DELAY = float(os.getenv("PRETRANSLATE_DELAY", "5"))
+
+
+class PretranslationQueue:
+    def __init__(self, delay: float = PRETRANSLATE_DELAY, enabled: bool = PRETRANSLATE):
+        self.delay = delay
+        self.enabled = enabled
+        self.handlers = {}
+        self.pending = {}  # (tenant, kind, id) -> (due time, retranslate)
+        self._wakeup = None
+        self._task = None
+
+    def register(self, kind: str, handler):
+        """await handler(entity_id, retranslate) translates one entity of the current tenant"""
+        self.handlers[kind] = handler
+
+    def enqueue(self, kind: str, entity_id: int, retranslate: bool = False, tenant: str = None):
+        """Translate an entity shortly; retranslate also replaces its AI-generated translations"""
+        tenant = tenant or current_tenant.get()
+        if not self.enabled or not get_tenant_config(tenant).get("pretranslate", True):
+            return
+        key = (tenant, kind, entity_id)
+        previous = self.pending.get(key)
+        # A later edit postpones the job and never drops an earlier request to retranslate
+        self.pending[key] = (time.monotonic() + self.delay, retranslate or (previous is not None and previous[1]))
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def start(self):
+        if self.enabled and self._task is None:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            now = time.monotonic()
+            due = [key for key, (at, _) in self.pending.items() if at <= now]
+            if not due:
+                next_due = min((at for at, _ in self.pending.values()), default=None)
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), None if next_due is None else next_due - now)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            # Oldest first; an edit while the job runs enqueues it again
+            key = min(due, key=lambda key: self.pending[key][0])
+            _, retranslate = self.pending.pop(key)
+            tenant, kind, entity_id = key
+            token = current_tenant.set(tenant)
+            try:
+                await self.handlers[kind](entity_id, retranslate)
+            except Exception:
+                traceback.print_exc()
+            finally:
+                current_tenant.reset(token)
+
+
+pretranslation = PretranslationQueue()
@@ -0,0 +1,330 @@
+"""
+Print-ready menus: a paginated PDF or high-resolution PNG pages per language.
+
+The menu is read with static_export.render_menu(). Names are resolved in
+the language, falling back to Croatian. Categories follow Category.order
+and only available items are included. The pages are drawn with Pillow
+in a worker process, so a render never holds up the web worker.
+
+Results are cached on disk under PRINT_CACHE_DIR by (tenant, language,
+layout, menu version, format). The menu version is the latest change_log
+id, so downloads are served from the cache until the menu changes. After
+a new render, older versions of the same language and layout are removed.
+
+Layouts: "a4" and "a5" pages for printed menus, "card" for A6 table cards.
+"""
+import asyncio
+import multiprocessing
+import os
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+
+PRINT_CACHE_DIR = os.getenv("PRINT_CACHE_DIR", "print_cache")
+PRINT_DPI = int(os.getenv("PRINT_DPI", "300"))
+PRINT_WORKERS = int(os.getenv("PRINT_WORKERS", "1"))
+
+# name -> (width mm, height mm, font scale)
+LAYOUTS = {
+    "a4": (210, 297, 1.0),
+    "a5": (148, 210, 0.8),
+    "card": (105, 148, 0.65),
+}
+FORMATS = {"pdf": "application/pdf", "png": "image/png"}
+
+# ALLERGEN_FLAGS name -> (text on the icon, colour)
+ALLERGEN_ICONS = {
+    "vegetarian": ("V", (56, 142, 60)),
+    "vegan": ("VG", (27, 94, 32)),
+    "gluten": ("G", (183, 121, 31)),
+    "dairy": ("D", (43, 108, 176)),
+    "nuts": ("N", (192, 86, 33)),
+    "fish": ("F", (9, 135, 160)),
+    "shellfish": ("SH", (107, 70, 193)),
+    "eggs": ("E", (183, 149, 11)),
+    "spicy": ("SP", (198, 40, 40)),
+}
+
+# Legend texts; other languages use English
+LABELS = {
+    "hr": {"legend": "Oznake", "vegetarian": "Vegetarijansko", "vegan": "Vegansko", "gluten": "Gluten",
+           "dairy": "Mliječni proizvodi", "nuts": "Orašasti plodovi", "fish": "Riba", "shellfish": "Školjke i rakovi",
+           "eggs": "Jaja", "spicy": "Ljuto"},
+    "en": {"legend": "Key", "vegetarian": "Vegetarian", "vegan": "Vegan", "gluten": "Gluten", "dairy": "Dairy",
+           "nuts": "Nuts", "fish": "Fish", "shellfish": "Shellfish", "eggs": "Eggs", "spicy": "Spicy"},
+    "de": {"legend": "Legende", "vegetarian": "Vegetarisch", "vegan": "Vegan", "gluten": "Gluten",
+           "dairy": "Milchprodukte", "nuts": "Nüsse", "fish": "Fisch", "shellfish": "Schalentiere", "eggs": "Eier",
+           "spicy": "Scharf"},
+    "it": {"legend": "Legenda", "vegetarian": "Vegetariano", "vegan": "Vegano", "gluten": "Glutine",
+           "dairy": "Latticini", "nuts": "Frutta secca", "fish": "Pesce", "shellfish": "Crostacei", "eggs": "Uova",
+           "spicy": "Piccante"},
+    "fr": {"legend": "Légende", "vegetarian": "Végétarien", "vegan": "Végétalien", "gluten": "Gluten",
+           "dairy": "Produits laitiers", "nuts": "Fruits à coque", "fish": "Poisson", "shellfish": "Crustacés",
+           "eggs": "Œufs", "spicy": "Épicé"},
+}
+
+FONTS = {
+    False: [os.getenv("PRINT_FONT"), "DejaVuSans.ttf", "arial.ttf", "Arial.ttf"],
+    True: [os.getenv("PRINT_FONT_BOLD"), "DejaVuSans-Bold.ttf", "arialbd.ttf", "Arial Bold.ttf"],
+}
+
+TEXT_COLOR = (40, 30, 20)
+MUTED_COLOR = (95, 85, 75)
+RULE_COLOR = (190, 170, 140)
+
+
+def _font(bold: bool, size: int):
+    from PIL import ImageFont
+    for name in FONTS[bold]:
+        if name:
+            try:
+                return ImageFont.truetype(name, size)
+            except OSError:
+                continue
+    return ImageFont.load_default(size)
+
+
+def _line_height(font) -> int:
+    return round(font.size * 1.3)
+
+
+def _wrap(text: str, font, width: float) -> list:
+    """Lines of `text` no wider than `width` (a single long word may overflow)"""
+    lines = []
+    for paragraph in (text or "").splitlines():
+        line = ""
+        for word in paragraph.split():
+            candidate = f"{line} {word}" if line else word
+            if line and font.getlength(candidate) > width:
+                lines.append(line)
+                line = word
+            else:
+                line = candidate
+        if line:
+            lines.append(line)
+    return lines
+
+
+class _Pages:
+    """Pages of one layout, filled from top to bottom"""
+
+    def __init__(self, size: tuple, margin: int, bottom: int):
+        self.size = size
+        self.margin = margin
+        self.bottom = bottom
+        self.images = []
+        self.new_page()
+
+    def new_page(self):
+        from PIL import Image, ImageDraw
+        self.image = Image.new("RGB", self.size, "white")
+        self.images.append(self.image)
+        self.draw = ImageDraw.Draw(self.image)
+        self.y = self.margin
+
+    def reserve(self, height: int):
+        """Continue on a new page unless `height` still fits on this one"""
+        if self.y + height > self.bottom and self.y > self.margin:
+            self.new_page()
+
+
+def render_pages(menu: dict, layout: str, dpi: int) -> list:
+    """The menu drawn on pages of the layout, as Pillow images"""
+    width_mm, height_mm, scale = LAYOUTS[layout]
+    size = (round(width_mm / 25.4 * dpi), round(height_mm / 25.4 * dpi))
+
+    def pt(points: float) -> int:
+        return max(1, round(points * scale * dpi / 72))
+
+    fonts = {
+        "title": _font(True, pt(26)),
+        "subtitle": _font(False, pt(10)),
+        "heading": _font(True, pt(16)),
+        "name": _font(True, pt(11)),
+        "text": _font(False, pt(9)),
+        "small": _font(False, pt(7)),
+        "icon": _font(True, pt(5.5)),
+    }
+    labels = LABELS.get(menu["language"]["code"], LABELS["en"])
+    margin = pt(40)
+    gap = pt(6)
+    left, right = margin, size[0] - margin
+    content_width = right - left
+    footer = _line_height(fonts["small"]) + gap
+    pages = _Pages(size, margin, size[1] - margin - footer)
+
+    icon_height = round(fonts["name"].size * 0.9)
+
+    def icon_width(name: str) -> int:
+        return max(icon_height, round(fonts["icon"].getlength(ALLERGEN_ICONS[name][0]) + icon_height * 0.6))
+
+    def draw_icon(name: str, x: int, y: int) -> int:
+        text, colour = ALLERGEN_ICONS[name]
+        width = icon_width(name)
+        pages.draw.rounded_rectangle([x, y, x + width, y + icon_height], radius=icon_height // 2, fill=colour)
+        pages.draw.text((x + width / 2, y + icon_height / 2), text, font=fonts["icon"], fill="white", anchor="mm")
+        return width
+
+    def icons_width(allergens: list) -> int:
+        return sum(icon_width(name) + gap // 2 for name in allergens)
+
+    def item_layout(item: dict):
+        price = f"{item['price']:.2f} €"
+        name_width = content_width - fonts["name"].getlength(price) - icons_width(item["allergens"]) - 2 * gap
+        name_lines = _wrap(item["name"], fonts["name"], name_width) or [""]
+        description_lines = _wrap(item["description"], fonts["text"], content_width - gap)
+        height = len(name_lines) * _line_height(fonts["name"]) + len(description_lines) * _line_height(fonts["text"])
+        return price, name_lines, description_lines, height + gap
+
+    def draw_item(item: dict, placed: tuple):
+        price, name_lines, description_lines, height = placed
+        pages.reserve(height)
+        y = pages.y
+        pages.draw.text((right, y), price, font=fonts["name"], fill=TEXT_COLOR, anchor="ra")
+        for index, line in enumerate(name_lines):
+            pages.draw.text((left, y), line, font=fonts["name"], fill=TEXT_COLOR)
+            if index == 0:
+                x = left + round(fonts["name"].getlength(line)) + gap
+                icon_y = y + (fonts["name"].size - icon_height) // 2 + pt(1)
+                for name in item["allergens"]:
+                    x += draw_icon(name, x, icon_y) + gap // 2
+            y += _line_height(fonts["name"])
+        for line in description_lines:
+            pages.draw.text((left, y), line, font=fonts["text"], fill=MUTED_COLOR)
+            y += _line_height(fonts["text"])
+        pages.y = y + gap
+
+    # Restaurant name and description
+    restaurant = menu["restaurant"]
+    for line in _wrap(restaurant["name"], fonts["title"], content_width):
+        pages.draw.text((size[0] / 2, pages.y), line, font=fonts["title"], fill=TEXT_COLOR, anchor="ma")
+        pages.y += _line_height(fonts["title"])
+    for line in _wrap(restaurant["description"], fonts["subtitle"], content_width):
+        pages.draw.text((size[0] / 2, pages.y), line, font=fonts["subtitle"], fill=MUTED_COLOR, anchor="ma")
+        pages.y += _line_height(fonts["subtitle"])
+    pages.y += 2 * gap
+
+    sections = menu["categories"] + ([{"name": "", "items": menu["uncategorized"]}] if menu["uncategorized"] else [])
+    for section in sections:
+        items = [(item, item_layout(item)) for item in section["items"]]
+        if section["name"]:
+            heading = _wrap(section["name"], fonts["heading"], content_width)
+            heading_height = len(heading) * _line_height(fonts["heading"]) + 2 * gap
+            # Keep the heading together with its first dish
+            pages.reserve(heading_height + (items[0][1][3] if items else 0))
+            pages.y += gap
+            for line in heading:
+                pages.draw.text((left, pages.y), line, font=fonts["heading"], fill=TEXT_COLOR)
+                pages.y += _line_height(fonts["heading"])
+            pages.draw.line([(left, pages.y), (right, pages.y)], fill=RULE_COLOR, width=pt(0.8))
+            pages.y += gap
+        for item, placed in items:
+            draw_item(item, placed)
+
+    # Legend of the allergen icons that appear on the menu
+    used = [name for name in ALLERGEN_ICONS if any(name in item["allergens"] for s in sections for item in s["items"])]
+    if used:
+        entries = [(name, icon_width(name) + gap // 2 + round(fonts["small"].getlength(labels[name])) + 2 * gap)
+                   for name in used]
+        rows, row, row_width = [], [], 0
+        for name, width in entries:
+            if row and row_width + width > content_width:
+                rows.append(row)
+                row, row_width = [], 0
+            row.append(name)
+            row_width += width
+        rows.append(row)
+        row_height = max(icon_height, _line_height(fonts["small"])) + gap // 2
+        pages.reserve(_line_height(fonts["small"]) + len(rows) * row_height + 2 * gap)
+        pages.y += 2 * gap
+        pages.draw.text((left, pages.y), labels["legend"], font=fonts["small"], fill=MUTED_COLOR)
+        pages.y += _line_height(fonts["small"])
+        for row in rows:
+            x = left
+            for name in row:
+                x += draw_icon(name, x, pages.y) + gap // 2
+                pages.draw.text((x, pages.y + icon_height / 2), labels[name], font=fonts["small"],
+                                fill=MUTED_COLOR, anchor="lm")
+                x += round(fonts["small"].getlength(labels[name])) + 2 * gap
+            pages.y += row_height
+
+    if len(pages.images) > 1:
+        from PIL import ImageDraw
+        for number, image in enumerate(pages.images, 1):
+            ImageDraw.Draw(image).text((size[0] / 2, size[1] - margin), f"{number} / {len(pages.images)}",
+                                       font=fonts["small"], fill=MUTED_COLOR, anchor="md")
+    return pages.images
+
+
+def render(menu: dict, layout: str, file_format: str, dpi: int = PRINT_DPI) -> list:
+    """Encoded output: one PDF document, or one PNG per page (runs in the worker process)"""
+    pages = render_pages(menu, layout, dpi)
+    if file_format == "pdf":
+        buffer = BytesIO()
+        pages[0].save(buffer, format="PDF", save_all=True, append_images=pages[1:], resolution=dpi, quality=90)
+        return [buffer.getvalue()]
+    encoded = []
+    for page in pages:
+        buffer = BytesIO()
+        page.save(buffer, format="PNG", dpi=(dpi, dpi))
+        encoded.append(buffer.getvalue())
+    return encoded
+
+
+_executor = None
+
+
+def _worker_pool() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        # spawn: forking a web worker with running threads is not safe
+        _executor = ProcessPoolExecutor(max_workers=PRINT_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _executor
+
+
+def shutdown():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def _files(directory: str) -> list:
+    return [os.path.join(directory, name) for name in sorted(os.listdir(directory))]
+
+
+def _store(base: str, target: str, encoded: list, file_format: str):
+    """Write the output into `target` atomically and drop older versions of the same layout"""
+    os.makedirs(base, exist_ok=True)
+    build_dir = os.path.join(base, f".{os.path.basename(target)}.tmp-{os.getpid()}")
+    shutil.rmtree(build_dir, ignore_errors=True)
+    os.makedirs(build_dir)
+    for number, data in enumerate(encoded, 1):
+        with open(os.path.join(build_dir, f"page-{number:03d}.{file_format}"), "wb") as f:
+            f.write(data)
+    try:
+        os.rename(build_dir, target)
+    except OSError:
+        # Another worker stored the same version first
+        shutil.rmtree(build_dir, ignore_errors=True)
+    for name in os.listdir(base):
+        if name.endswith(f".{file_format}") and not name.startswith(".") and name != os.path.basename(target):
+            shutil.rmtree(os.path.join(base, name), ignore_errors=True)
+
+
+async def print_files(db, tenant: str, lang_code: str, lang_name: str, layout: str, file_format: str) -> list:
+    """Paths of the cached output (one PDF, or one PNG per page), rendered first if the menu changed"""
+    from fastapi.concurrency import run_in_threadpool
+    import change_log
+    from static_export import render_menu
+
+    version = await run_in_threadpool(change_log.current_version, db)
+    base = os.path.join(PRINT_CACHE_DIR, tenant, lang_code, layout)
+    target = os.path.join(base, f"v{version}.{file_format}")
+    if not os.path.isdir(target):
+        menu = await run_in_threadpool(render_menu, db, lang_code, lang_name, version)
+        encoded = await asyncio.get_running_loop().run_in_executor(
+            _worker_pool(), render, menu, layout, file_format, PRINT_DPI
+        )
+        await run_in_threadpool(_store, base, target, encoded, file_format)
+    return _files(target)
@@ -0,0 +1,175 @@
+"""
+On-demand profiling of single requests.
+
+Send a request with both
+
+    X-Profile: 1
+    X-Admin-Password: <ADMIN_PASSWORD>
+
+and it runs under cProfile (deterministic, for the top-functions table)
+plus a stack sampler on the event loop thread (for flame-graph compatible
+collapsed stacks). The response carries an X-Profile-Id header; the report
+is kept in a bounded on-disk ring buffer (PROFILE_DIR, newest PROFILE_KEEP
+reports) and served by the admin endpoints in main.py.
+
+Requests without the headers only pay for one header lookup. Only one
+request is profiled at a time; concurrent requests on the same event loop
+show up in the samples as well.
+"""
+import cProfile
+import hmac
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+import uuid
+
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "50"))
+SAMPLE_INTERVAL = float(os.getenv("PROFILE_SAMPLE_INTERVAL", "0.001"))
+TOP_FUNCTIONS = 40
+
+
+class StackSampler:
+    """Samples one thread's Python stack into collapsed-stack counts"""
+
+    def __init__(self, thread_id: int, interval: float = SAMPLE_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.counts = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            key = ";".join(reversed(stack))
+            self.counts[key] = self.counts.get(key, 0) + 1
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def collapsed(self) -> str:
+        return "\n".join(f"{stack} {count}" for stack, count in sorted(self.counts.items()))
+
+
+def top_functions(profiler: cProfile.Profile, limit: int = TOP_FUNCTIONS) -> list:
+    stats = pstats.Stats(profiler)
+    rows = []
+    for (filename, line, name), (primitive_calls, calls, total_time, cumulative_time, _) in stats.stats.items():
+        rows.append({
+            "function": f"{name} ({filename}:{line})",
+            "calls": calls,
+            "total_time": round(total_time, 6),
+            "cumulative_time": round(cumulative_time, 6),
+        })
+    rows.sort(key=lambda row: row["cumulative_time"], reverse=True)
+    return rows[:limit]
+
+
+def save_report(report: dict):
+    """Write a report and drop the oldest ones beyond PROFILE_KEEP"""
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    path = os.path.join(PROFILE_DIR, f"{report['id']}.json")
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(report, f)
+    os.replace(tmp_path, path)
+
+    reports = sorted(name for name in os.listdir(PROFILE_DIR) if name.endswith(".json"))
+    for name in reports[:-PROFILE_KEEP]:
+        os.remove(os.path.join(PROFILE_DIR, name))
+
+
+def list_reports() -> list:
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    summaries = []
+    for name in sorted(os.listdir(PROFILE_DIR), reverse=True):
+        if not name.endswith(".json"):
+            continue
+        report = load_report(name[:-5])
+        if report:
+            summaries.append({key: report[key] for key in ("id", "method", "path", "status", "duration", "created_at")})
+    return summaries
+
+
+def load_report(report_id: str):
+    # Ids are generated by us; refuse anything that could escape PROFILE_DIR
+    if not report_id.replace("-", "").isalnum():
+        return None
+    try:
+        with open(os.path.join(PROFILE_DIR, f"{report_id}.json"), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+class ProfilingMiddleware:
+    """Profile a single request when an admin asks for it"""
+
+    def __init__(self, app, admin_password: str):
+        self.app = app
+        self.admin_password = admin_password.encode("utf-8")
+        self.lock = threading.Lock()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        headers = dict(scope.get("headers") or [])
+        if headers.get(b"x-profile") != b"1":
+            return await self.app(scope, receive, send)
+        if not hmac.compare_digest(headers.get(b"x-admin-password", b""), self.admin_password):
+            return await self.app(scope, receive, send)
+        if not self.lock.acquire(blocking=False):
+            # cProfile can only run once per thread; let this one through unprofiled
+            return await self.app(scope, receive, send)
+
+        report_id = f"{time.strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                message = dict(message, headers=list(message.get("headers", [])) + [
+                    (b"x-profile-id", report_id.encode("ascii"))
+                ])
+            await send(message)
+
+        profiler = cProfile.Profile()
+        sampler = StackSampler(threading.get_ident())
+        started = time.perf_counter()
+        sampler.start()
+        profiler.enable()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            profiler.disable()
+            sampler.stop()
+            duration = time.perf_counter() - started
+            self.lock.release()
+            save_report({
+                "id": report_id,
+                "method": scope["method"],
+                "path": scope["path"],
+                "query": scope.get("query_string", b"").decode("latin-1"),
+                "status": status["code"],
+                "duration": round(duration, 6),
+                "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "sample_interval": SAMPLE_INTERVAL,
+                "top_functions": top_functions(profiler),
+                "collapsed": sampler.collapsed(),
+            })
@@ -0,0 +1,145 @@
+"""
+Fast read path for the menu list endpoints.
+
+FastAPI validates and re-serializes every ORM object (and every nested
+translation) through the response model before encoding it with the stdlib
+json module. The customer menu endpoints are read far more often than
+anything else, so they select plain row tuples instead, zip them into dicts
+with the same keys (in the same order) as the response schemas and return
+them encoded with orjson. The field lists are taken from the schemas, so the
+two cannot drift apart.
+
+The customer menu shows one language at a time: with ?lang= the endpoints
+join only that language's translation in SQL and return the resolved name
+and description (falling back to Croatian) instead of every translation.
+?fields= selects only the named columns.
+
+Compare both paths with benchmarks/serialization_benchmark.py.
+"""
+from collections import defaultdict
+
+from sqlalchemy import and_, case, func, select
+from sqlalchemy.orm import aliased
+
+from models import MenuItem, Translation, Category, CategoryTranslation
+from schemas import (
+    MenuItemResponse, MenuItemWithTranslationsResponse, TranslationResponse, CategoryResponse,
+    CategoryWithTranslationsResponse, CategoryTranslationResponse, LocalizedMenuItemResponse,
+    LocalizedCategoryResponse,
+)
+
+# Language of the source texts (name_hr, description_hr, Category.name)
+SOURCE_LANGUAGE = "hr"
+
+def _fields(schema) -> tuple:
+    return tuple(schema.model_fields)
+
+MENU_ITEM_FIELDS = _fields(MenuItemResponse)
+TRANSLATION_FIELDS = _fields(TranslationResponse)
+CATEGORY_FIELDS = _fields(CategoryResponse)
+CATEGORY_TRANSLATION_FIELDS = _fields(CategoryTranslationResponse)
+MENU_ITEM_WITH_TRANSLATIONS_FIELDS = _fields(MenuItemWithTranslationsResponse)
+CATEGORY_WITH_TRANSLATIONS_FIELDS = _fields(CategoryWithTranslationsResponse)
+LOCALIZED_MENU_ITEM_FIELDS = _fields(LocalizedMenuItemResponse)
+LOCALIZED_CATEGORY_FIELDS = _fields(LocalizedCategoryResponse)
+
+def project(available: tuple, fields) -> tuple:
+    """The fields named in ?fields=a,b in schema order (always with id), all of them without it"""
+    if not fields:
+        return available
+    requested = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = requested - set(available)
+    if unknown:
+        raise ValueError(", ".join(sorted(unknown)))
+    return tuple(name for name in available if name == "id" or name in requested)
+
+def _columns(model, fields: tuple) -> list:
+    return [getattr(model, name) for name in fields]
+
+def _grouped(rows, fields: tuple, key: str) -> dict:
+    index = fields.index(key)
+    groups = defaultdict(list)
+    for row in rows:
+        groups[row[index]].append(dict(zip(fields, row)))
+    return groups
+
+def _first_translation(model, parent_key: str, lang: str):
+    """Join condition that keeps at most one `lang` translation per parent row (the oldest)"""
+    first = aliased(model)
+    first_ids = select(func.min(first.id)).where(first.language_code == lang).group_by(getattr(first, parent_key))
+    return model.id.in_(first_ids)
+
+def menu_item_rows(db, apply_filters=None, with_translations: bool = False, fields: tuple = None) -> list:
+    """Menu items as dicts shaped like MenuItemResponse / MenuItemWithTranslationsResponse
+
+    `fields` (from project()) narrows the keys; "translations" among them adds the translations.
+    """
+    if fields is None:
+        fields = MENU_ITEM_WITH_TRANSLATIONS_FIELDS if with_translations else MENU_ITEM_FIELDS
+    with_translations = "translations" in fields
+    fields = tuple(name for name in fields if name != "translations")
+    unfiltered = db.query(*_columns(MenuItem, fields))
+    query = apply_filters(unfiltered) if apply_filters is not None else unfiltered
+    # By id, as without a filter: an allergen filter would otherwise return them in index order
+    items = [dict(zip(fields, row)) for row in query.order_by(MenuItem.id)]
+    if not with_translations:
+        return items
+
+    translations = db.query(*_columns(Translation, TRANSLATION_FIELDS)).order_by(Translation.id)
+    if query is not unfiltered:
+        # Only the translations of the items that passed the filters
+        ids = query.with_entities(MenuItem.id)
+        translations = translations.filter(Translation.menu_item_id.in_(ids.statement))
+    by_item = _grouped(translations, TRANSLATION_FIELDS, "menu_item_id")
+    for item in items:
+        item["translations"] = by_item.get(item["id"], [])
+    return items
+
+def localized_menu_item_rows(db, lang: str, apply_filters=None, fields: tuple = LOCALIZED_MENU_ITEM_FIELDS) -> list:
+    """Menu items in one language as dicts shaped like LocalizedMenuItemResponse"""
+    translated = {"name": MenuItem.name_hr, "description": MenuItem.description_hr}
+    join = lang != SOURCE_LANGUAGE and not translated.keys().isdisjoint(fields)
+    if join:
+        translated = {
+            "name": func.coalesce(Translation.name, MenuItem.name_hr),
+            "description": case((Translation.id.is_(None), MenuItem.description_hr), else_=Translation.description),
+        }
+    columns = [translated[name] if name in translated else getattr(MenuItem, name) for name in fields]
+    query = db.query(*columns).select_from(MenuItem)
+    if join:
+        query = query.outerjoin(Translation, and_(
+            Translation.menu_item_id == MenuItem.id, _first_translation(Translation, "menu_item_id", lang)
+        ))
+    if apply_filters is not None:
+        query = apply_filters(query)
+    return [dict(zip(fields, row)) for row in query.order_by(MenuItem.id)]
+
+def category_rows(db, fields: tuple = CATEGORY_WITH_TRANSLATIONS_FIELDS) -> list:
+    """Categories with translations as dicts shaped like CategoryWithTranslationsResponse"""
+    with_translations = "translations" in fields
+    fields = tuple(name for name in fields if name != "translations")
+    query = db.query(*_columns(Category, fields)).order_by(Category.order, Category.id)
+    categories = [dict(zip(fields, row)) for row in query]
+    if not with_translations:
+        return categories
+    translations = db.query(*_columns(CategoryTranslation, CATEGORY_TRANSLATION_FIELDS)).order_by(CategoryTranslation.id)
+    by_category = _grouped(translations, CATEGORY_TRANSLATION_FIELDS, "category_id")
+    for category in categories:
+        category["translations"] = by_category.get(category["id"], [])
+    return categories
+
+def localized_category_rows(db, lang: str, fields: tuple = LOCALIZED_CATEGORY_FIELDS, apply_filters=None) -> list:
+    """Categories in one language as dicts shaped like LocalizedCategoryResponse"""
+    display_name = Category.name
+    join = lang != SOURCE_LANGUAGE and "display_name" in fields
+    if join:
+        display_name = func.coalesce(CategoryTranslation.name, Category.name)
+    columns = [display_name if name == "display_name" else getattr(Category, name) for name in fields]
+    query = db.query(*columns).select_from(Category)
+    if join:
+        query = query.outerjoin(CategoryTranslation, and_(
+            CategoryTranslation.category_id == Category.id, _first_translation(CategoryTranslation, "category_id", lang)
+        ))
+    if apply_filters is not None:
+        query = apply_filters(query)
+    return [dict(zip(fields, row)) for row in query.order_by(Category.order, Category.id)]
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional, List
 
 class RestaurantInfoBase(BaseModel):
@@ -55,6 +55,13 @@ class CategoryWithTranslationsResponse(CategoryResponse):
     class Config:
         from_attributes = True
 
+class LocalizedCategoryResponse(BaseModel):
+    # ?lang=: name stays the Croatian key menu items refer to, display_name is translated
+    id: int
+    name: str
+    order: int = 0
+    display_name: str
+
 class TranslationBase(BaseModel):
     language_code: str
     language_name: str
@@ -118,6 +125,10 @@ class MenuItemUpdate(BaseModel):
 class MenuItemResponse(MenuItemBase):
     id: int
     image_path: Optional[str] = None
+    image_width: Optional[int] = None
+    image_height: Optional[int] = None
+    image_placeholder: Optional[str] = None  # data:image/webp;base64,... shown until the photo loads
+    allergen_mask: int = 0
     
     class Config:
         from_attributes = True
@@ -128,3 +139,31 @@ class MenuItemWithTranslationsResponse(MenuItemResponse):
     class Config:
         from_attributes = True
 
+class LocalizedMenuItemResponse(BaseModel):
+    # ?lang=: name and description in that language, falling back to Croatian
+    id: int
+    name: str
+    description: Optional[str] = None
+    price: float
+    category: Optional[str] = None
+    is_available: bool = True
+    is_vegetarian: bool = False
+    is_vegan: bool = False
+    contains_gluten: bool = False
+    contains_dairy: bool = False
+    contains_nuts: bool = False
+    contains_fish: bool = False
+    contains_shellfish: bool = False
+    contains_eggs: bool = False
+    is_spicy: bool = False
+    image_path: Optional[str] = None
+    image_width: Optional[int] = None
+    image_height: Optional[int] = None
+    image_placeholder: Optional[str] = None
+    allergen_mask: int = 0
+
+class MenuViewBeacon(BaseModel):
+    # Sent once per page load by the customer menu: what the guest was shown
+    lang: str = Field(max_length=16)
+    items: List[int] = Field(default=[], max_length=2000)
+    categories: List[int] = Field(default=[], max_length=500)
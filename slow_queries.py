@@ -0,0 +1,285 @@
+"""
+Slow-query log with query plans.
+
+Every SQL statement is timed (on every engine, tenants included) and added
+to per-process statistics keyed by its normalized text: literals and bound
+parameters become ?, and IN lists of any length collapse to (?, ...).
+A statement slower than SLOW_QUERY_MS (default 100) is printed with its
+route, the shape of its parameters (types, never values) and its plan:
+EXPLAIN QUERY PLAN on SQLite, EXPLAIN on PostgreSQL. The plan is captured
+once per normalized statement, the first time it is slow. Plans that scan
+a whole table without an index are flagged, which is how a missing index
+usually shows up first.
+
+On SQLite the time a statement spends waiting for another connection's
+lock is measured as well. SQLite's own busy handler waits invisibly inside
+the statement, so transactions run with busy_timeout 0 and a statement
+that finds the database locked is retried here instead, within the same
+overall timeout (the connection's busy_timeout, which is put back for
+COMMIT, so commits still wait as before). One difference: a write that
+SQLite refuses at once to avoid a deadlock now fails after the timeout.
+The wait is added to the statement's stats (lock_waits, lock_wait_ms,
+max_lock_wait_ms), shown in the slow-query line and observed in the
+db_lock_wait_seconds histogram.
+
+GET /api/admin/slow-queries lists the top-N statements since this process
+started. Set SLOW_QUERY_MS=0 to time statements without logging them.
+"""
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from metrics import DB_LOCK_WAIT, current_route
+
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "100"))
+# How many distinct statements are tracked; the rest only count towards "untracked"
+MAX_STATEMENTS = int(os.getenv("SLOW_QUERY_MAX_STATEMENTS", "1000"))
+MAX_SHAPE_ITEMS = 20
+# Retry interval while waiting for a SQLite lock (doubling up to the maximum)
+LOCK_RETRY_MIN = 0.001
+LOCK_RETRY_MAX = 0.05
+EXPLAINABLE = ("SELECT", "WITH", "UPDATE", "DELETE", "INSERT")
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_NAMED_PARAMETER = re.compile(r"%\(\w+\)s|%s|:\w+")
+_PARAMETER_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+_lock = threading.Lock()
+_statements = {}  # normalized statement -> stats
+_untracked = 0
+_started_at = time.time()
+
+
+def normalize(statement: str) -> str:
+    statement = _STRING.sub("?", statement)
+    statement = _NAMED_PARAMETER.sub("?", statement)
+    statement = _NUMBER.sub("?", statement)
+    statement = _PARAMETER_LIST.sub("(?, ...)", statement)
+    return _WHITESPACE.sub(" ", statement).strip()
+
+
+def parameters_shape(parameters, executemany: bool = False):
+    """Types of the bound parameters, never their values"""
+    if executemany:
+        rows = list(parameters or [])
+        return {"rows": len(rows), "row": parameters_shape(rows[0]) if rows else None}
+    if isinstance(parameters, dict):
+        shape = {name: type(value).__name__ for name, value in list(parameters.items())[:MAX_SHAPE_ITEMS]}
+        if len(parameters) > MAX_SHAPE_ITEMS:
+            shape["..."] = f"{len(parameters) - MAX_SHAPE_ITEMS} more"
+        return shape
+    if isinstance(parameters, (list, tuple)):
+        shape = [type(value).__name__ for value in parameters[:MAX_SHAPE_ITEMS]]
+        if len(parameters) > MAX_SHAPE_ITEMS:
+            shape.append(f"... {len(parameters) - MAX_SHAPE_ITEMS} more")
+        return shape
+    return type(parameters).__name__
+
+
+def full_scans(dialect: str, plan: list) -> list:
+    """Plan lines that read a whole table without an index"""
+    if dialect == "sqlite":
+        # "SCAN menu_items" is a full scan; "SCAN menu_items USING INDEX ..." is not. An
+        # AUTOMATIC index is built from a full scan on every run, for lack of a real one.
+        return [line for line in plan
+                if (line.startswith("SCAN ") and " USING " not in line) or " AUTOMATIC " in line]
+    return [line.strip() for line in plan if "Seq Scan on" in line]
+
+
+def explain(cursor, dialect: str, statement: str, parameters) -> list:
+    """Plan of a statement, on the DBAPI connection that just ran it (so no SQLAlchemy events fire)"""
+    explain_cursor = cursor.connection.cursor()
+    try:
+        if dialect == "sqlite":
+            explain_cursor.execute("EXPLAIN QUERY PLAN " + statement, parameters)
+            return [row[-1] for row in explain_cursor.fetchall()]
+        if dialect == "postgresql":
+            # A failed EXPLAIN must not abort the request's transaction
+            explain_cursor.execute("SAVEPOINT slow_query_explain")
+            try:
+                explain_cursor.execute("EXPLAIN " + statement, parameters)
+                return [row[0] for row in explain_cursor.fetchall()]
+            except Exception:
+                explain_cursor.execute("ROLLBACK TO SAVEPOINT slow_query_explain")
+                raise
+            finally:
+                explain_cursor.execute("RELEASE SAVEPOINT slow_query_explain")
+        return []
+    finally:
+        explain_cursor.close()
+
+
+def record(cursor, dialect: str, statement: str, parameters, executemany: bool, seconds: float,
+           lock_wait: float = 0.0):
+    global _untracked
+    key = normalize(statement)
+    route = current_route.get()
+    slow = SLOW_QUERY_MS > 0 and seconds * 1000 >= SLOW_QUERY_MS
+    with _lock:
+        stats = _statements.get(key)
+        if stats is None:
+            if len(_statements) >= MAX_STATEMENTS:
+                _untracked += 1
+                return
+            stats = _statements[key] = {
+                "statement": key, "count": 0, "slow": 0, "total_ms": 0.0, "max_ms": 0.0,
+                "lock_waits": 0, "lock_wait_ms": 0.0, "max_lock_wait_ms": 0.0,
+                "routes": {}, "parameters": None, "plan": None, "full_scans": None,
+            }
+        stats["count"] += 1
+        stats["total_ms"] += seconds * 1000
+        stats["max_ms"] = max(stats["max_ms"], seconds * 1000)
+        if lock_wait:
+            stats["lock_waits"] += 1
+            stats["lock_wait_ms"] += lock_wait * 1000
+            stats["max_lock_wait_ms"] = max(stats["max_lock_wait_ms"], lock_wait * 1000)
+        stats["routes"][route] = stats["routes"].get(route, 0) + 1
+        if not slow:
+            return
+        stats["slow"] += 1
+        stats["parameters"] = parameters_shape(parameters, executemany)
+        needs_plan = stats["plan"] is None
+        if needs_plan:
+            stats["plan"] = []
+
+    if needs_plan and not executemany and key.split(" ", 1)[0].upper() in EXPLAINABLE:
+        try:
+            plan = explain(cursor, dialect, statement, parameters)
+        except Exception as e:
+            plan = [f"EXPLAIN failed: {e}"]
+        with _lock:
+            stats["plan"] = plan
+            stats["full_scans"] = full_scans(dialect, plan)
+
+    message = f"🐢 Slow query {seconds * 1000:.0f} ms on {route}: {key[:300]}"
+    if lock_wait:
+        message += f"\n   waited {lock_wait * 1000:.0f} ms for a database lock"
+    message += f"\n   parameters: {stats['parameters']}"
+    if stats["plan"]:
+        message += "\n   plan: " + " | ".join(stats["plan"])
+    if stats["full_scans"]:
+        message += "\n   ⚠️  full table scan: " + ", ".join(stats["full_scans"])
+    print(message)
+
+
+def top(limit: int = 20, sort: str = "max_ms") -> dict:
+    """The `limit` statements with the highest max_ms, total_ms, mean_ms, count, slow or lock_wait_ms"""
+    with _lock:
+        statements = [
+            dict(stats, routes=dict(stats["routes"]), mean_ms=stats["total_ms"] / stats["count"])
+            for stats in _statements.values()
+        ]
+        untracked = _untracked
+    statements.sort(key=lambda stats: stats[sort], reverse=True)
+    for stats in statements:
+        for field in ("total_ms", "max_ms", "mean_ms", "lock_wait_ms", "max_lock_wait_ms"):
+            stats[field] = round(stats[field], 3)
+    return {
+        "since": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(_started_at)),
+        "threshold_ms": SLOW_QUERY_MS,
+        "statements": len(statements),
+        "untracked_executions": untracked,
+        "top": statements[:limit],
+    }
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("slow_query_start", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    seconds = time.perf_counter() - conn.info["slow_query_start"].pop()
+    lock_wait = conn.info.pop("slow_query_lock_wait", 0.0)
+    record(cursor, conn.dialect.name, statement, parameters, executemany, seconds, lock_wait)
+
+
+@event.listens_for(Engine, "handle_error")
+def _handle_error(context):
+    starts = context.connection.info.get("slow_query_start") if context.connection is not None else None
+    if starts:
+        starts.pop()
+    if context.connection is not None:
+        context.connection.info.pop("slow_query_lock_wait", None)
+
+
+def execute_waiting_for_locks(execute, timeout: float) -> float:
+    """Run execute() (busy_timeout set to 0), waiting up to `timeout` seconds for locks here;
+    returns the seconds waited"""
+    waited = 0.0
+    deadline = None
+    delay = LOCK_RETRY_MIN
+    try:
+        while True:
+            try:
+                execute()
+                return waited
+            except sqlite3.OperationalError as e:
+                # SQLITE_BUSY: nothing ran, so the statement can be run again
+                if "database is locked" not in str(e):
+                    raise
+                now = time.perf_counter()
+                deadline = deadline or now + timeout
+                if now >= deadline:
+                    raise
+                pause = min(delay, deadline - now)
+                time.sleep(pause)
+                waited += pause
+                delay = min(delay * 2, LOCK_RETRY_MAX)
+    finally:
+        if waited:
+            DB_LOCK_WAIT.labels(current_route.get()).observe(waited)
+
+
+@event.listens_for(Engine, "begin")
+def _begin(conn):
+    if conn.dialect.name != "sqlite":
+        return
+    info = conn.info
+    dbapi_connection = conn.connection.dbapi_connection
+    if "busy_timeout" not in info:
+        # The connection's own setting (sqlite3's timeout argument), read once per connection
+        info["busy_timeout"] = dbapi_connection.execute("PRAGMA busy_timeout").fetchone()[0] / 1000
+    dbapi_connection.execute("PRAGMA busy_timeout = 0")
+    info["slow_query_waits_for_locks"] = True
+
+
+@event.listens_for(Engine, "commit")
+@event.listens_for(Engine, "rollback")
+def _end(conn):
+    # COMMIT waits with SQLite's own busy handler again
+    if conn.info.pop("slow_query_waits_for_locks", False):
+        conn.connection.dbapi_connection.execute(f"PRAGMA busy_timeout = {int(conn.info['busy_timeout'] * 1000)}")
+
+
+def _execute_sqlite(cursor, context, execute):
+    info = context.root_connection.info
+    if not info.get("slow_query_waits_for_locks"):
+        return None
+    waited = execute_waiting_for_locks(execute, info["busy_timeout"])
+    if waited:
+        info["slow_query_lock_wait"] = waited
+    return True
+
+
+@event.listens_for(Engine, "do_execute")
+def _do_execute(cursor, statement, parameters, context):
+    return _execute_sqlite(cursor, context, lambda: cursor.execute(statement, parameters))
+
+
+@event.listens_for(Engine, "do_execute_no_params")
+def _do_execute_no_params(cursor, statement, context):
+    return _execute_sqlite(cursor, context, lambda: cursor.execute(statement))
+
+
+@event.listens_for(Engine, "do_executemany")
+def _do_executemany(cursor, statement, parameters, context):
+    return _execute_sqlite(cursor, context, lambda: cursor.executemany(statement, parameters))
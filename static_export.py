@@ -0,0 +1,297 @@
+"""
+Static export of the customer menu for CDN / static hosting.
+
+Renders the full menu once per language into plain JSON (and optionally
+pre-rendered HTML) together with web-optimized copies of the dish photos:
+
+    <out>/current.json                  -> {"version": 42, "files": {"hr": "/versions/42/menu.hr.json", ...}}
+    <out>/versions/42/menu.<lang>.json
+    <out>/versions/42/index.<lang>.html (with --html)
+    <out>/images/<hash>.webp            (content-addressed, shared between versions)
+
+Each export is built in a temporary directory and renamed into place, and
+current.json is replaced atomically last, so a static host never serves a
+half-written menu. Exports are incremental: only the languages touched by
+change_log entries since the previous export are rendered again, the rest
+are hard-linked from the previous version.
+
+Run with: python static_export.py --out export [--html] [--full]
+"""
+import argparse
+import hashlib
+import html
+import json
+import os
+import shutil
+from typing import Optional
+
+from PIL import Image
+from sqlalchemy.orm import Session
+
+from models import MenuItem, Category, Translation, CategoryTranslation, RestaurantInfo, ChangeLog, ALLERGEN_FLAGS
+import change_log
+from metrics import IMAGE_PROCESSING
+
+STATIC_EXPORT_DIR = os.getenv("STATIC_EXPORT_DIR", "export")
+KEEP_VERSIONS = 3
+IMAGE_MAX_SIZE = 1200
+IMAGE_QUALITY = 80
+
+BASE_LANGUAGE = ("hr", "Croatian")
+
+# Change log entities whose changes show up in every language file
+SHARED_ENTITIES = {"menu_item", "category", "restaurant_info", "language"}
+
+
+def _write_atomic(path: str, data: bytes):
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def _read_json(path: str) -> Optional[dict]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def export_image(image_path: Optional[str], out_dir: str, images: dict) -> Optional[str]:
+    """Copy a dish photo as a resized WebP, named by its content hash"""
+    if not image_path:
+        return None
+    source = image_path.lstrip("/")
+    if source in images:
+        return images[source]
+    if not os.path.exists(source):
+        return None
+    with open(source, "rb") as f:
+        digest = hashlib.sha256(f.read()).hexdigest()[:16]
+
+    name = f"{digest}.webp"
+    target = os.path.join(out_dir, "images", name)
+    if not os.path.exists(target):
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with IMAGE_PROCESSING.labels("export").time(), Image.open(source) as img:
+            img.thumbnail((IMAGE_MAX_SIZE, IMAGE_MAX_SIZE))
+            if img.mode not in ("RGB", "RGBA"):
+                img = img.convert("RGBA")
+            tmp_path = f"{target}.tmp-{os.getpid()}"
+            img.save(tmp_path, format="WEBP", quality=IMAGE_QUALITY)
+            os.replace(tmp_path, target)
+    images[source] = f"/images/{name}"
+    return images[source]
+
+
+def exported_size(item) -> dict:
+    """Size of the exported (downscaled) photo, from the original's intrinsic size"""
+    if not item.image_width or not item.image_height:
+        return {"image_width": None, "image_height": None}
+    scale = min(1.0, IMAGE_MAX_SIZE / max(item.image_width, item.image_height))
+    return {"image_width": round(item.image_width * scale), "image_height": round(item.image_height * scale)}
+
+
+def render_menu(db: Session, lang_code: str, lang_name: str, version: int,
+                out_dir: Optional[str] = None, images: Optional[dict] = None) -> dict:
+    """The customer menu for one language, with names already resolved (photos exported only with out_dir)"""
+    info = db.query(RestaurantInfo).first()
+    categories = db.query(Category).order_by(Category.order, Category.id).all()
+    items = db.query(MenuItem).filter(MenuItem.is_available == True).order_by(MenuItem.id).all()
+
+    item_translations = {}
+    category_translations = {}
+    if lang_code != BASE_LANGUAGE[0]:
+        for t in db.query(Translation).filter(Translation.language_code == lang_code):
+            item_translations[t.menu_item_id] = t
+        for t in db.query(CategoryTranslation).filter(CategoryTranslation.language_code == lang_code):
+            category_translations[t.category_id] = t.name
+
+    def render_item(item):
+        translation = item_translations.get(item.id)
+        return {
+            "id": item.id,
+            # Fall back to Croatian when there is no translation yet
+            "name": translation.name if translation else item.name_hr,
+            "description": (translation.description if translation else item.description_hr) or "",
+            "price": item.price,
+            "image": export_image(item.image_path, out_dir, images) if out_dir else None,
+            **exported_size(item),
+            "image_placeholder": item.image_placeholder,
+            "allergens": [name for name, column in ALLERGEN_FLAGS.items() if getattr(item, column)],
+        }
+
+    by_category = {}
+    for item in items:
+        by_category.setdefault(item.category or "", []).append(render_item(item))
+
+    return {
+        "version": version,
+        "language": {"code": lang_code, "name": lang_name},
+        "restaurant": {
+            "name": info.name if info else "Restaurant Menu",
+            "description": info.description if info else "",
+            "address": info.address if info else "",
+            "phone": info.phone if info else "",
+            "email": info.email if info else "",
+        },
+        "categories": [
+            {
+                "id": cat.id,
+                "name": category_translations.get(cat.id, cat.name),
+                "order": cat.order,
+                "items": by_category.get(cat.name, []),
+            }
+            for cat in categories
+            if by_category.get(cat.name)
+        ],
+        "uncategorized": by_category.get("", []),
+    }
+
+
+def render_html(menu: dict) -> str:
+    """Minimal pre-rendered page for hosts without JavaScript"""
+    esc = html.escape
+    parts = [
+        "<!doctype html>",
+        f'<html lang="{esc(menu["language"]["code"])}"><head><meta charset="utf-8">',
+        '<meta name="viewport" content="width=device-width, initial-scale=1">',
+        f"<title>{esc(menu['restaurant']['name'])}</title></head><body>",
+        f"<h1>{esc(menu['restaurant']['name'])}</h1>",
+    ]
+    sections = menu["categories"] + ([{"name": "", "items": menu["uncategorized"]}] if menu["uncategorized"] else [])
+    for section in sections:
+        if section["name"]:
+            parts.append(f"<h2>{esc(section['name'])}</h2>")
+        parts.append("<ul>")
+        for item in section["items"]:
+            image = ""
+            if item["image"]:
+                # Reserve the space and show the blurred placeholder until the photo arrives
+                size = f' width="{item["image_width"]}" height="{item["image_height"]}"' if item["image_width"] else ""
+                placeholder = (
+                    f' style="background:url({item["image_placeholder"]}) center/cover"' if item["image_placeholder"] else ""
+                )
+                image = f'<img src="{esc(item["image"])}" alt="" loading="lazy"{size}{placeholder}>'
+            parts.append(
+                f"<li>{image}<strong>{esc(item['name'])}</strong> {item['price']:.2f} €"
+                f"<p>{esc(item['description'])}</p></li>"
+            )
+        parts.append("</ul>")
+    parts.append("</body></html>")
+    return "\n".join(parts)
+
+
+def affected_languages(db: Session, since: int, languages: dict) -> Optional[set]:
+    """Languages whose files must be rendered again, or None for all of them"""
+    oldest = db.query(ChangeLog.id).order_by(ChangeLog.id).limit(1).scalar()
+    if oldest is None or since < oldest - 1:
+        return None
+
+    affected = set()
+    translation_ids = {"translation": set(), "category_translation": set()}
+    for entity, entity_id in db.query(ChangeLog.entity, ChangeLog.entity_id).filter(ChangeLog.id > since):
+        if entity in SHARED_ENTITIES:
+            return None
+        if entity in translation_ids:
+            translation_ids[entity].add(int(entity_id))
+
+    for entity, model in (("translation", Translation), ("category_translation", CategoryTranslation)):
+        ids = translation_ids[entity]
+        if not ids:
+            continue
+        rows = db.query(model.id, model.language_code).filter(model.id.in_(ids)).all()
+        if len(rows) < len(ids):
+            # A deleted translation no longer tells us its language
+            return None
+        affected.update(code for _, code in rows)
+    return affected & set(languages)
+
+
+def export_static_menu(db: Session, languages: dict, out_dir: str = STATIC_EXPORT_DIR,
+                       with_html: bool = False, full: bool = False) -> dict:
+    """Export the menu for every language into a new version directory"""
+    all_languages = dict([BASE_LANGUAGE], **languages)
+    version = change_log.current_version(db)
+    versions_dir = os.path.join(out_dir, "versions")
+    os.makedirs(versions_dir, exist_ok=True)
+
+    previous = _read_json(os.path.join(out_dir, "current.json"))
+    if previous and previous.get("version") == version and previous.get("html") == with_html \
+            and set(previous.get("files", {})) == set(all_languages) and not full:
+        return {**previous, "rendered": []}
+
+    if full or not previous or previous.get("html") != with_html:
+        to_render = None
+    else:
+        to_render = affected_languages(db, previous["version"], all_languages)
+    if to_render is not None:
+        # Newly supported languages have nothing to reuse
+        to_render |= set(all_languages) - set(previous.get("files", {}))
+
+    build_dir = os.path.join(versions_dir, f".tmp-{version}-{os.getpid()}")
+    shutil.rmtree(build_dir, ignore_errors=True)
+    os.makedirs(build_dir)
+    previous_dir = os.path.join(versions_dir, str(previous["version"])) if previous else None
+
+    images = {}
+    rendered = []
+    files = {}
+    for code, name in all_languages.items():
+        names = [f"menu.{code}.json"] + ([f"index.{code}.html"] if with_html else [])
+        reuse = to_render is not None and code not in to_render and previous_dir \
+            and all(os.path.exists(os.path.join(previous_dir, n)) for n in names)
+        if reuse:
+            for n in names:
+                try:
+                    os.link(os.path.join(previous_dir, n), os.path.join(build_dir, n))
+                except OSError:
+                    shutil.copy2(os.path.join(previous_dir, n), os.path.join(build_dir, n))
+        else:
+            menu = render_menu(db, code, name, version, out_dir, images)
+            with open(os.path.join(build_dir, names[0]), "w", encoding="utf-8") as f:
+                json.dump(menu, f, ensure_ascii=False, separators=(",", ":"))
+            if with_html:
+                with open(os.path.join(build_dir, names[1]), "w", encoding="utf-8") as f:
+                    f.write(render_html(menu))
+            rendered.append(code)
+        files[code] = f"/versions/{version}/{names[0]}"
+
+    final_dir = os.path.join(versions_dir, str(version))
+    if os.path.exists(final_dir):
+        shutil.rmtree(final_dir)
+    os.rename(build_dir, final_dir)
+
+    current = {"version": version, "html": with_html, "files": files}
+    _write_atomic(os.path.join(out_dir, "current.json"),
+                  json.dumps(current, ensure_ascii=False, indent=2).encode("utf-8"))
+
+    # Keep a few old versions so clients mid-download are not broken
+    old_versions = sorted((int(d) for d in os.listdir(versions_dir) if d.isdigit()), reverse=True)
+    for old in old_versions[KEEP_VERSIONS:]:
+        shutil.rmtree(os.path.join(versions_dir, str(old)), ignore_errors=True)
+
+    return {**current, "rendered": rendered}
+
+
+if __name__ == "__main__":
+    from database import get_session_factory, current_tenant
+    from main import load_supported_languages
+
+    parser = argparse.ArgumentParser(description="Export the customer menu as static files")
+    parser.add_argument("--out", default=STATIC_EXPORT_DIR, help="output directory")
+    parser.add_argument("--html", action="store_true", help="also write pre-rendered HTML pages")
+    parser.add_argument("--full", action="store_true", help="render every language again")
+    parser.add_argument("--tenant", help="restaurant to export (see tenants.json)")
+    args = parser.parse_args()
+
+    if args.tenant:
+        current_tenant.set(args.tenant)
+    db = get_session_factory()()
+    try:
+        result = export_static_menu(db, load_supported_languages(), args.out, args.html, args.full)
+    finally:
+        db.close()
+    print(f"✅ Exported menu version {result['version']} to {args.out}")
+    print(f"   - rendered: {', '.join(result['rendered']) or 'nothing (up to date)'}")
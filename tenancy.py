@@ -0,0 +1,173 @@
+"""
+Multi-restaurant tenancy.
+
+One deployment can serve many restaurants. Every tenant gets its own
+database (see database.get_session_factory), so all models and queries are
+isolated per tenant without a tenant_id column, and RestaurantInfo stays a
+single row per restaurant.
+
+Tenants are configured in TENANTS_FILE (default tenants.json):
+
+    {
+        "bracera": {
+            "hosts": ["bracera.example.com"],
+            "predefined_categories": ["HLADNA PREDJELA", "DESERT"],
+            "daily_translation_quota": 500,
+            "pretranslate": true,
+            "database_url": "sqlite:///./tenants/bracera/menu.db"
+        }
+    }
+
+A request is routed to a tenant by its Host header or by a /t/<tenant>/
+path prefix; everything else is served by the default tenant, so a
+deployment without tenants.json behaves exactly like a single restaurant.
+"""
+import json
+import os
+import re
+import threading
+from datetime import date
+
+from database import DEFAULT_TENANT, current_tenant
+
+TENANTS_FILE = os.getenv("TENANTS_FILE", "tenants.json")
+# Default daily number of AI translation calls per tenant (0 = unlimited)
+DEFAULT_DAILY_TRANSLATION_QUOTA = int(os.getenv("DAILY_TRANSLATION_QUOTA", "0"))
+
+TENANT_NAME = re.compile(r"^[a-z0-9][a-z0-9_-]{0,62}$")
+PATH_PREFIX = re.compile(r"^/t/([^/]+)(/.*)?$")
+
+_tenants = None
+_tenants_mtime = None
+_tenants_lock = threading.Lock()
+
+def load_tenants() -> dict:
+    """Tenant configuration, re-read when the file changes"""
+    global _tenants, _tenants_mtime
+    try:
+        mtime = os.path.getmtime(TENANTS_FILE)
+    except OSError:
+        mtime = None
+    with _tenants_lock:
+        if _tenants is None or mtime != _tenants_mtime:
+            tenants = {}
+            if mtime is not None:
+                with open(TENANTS_FILE, "r", encoding="utf-8") as f:
+                    tenants = json.load(f)
+            _tenants = {name: config for name, config in tenants.items() if TENANT_NAME.match(name)}
+            _tenants_mtime = mtime
+        return _tenants
+
+def get_tenant_config(tenant: str = None) -> dict:
+    tenant = tenant or current_tenant.get()
+    return load_tenants().get(tenant, {})
+
+def tenant_for_host(host: str):
+    host = host.split(":")[0].lower()
+    for name, config in load_tenants().items():
+        if host in config.get("hosts", []):
+            return name
+    return None
+
+def tenant_path(*parts) -> str:
+    """Per-tenant location for files kept outside the database"""
+    tenant = current_tenant.get()
+    if tenant == DEFAULT_TENANT:
+        return os.path.join(*parts)
+    return os.path.join("tenants", tenant, *parts)
+
+
+class TenantMiddleware:
+    """Resolve the tenant of each request from a /t/<tenant> prefix or the Host header"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] not in ("http", "websocket"):
+            return await self.app(scope, receive, send)
+
+        tenant = DEFAULT_TENANT
+        match = PATH_PREFIX.match(scope["path"])
+        if match:
+            tenant = match.group(1)
+            if tenant not in load_tenants():
+                return await self._not_found(send)
+            path = match.group(2) or "/"
+            scope = dict(scope, path=path, raw_path=path.encode("utf-8"))
+        else:
+            host = dict(scope.get("headers") or []).get(b"host", b"").decode("latin-1")
+            tenant = tenant_for_host(host) or DEFAULT_TENANT
+
+        token = current_tenant.set(tenant)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            current_tenant.reset(token)
+
+    @staticmethod
+    async def _not_found(send):
+        body = json.dumps({"detail": "Restoran nije pronađen"}).encode("utf-8")
+        await send({
+            "type": "http.response.start",
+            "status": 404,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+class TranslationQuota:
+    """Daily cap on AI translation calls per tenant.
+
+    Calls are counted in a translation_quota row per day in the tenant's own
+    database, so every worker process adds to the same count and a restart
+    doesn't reset it. Tenants without a quota are not counted.
+    """
+
+    def limit(self, tenant: str) -> int:
+        return int(get_tenant_config(tenant).get("daily_translation_quota", DEFAULT_DAILY_TRANSLATION_QUOTA))
+
+    def try_consume(self, tenant: str = None, amount: int = 1) -> bool:
+        from sqlalchemy.dialects import postgresql, sqlite
+        from database import get_session_factory
+        from models import TranslationQuotaUsage
+
+        tenant = tenant or current_tenant.get()
+        limit = self.limit(tenant)
+        if not limit:
+            return True
+        if amount > limit:
+            return False
+        db = get_session_factory(tenant)()
+        try:
+            insert = postgresql.insert if db.get_bind().dialect.name == "postgresql" else sqlite.insert
+            statement = insert(TranslationQuotaUsage).values(day=date.today(), used=amount)
+            # One atomic statement: the count only grows while it stays within the limit
+            statement = statement.on_conflict_do_update(
+                index_elements=["day"],
+                set_={"used": TranslationQuotaUsage.used + amount},
+                where=TranslationQuotaUsage.used + amount <= limit,
+            )
+            consumed = db.execute(statement).rowcount > 0
+            db.commit()
+            return consumed
+        finally:
+            db.close()
+
+    def remaining(self, tenant: str = None):
+        from database import get_session_factory
+        from models import TranslationQuotaUsage
+
+        tenant = tenant or current_tenant.get()
+        limit = self.limit(tenant)
+        if not limit:
+            return None
+        db = get_session_factory(tenant)()
+        try:
+            used = db.query(TranslationQuotaUsage.used).filter(TranslationQuotaUsage.day == date.today()).scalar()
+        finally:
+            db.close()
+        return max(limit - (used or 0), 0)
+
+
+translation_quota = TranslationQuota()
@@ -0,0 +1,28 @@
+"""
+Every test session runs the app against a scratch directory: its own SQLite
+database, languages file and images, the in-process cache bus and no
+background pre-translation. The environment is set before main is imported.
+"""
+import os
+import sys
+import tempfile
+
+WORK_DIR = tempfile.mkdtemp(prefix="mosaic-tests-")
+os.chdir(WORK_DIR)
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(WORK_DIR, 'menu.db')}"
+os.environ["TENANT_DATABASE_URL"] = f"sqlite:///{os.path.join(WORK_DIR, 'tenants', '{tenant}', 'menu.db')}"
+os.environ["CACHE_BUS"] = "memory"
+os.environ["PRETRANSLATE"] = "0"
+os.environ["VIEW_FLUSH_INTERVAL"] = "3600"
+os.environ.setdefault("OPENAI_API_KEY", "test")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+    import main
+    with TestClient(main.app) as test_client:
+        yield test_client
@@ -0,0 +1,80 @@
+import asyncio
+import json
+import types
+
+import httpx
+import openai
+
+from llm import LLMGovernor
+
+
+def rate_limit_error() -> openai.RateLimitError:
+    request = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+    return openai.RateLimitError("Rate limit reached", response=httpx.Response(429, request=request), body=None)
+
+
+class BurstCompletions:
+    """Holds the first `burst` calls until all of them are in flight, then fails them with a 429"""
+
+    def __init__(self, burst: int):
+        self.burst = burst
+        self.started = 0
+        self.all_started = asyncio.Event()
+
+    async def create(self, **kwargs):
+        self.started += 1
+        if self.started <= self.burst:
+            if self.started == self.burst:
+                self.all_started.set()
+            await self.all_started.wait()
+            raise rate_limit_error()
+        content = json.dumps({"name": "Grilled squid"})
+        return types.SimpleNamespace(usage=None, choices=[types.SimpleNamespace(message=types.SimpleNamespace(content=content))])
+
+
+def governor_with(completions, max_concurrency: int = 8) -> LLMGovernor:
+    client = types.SimpleNamespace(chat=types.SimpleNamespace(completions=completions))
+    return LLMGovernor(requests_per_minute=10 ** 6, tokens_per_minute=10 ** 9, max_concurrency=max_concurrency,
+                       max_retries=0, client=client)
+
+
+async def call(governor: LLMGovernor):
+    try:
+        return await governor.chat_json([{"role": "user", "content": "Lignje na žaru"}])
+    except openai.RateLimitError:
+        return None
+
+
+def test_burst_of_429s_halves_concurrency_once():
+    async def run():
+        governor = governor_with(BurstCompletions(burst=5))
+        await asyncio.gather(*(call(governor) for _ in range(5)))
+        return governor
+
+    governor = asyncio.run(run())
+    assert governor.concurrency == 4
+
+
+def test_429_after_a_decrease_halves_again():
+    async def run():
+        governor = governor_with(BurstCompletions(burst=3))
+        await asyncio.gather(*(call(governor) for _ in range(3)))
+        first = governor.concurrency
+        # A call started at the reduced concurrency that still hits the limit
+        governor.client.chat.completions = BurstCompletions(burst=1)
+        await call(governor)
+        return first, governor.concurrency
+
+    assert asyncio.run(run()) == (4, 2)
+
+
+def test_clean_calls_grow_concurrency_back():
+    async def run():
+        governor = governor_with(BurstCompletions(burst=2), max_concurrency=4)
+        await asyncio.gather(*(call(governor) for _ in range(2)))
+        halved = governor.concurrency
+        for _ in range(2):
+            await call(governor)
+        return halved, governor.concurrency
+
+    assert asyncio.run(run()) == (2, 3)
@@ -0,0 +1,19 @@
+import pretranslate
+from pretranslate import PretranslationQueue
+
+
+def test_enabled_by_default(monkeypatch):
+    monkeypatch.setattr(pretranslate, "get_tenant_config", lambda tenant: {})
+    queue = PretranslationQueue(delay=0, enabled=True)
+    queue.enqueue("menu_item", 1, tenant="bracera")
+    assert ("bracera", "menu_item", 1) in queue.pending
+
+
+def test_tenant_can_opt_out(monkeypatch):
+    configs = {"bracera": {"pretranslate": False}}
+    monkeypatch.setattr(pretranslate, "get_tenant_config", lambda tenant: configs.get(tenant, {}))
+    queue = PretranslationQueue(delay=0, enabled=True)
+    queue.enqueue("menu_item", 1, tenant="bracera")
+    queue.enqueue("menu_item", 1, tenant="konoba")
+    assert list(queue.pending) == [("konoba", "menu_item", 1)]
+
@@ -0,0 +1,83 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+import slow_queries
+
+
+@pytest.fixture
+def database():
+    path = os.path.join(tempfile.mkdtemp(), "locks.db")
+    engine = create_engine(f"sqlite:///{path}", connect_args={"timeout": 2})
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE lock_test (id INTEGER PRIMARY KEY, value TEXT)"))
+    yield path, engine
+    engine.dispose()
+
+
+def hold_write_lock(path: str, seconds: float) -> threading.Event:
+    """Take the write lock from another connection and release it after `seconds`"""
+    locked = threading.Event()
+
+    def hold():
+        other = sqlite3.connect(path, isolation_level=None)
+        other.execute("BEGIN IMMEDIATE")
+        other.execute("INSERT INTO lock_test (value) VALUES ('other')")
+        locked.set()
+        time.sleep(seconds)
+        other.execute("COMMIT")
+        other.close()
+
+    threading.Thread(target=hold, daemon=True).start()
+    locked.wait()
+    return locked
+
+
+def stats_of(fragment: str) -> dict:
+    return next(stats for stats in slow_queries.top(1000)["top"] if fragment in stats["statement"])
+
+
+def test_lock_wait_is_recorded_with_the_statement(database):
+    path, engine = database
+    hold_write_lock(path, 0.3)
+
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO lock_test (value) VALUES ('waited')"))
+
+    stats = stats_of("INSERT INTO lock_test")
+    assert stats["lock_waits"] == 1
+    assert 250 <= stats["max_lock_wait_ms"] < 1000
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT count(*) FROM lock_test")).scalar() == 2
+
+
+def test_connection_timeout_still_applies(database):
+    path, engine = database
+    engine = create_engine(f"sqlite:///{path}", connect_args={"timeout": 0.2})
+    hold_write_lock(path, 1.0)
+
+    started = time.perf_counter()
+    with pytest.raises(OperationalError, match="database is locked"):
+        with engine.begin() as conn:
+            conn.execute(text("UPDATE lock_test SET value = 'late'"))
+    assert 0.15 <= time.perf_counter() - started < 0.9
+
+    # The busy timeout is back on the connection, so COMMIT keeps its own wait
+    with engine.connect() as conn:
+        dbapi_connection = conn.connection.dbapi_connection
+        assert dbapi_connection.execute("PRAGMA busy_timeout").fetchone()[0] == 200
+    engine.dispose()
+
+
+def test_statements_without_contention_do_not_wait(database):
+    _, engine = database
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO lock_test (value) VALUES ('free')"))
+        conn.execute(text("SELECT value FROM lock_test WHERE value = 'free'")).all()
+    assert stats_of("SELECT value FROM lock_test")["lock_waits"] == 0
@@ -0,0 +1,52 @@
+import pytest
+
+import tenancy
+from tenancy import TranslationQuota
+
+
+@pytest.fixture
+def quota_of(monkeypatch):
+    configs = {}
+    monkeypatch.setattr(tenancy, "get_tenant_config", lambda tenant=None: configs.get(tenant, {}))
+
+    def set_quota(tenant: str, quota: int):
+        configs[tenant] = {"daily_translation_quota": quota}
+    return set_quota
+
+
+def test_quota_is_shared_by_every_worker(quota_of):
+    quota_of("quota-shared", 3)
+    # Two workers (or a worker before and after a restart) see the same count
+    first, second = TranslationQuota(), TranslationQuota()
+
+    assert first.try_consume("quota-shared")
+    assert second.try_consume("quota-shared")
+    assert first.try_consume("quota-shared")
+    assert not second.try_consume("quota-shared")
+    assert not TranslationQuota().try_consume("quota-shared")
+    assert TranslationQuota().remaining("quota-shared") == 0
+
+
+def test_quota_is_per_tenant(quota_of):
+    quota_of("quota-a", 1)
+    quota_of("quota-b", 1)
+    quota = TranslationQuota()
+
+    assert quota.try_consume("quota-a")
+    assert not quota.try_consume("quota-a")
+    assert quota.try_consume("quota-b")
+
+
+def test_amount_larger_than_what_is_left_is_refused(quota_of):
+    quota_of("quota-amount", 5)
+    quota = TranslationQuota()
+
+    assert quota.try_consume("quota-amount", amount=4)
+    assert not quota.try_consume("quota-amount", amount=2)
+    assert quota.remaining("quota-amount") == 1
+
+
+def test_no_quota_means_unlimited(quota_of):
+    quota = TranslationQuota()
+    assert all(quota.try_consume("quota-unlimited") for _ in range(100))
+    assert quota.remaining("quota-unlimited") is None
@@ -0,0 +1,50 @@
+from view_analytics import ViewCounter, views
+
+
+def counted(entity: str) -> dict:
+    """entity_id -> buffered views of one entity"""
+    result = {}
+    for (_, _, counted_entity, entity_id, _), count in views.counts.items():
+        if counted_entity == entity:
+            result[entity_id] = result.get(entity_id, 0) + count
+    return result
+
+
+def test_beacon_counts_only_ids_on_the_menu(client):
+    item = client.post("/api/menu-items", data={"name_hr": "Lignje", "price": "14"}).json()
+    category_id = client.get("/api/categories").json()["categories_with_ids"][0]["id"]
+    views.counts.clear()
+
+    response = client.post("/api/analytics/views", json={
+        "lang": "de", "items": [item["id"], item["id"] + 1000, -5], "categories": [category_id, 99999],
+    })
+
+    assert response.status_code == 204
+    assert counted("menu") == {0: 1}
+    assert counted("item") == {item["id"]: 1}
+    assert counted("category") == {category_id: 1}
+
+
+def test_beacon_sees_items_added_after_the_first_view(client):
+    client.post("/api/analytics/views", json={"lang": "de", "items": []})
+    item = client.post("/api/menu-items", data={"name_hr": "Brudet", "price": "18"}).json()
+    views.counts.clear()
+
+    client.post("/api/analytics/views", json={"lang": "de", "items": [item["id"]]})
+
+    assert counted("item") == {item["id"]: 1}
+
+
+def test_beacon_rejects_oversized_lists(client):
+    response = client.post("/api/analytics/views", json={"lang": "de", "items": list(range(3000))})
+    assert response.status_code == 422
+
+
+def test_counter_drops_new_keys_past_the_cap():
+    counter = ViewCounter(max_keys=3)
+    counter.record("item", [1, 2, 3, 4, 5], "de")
+    counter.record("item", [1], "de")
+
+    assert len(counter.counts) == 3
+    assert counter.dropped == 2
+    assert sum(counter.counts.values()) == 4
@@ -0,0 +1,115 @@
+"""
+Menu view analytics, counted in memory and written behind.
+
+The customer menu reports each page load to POST /api/analytics/views,
+which calls views.record() with the items and categories it showed.
+That only bumps an in-memory counter per (tenant, hour, entity, id,
+language). A background thread flushes the
+counters every VIEW_FLUSH_INTERVAL seconds as one batched upsert per
+tenant into menu_views, so a guest request never writes to the database.
+Each worker process flushes its own counters, and the upserts add up.
+
+Counts not yet flushed when a process is killed are lost, which is at
+most one interval of traffic. If a flush fails, its counts are kept for
+the next one. At most VIEW_MAX_KEYS distinct counters are buffered per
+process; views for new ones are dropped (and counted in `dropped`) until
+the next flush empties the buffer.
+"""
+import os
+import threading
+import traceback
+from collections import Counter, defaultdict
+from datetime import datetime
+
+from database import current_tenant, get_session_factory
+
+VIEW_FLUSH_INTERVAL = float(os.getenv("VIEW_FLUSH_INTERVAL", "30"))
+VIEW_MAX_KEYS = int(os.getenv("VIEW_MAX_KEYS", "100000"))
+
+
+def _upsert(db, rows: list):
+    from models import MenuView
+    if db.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    statement = insert(MenuView)
+    statement = statement.on_conflict_do_update(
+        index_elements=["bucket", "entity", "entity_id", "language_code"],
+        set_={"count": MenuView.count + statement.excluded["count"]},
+    )
+    db.execute(statement, rows)
+
+
+class ViewCounter:
+    def __init__(self, interval: float = VIEW_FLUSH_INTERVAL, max_keys: int = VIEW_MAX_KEYS):
+        self.interval = interval
+        self.max_keys = max_keys
+        self.counts = Counter()  # (tenant, hour, entity, entity_id, language) -> views
+        self.dropped = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def record(self, entity: str, ids, language: str):
+        """Count one view of each id (0 for the menu as a whole) in the current hour"""
+        hour = datetime.utcnow().replace(minute=0, second=0, microsecond=0)
+        tenant = current_tenant.get()
+        with self._lock:
+            for entity_id in ids:
+                key = (tenant, hour, entity, entity_id, language)
+                if key not in self.counts and len(self.counts) >= self.max_keys:
+                    self.dropped += 1
+                    continue
+                self.counts[key] += 1
+
+    def flush(self) -> int:
+        """Write the buffered counts, one transaction per tenant; returns the number of rows"""
+        with self._lock:
+            counts, self.counts = self.counts, Counter()
+        by_tenant = defaultdict(list)
+        for (tenant, hour, entity, entity_id, language), count in counts.items():
+            by_tenant[tenant].append({
+                "bucket": hour, "entity": entity, "entity_id": entity_id, "language_code": language, "count": count,
+            })
+        written = 0
+        for tenant, rows in by_tenant.items():
+            db = None
+            try:
+                db = get_session_factory(tenant)()
+                _upsert(db, rows)
+                db.commit()
+                written += len(rows)
+            except Exception:
+                if db is not None:
+                    db.rollback()
+                traceback.print_exc()
+                # Keep them for the next flush
+                with self._lock:
+                    for row in rows:
+                        key = (tenant, row["bucket"], row["entity"], row["entity_id"], row["language_code"])
+                        self.counts[key] += row["count"]
+            finally:
+                if db is not None:
+                    db.close()
+        return written
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name="view-analytics", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join(timeout=self.interval + 5)
+            self._thread = None
+        self.flush()
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            self.flush()
+
+
+views = ViewCounter()